@@ -0,0 +1,164 @@
+"""
+Async variants of the hot read endpoints, for ASGI deployments.
+
+Under gunicorn's sync workers every request pins a worker for its whole
+duration, including the time spent waiting on the database or trickling a
+PDF out to a slow client. Served by uvicorn workers (SERVER_MODE=asgi in
+docker-entrypoint.sh, which also sets ASYNC_VIEWS=True so api/urls.py
+routes here), these views await the ORM and the cache, and stream reports
+from a file read in a worker thread, so one worker serves many
+connections at once.
+
+DRF's @api_view is sync-only, so these are plain Django views that keep
+the same URLs, JWT authentication and response bodies as their DRF
+counterparts in views.py.
+"""
+import asyncio
+import os
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException, NotAuthenticated
+
+from .authentication import CachedJWTAuthentication
+from .catalog import acompany_list_payload
+from .database import replica_reads
+from .metrics import report_response
+from .models import UserCompany
+from .renderers import encode_json
+from .serializers import MyReportsSerializer
+
+REPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _json(payload, status=200):
+    return HttpResponse(payload, status=status, content_type='application/json')
+
+
+def jwt_required(view):
+    """Authenticate the bearer token like CachedJWTAuthentication; 401 otherwise."""
+    authenticator = CachedJWTAuthentication()
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            authenticated = await authenticator.aauthenticate(request)
+            if authenticated is None:
+                raise NotAuthenticated()
+        except APIException as e:
+            # Same body and header as DRF's exception handler
+            response = JsonResponse(e.detail if isinstance(e.detail, dict) else {'detail': e.detail},
+                                    status=e.status_code)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+        request.user, request.auth = authenticated
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _file_chunks(path, chunk_size=REPORT_CHUNK_SIZE):
+    """Read `path` in chunks without blocking the event loop."""
+    f = await asyncio.to_thread(open, path, 'rb')
+    try:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+# =========================
+# Companies & My Reports
+# =========================
+@require_GET
+@replica_reads
+async def company_list(request):
+    """Get all companies data for All Reports page from database"""
+    try:
+        return _json(await acompany_list_payload())
+    except Exception as e:
+        print(f"Error fetching companies: {str(e)}")
+        return JsonResponse({'error': 'Failed to fetch companies data'}, status=500)
+
+
+@require_GET
+@jwt_required
+async def my_reports(request):
+    """Get companies assigned to the authenticated user by admin for My Reports page"""
+    user_companies = [uc async for uc in (UserCompany.objects
+                                          .filter(user_id=request.user.pk, is_active=True)
+                                          .select_related('company')
+                                          .order_by('-assigned_at'))]
+    return _json(encode_json(MyReportsSerializer(user_companies, many=True).data))
+
+
+# =========================
+# Secure PDF Streaming
+# =========================
+async def _report_response(request, company_name, as_attachment):
+    user_company = await (UserCompany.objects
+                          .filter(user_id=request.user.pk,
+                                  company__company_name=company_name,
+                                  is_active=True)
+                          .select_related('company')
+                          .afirst())
+    if not user_company:
+        report_response('denied')
+        return JsonResponse({'error': 'You do not have access to this company report'}, status=403)
+
+    company = user_company.company
+    if not company.pdf_filename or not company.has_pdf_report:
+        report_response('missing')
+        return JsonResponse({'error': 'No PDF report available for this company'}, status=404)
+
+    file_path = os.path.join(settings.BASE_DIR, 'media', 'secure_reports', company.pdf_filename)
+    try:
+        size = (await asyncio.to_thread(os.stat, file_path)).st_size
+    except OSError:
+        report_response('missing')
+        return JsonResponse({'error': 'Report file not found on server'}, status=404)
+    report_response('served', size)
+
+    response = StreamingHttpResponse(_file_chunks(file_path), content_type='application/pdf')
+    response['Content-Length'] = str(size)
+    response['Content-Disposition'] = content_disposition_header(as_attachment, company.pdf_filename)
+    if not as_attachment:
+        response['X-Frame-Options'] = 'SAMEORIGIN'
+    return response
+
+
+@require_GET
+@jwt_required
+async def download_company_report(request, company_name):
+    """Stream PDF report as attachment if user has access to the company"""
+    return await _report_response(request, company_name, as_attachment=True)
+
+
+@require_GET
+@jwt_required
+async def view_company_report(request, company_name):
+    """Stream PDF inline if user has access to the company"""
+    return await _report_response(request, company_name, as_attachment=False)
+
+
+# =========================
+# Health
+# =========================
+def _ping_database():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+@require_GET
+async def health_check(request):
+    """Health check endpoint for Docker healthcheck"""
+    try:
+        # Cursors are sync-only; run the ping on the ORM's thread
+        await sync_to_async(_ping_database)()
+        return JsonResponse({"status": "healthy", "database": "connected"}, status=200)
+    except Exception as e:
+        return JsonResponse({"status": "unhealthy", "database": "disconnected", "error": str(e)}, status=503)
@@ -0,0 +1,165 @@
+"""
+JWT authentication backed by a short-lived cache of slim user principals.
+
+simplejwt's JWTAuthentication loads the full CustomUser row on every request.
+Most endpoints only need the user's id and a handful of flags, so we cache
+those (see PRINCIPAL_FIELDS) per user id and rebuild request.user from the
+cache as a CustomUser instance whose other columns are deferred. Deferred
+columns are loaded together, in one query, the first time a view touches one
+of them (see CustomUser.refresh_from_db).
+
+Entries are dropped by the post_save / post_delete signals in api.signals and
+expire after AUTH_USER_CACHE_TIMEOUT seconds in any case. A signal only
+reaches the cache of the process that saved the user, so principals are
+cached only with AUTH_USER_CACHE, which needs a cache shared by every worker
+(the api.E001 check refuses a per-process one). Without it the user row is
+read on every request, like JWTAuthentication, and the active flag and token
+version checks see deactivation and revocation at once.
+"""
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .metrics import cache_lookup
+from .models import CustomUser
+
+# Columns kept in the cached principal; everything else stays deferred
+PRINCIPAL_FIELDS = (
+    'id', 'is_active', 'is_staff', 'is_superuser', 'subscription_type', 'token_version',
+)
+TOKEN_VERSION_CLAIM = 'ver'
+AUTH_USER_CACHE_PREFIX = 'auth:principal:'
+
+
+# Cache backends private to one process; signal invalidation cannot reach other workers
+PER_PROCESS_CACHE_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@checks.register(checks.Tags.caches, checks.Tags.security)
+def check_principal_cache(app_configs, **kwargs):
+    if settings.AUTH_USER_CACHE and settings.CACHES['default']['BACKEND'] in PER_PROCESS_CACHE_BACKENDS:
+        return [checks.Error(
+            'AUTH_USER_CACHE needs a cache shared by all workers; with a per-process cache, '
+            'deactivated users and revoked tokens stay valid in other workers until the entry expires.',
+            hint='Configure CACHE_BACKEND (e.g. Redis), or set AUTH_USER_CACHE=False.',
+            id='api.E001',
+        )]
+    return []
+
+
+def principal_cache_key(user_id):
+    return f'{AUTH_USER_CACHE_PREFIX}{user_id}'
+
+
+def invalidate_cached_principal(user_id):
+    cache.delete(principal_cache_key(user_id))
+
+
+def get_tokens_for_user(user):
+    """Issue a refresh/access token pair carrying the user's token version."""
+    refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    return refresh
+
+
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Adds the token version claim checked by CachedJWTAuthentication."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the user from a slim principal, cached
+    with AUTH_USER_CACHE.
+
+    Tokens whose version claim does not match CustomUser.token_version are
+    rejected, so bumping the version (e.g. on password change) revokes every
+    token issued before it. Tokens issued without the claim count as version 0.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        if not settings.AUTH_USER_CACHE:
+            # Nothing to cache: load the whole row, as JWTAuthentication does
+            user = self._user_query(user_id).first()
+            return self._check_user(user, validated_token)
+        principal = cache.get(principal_cache_key(user_id))
+        cache_lookup('principal', principal is not None)
+        if principal is None:
+            principal = self._user_query(user_id).values(*PRINCIPAL_FIELDS).first()
+            if principal is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            cache.set(principal_cache_key(user_id), principal,
+                      getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+        return self._check_principal(principal, validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() for plain Django async views (see api.async_views)."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        if not settings.AUTH_USER_CACHE:
+            user = await self._user_query(user_id).afirst()
+            return self._check_user(user, validated_token)
+        principal = await cache.aget(principal_cache_key(user_id))
+        cache_lookup('principal', principal is not None)
+        if principal is None:
+            principal = await self._user_query(user_id).values(*PRINCIPAL_FIELDS).afirst()
+            if principal is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            await cache.aset(principal_cache_key(user_id), principal,
+                             getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+        return self._check_principal(principal, validated_token)
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def _user_query(self, user_id):
+        return CustomUser.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+
+    def _check(self, is_active, token_version, validated_token):
+        if not is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != token_version:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+
+    def _check_user(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        self._check(user.is_active, user.token_version, validated_token)
+        return user
+
+    def _check_principal(self, principal, validated_token):
+        self._check(principal['is_active'], principal['token_version'], validated_token)
+        return self.build_user(principal)
+
+    def build_user(self, principal):
+        """Build a CustomUser with only the principal columns loaded."""
+        field_names = [f.attname for f in CustomUser._meta.concrete_fields
+                       if f.attname in principal]
+        # The alias the router reads users from, which deferred columns load from too
+        return CustomUser.from_db(CustomUser.objects.db, field_names,
+                                  [principal[name] for name in field_names])
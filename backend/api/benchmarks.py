@@ -0,0 +1,205 @@
+"""
+Peer benchmarks: score statistics per sector and per ESG sector.
+
+refresh_benchmarks() runs at the end of every Excel ingest. It reads the
+catalog into a DataFrame once, computes count / mean / median / percentiles
+/ min / max for each score column within each peer group, and ranks every
+company against its peers. Results replace the PeerBenchmark and
+CompanyPeerRank tables in one transaction, so /api/benchmarks/ is a plain
+table read and clients no longer average the whole catalog themselves.
+"""
+import math
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .catalog import DICTIONARY_SOURCES, SCORE_COLUMNS, catalog_queryset, to_float
+from .models import PEER_GROUP_CHOICES, Company, CompanyPeerRank, PeerBenchmark
+
+METRICS = tuple(SCORE_COLUMNS)
+PEER_GROUPS = tuple(choice for choice, _ in PEER_GROUP_CHOICES)
+MAX_COMPARE_COMPANIES = 10
+# Model field -> quantile
+PERCENTILES = {'p10': 0.10, 'p25': 0.25, 'median': 0.50, 'p75': 0.75, 'p90': 0.90}
+
+
+def _value(number, digits=4):
+    return None if number is None or math.isnan(number) else round(float(number), digits)
+
+
+def company_scores_frame():
+    """One row per catalog company: isin, peer group names and numeric scores (NaN when blank)."""
+    import pandas as pd  # Only needed at ingest time; kept out of web worker boot
+
+    fields = {'isin', *PEER_GROUPS}
+    for current, legacy in SCORE_COLUMNS.values():
+        fields.update((current, legacy))
+    rows = catalog_queryset().values_list(*sorted(fields))
+    df = pd.DataFrame.from_records(list(rows), columns=sorted(fields))
+
+    frame = pd.DataFrame({'isin': df['isin']})
+    for group_type in PEER_GROUPS:
+        frame[group_type] = df[group_type].fillna('').astype(str).str.strip()
+    for name, (current, legacy) in SCORE_COLUMNS.items():
+        # Same fallback as the catalog: legacy field when the current one is blank
+        raw = df[current].where(df[current].notna() & (df[current] != ''), df[legacy])
+        frame[name] = pd.to_numeric(raw.astype(str).str.strip(), errors='coerce')
+    return frame
+
+
+def compute_benchmarks(frame, refreshed_at):
+    """Build (unsaved) PeerBenchmark and CompanyPeerRank rows from company_scores_frame()."""
+    benchmarks = []
+    ranks = []
+    for group_type in PEER_GROUPS:
+        peers = frame[frame[group_type] != '']
+        if peers.empty:
+            continue
+        grouped = peers.groupby(group_type)[list(METRICS)]
+
+        counts = grouped.count()
+        means = grouped.mean()
+        mins = grouped.min()
+        maxes = grouped.max()
+        quantiles = {field: grouped.quantile(q) for field, q in PERCENTILES.items()}
+        for group_name in counts.index:
+            for metric in METRICS:
+                benchmarks.append(PeerBenchmark(
+                    group_type=group_type,
+                    group_name=group_name,
+                    metric=metric,
+                    count=int(counts.at[group_name, metric]),
+                    mean=_value(means.at[group_name, metric]),
+                    min_value=_value(mins.at[group_name, metric]),
+                    max_value=_value(maxes.at[group_name, metric]),
+                    refreshed_at=refreshed_at,
+                    **{field: _value(q.at[group_name, metric]) for field, q in quantiles.items()},
+                ))
+
+        # Percentile rank = share of peers scoring at or below the company
+        pct = grouped.rank(method='max', pct=True).mul(100)
+        for isin, group_name, values in zip(peers['isin'], peers[group_type],
+                                            pct.itertuples(index=False, name=None)):
+            ranks.append(CompanyPeerRank(
+                company_id=isin,
+                group_type=group_type,
+                group_name=group_name,
+                **{metric: _value(value, 2) for metric, value in zip(METRICS, values)},
+            ))
+    return benchmarks, ranks
+
+
+def refresh_benchmarks():
+    """Recompute all peer benchmarks and ranks. Returns (benchmark rows, rank rows)."""
+    benchmarks, ranks = compute_benchmarks(company_scores_frame(), timezone.now())
+    with transaction.atomic():
+        PeerBenchmark.objects.all().delete()
+        CompanyPeerRank.objects.all().delete()
+        PeerBenchmark.objects.bulk_create(benchmarks, batch_size=1000)
+        CompanyPeerRank.objects.bulk_create(ranks, batch_size=1000)
+    return len(benchmarks), len(ranks)
+
+
+def rank_payload(rank):
+    return {'group': rank.group_name, **{metric: getattr(rank, metric) for metric in METRICS}}
+
+
+def benchmarks_payload(group_type=None, group_name=None, isins=None):
+    """
+    Benchmarks as {group_type: {group_name: {metric: stats}}}.
+
+    Ranks are included for `isins` when given, otherwise for every company in
+    `group_name` when both group_type and group_name are given.
+    """
+    queryset = PeerBenchmark.objects.all()
+    if group_type:
+        queryset = queryset.filter(group_type=group_type)
+    if group_name:
+        queryset = queryset.filter(group_name=group_name)
+
+    benchmarks = {}
+    refreshed_at = None
+    for row in queryset:
+        group = benchmarks.setdefault(row.group_type, {}).setdefault(row.group_name, {})
+        group[row.metric] = _benchmark_stats(row)
+        refreshed_at = max(refreshed_at, row.refreshed_at) if refreshed_at else row.refreshed_at
+
+    payload = {
+        'refreshed_at': refreshed_at.isoformat() if refreshed_at else None,
+        'metrics': list(METRICS),
+        'benchmarks': benchmarks,
+    }
+
+    ranks = None
+    if isins:
+        ranks = CompanyPeerRank.objects.filter(company_id__in=isins)
+        if group_type:
+            ranks = ranks.filter(group_type=group_type)
+    elif group_type and group_name:
+        ranks = CompanyPeerRank.objects.filter(group_type=group_type, group_name=group_name)
+    if ranks is not None:
+        payload['ranks'] = {}
+        for rank in ranks.order_by('company_id', 'group_type'):
+            payload['ranks'].setdefault(rank.company_id, {})[rank.group_type] = rank_payload(rank)
+    return payload
+
+
+def _benchmark_stats(row):
+    return {
+        'count': row.count,
+        'mean': row.mean,
+        'median': row.median,
+        'p10': row.p10,
+        'p25': row.p25,
+        'p75': row.p75,
+        'p90': row.p90,
+        'min': row.min_value,
+        'max': row.max_value,
+    }
+
+
+def compare_payload(isins, peers='sector'):
+    """
+    Side-by-side scores, screens and controversy for `isins` (first one is the
+    subject), each with its percentile ranks within its `peers` group and the
+    benchmark statistics of every group involved. Returns None when the
+    subject company doesn't exist.
+    """
+    companies = (Company.objects
+                 .filter(isin__in=isins)
+                 .prefetch_related(Prefetch('peer_ranks',
+                                            queryset=CompanyPeerRank.objects.filter(group_type=peers),
+                                            to_attr='selected_ranks')))
+    by_isin = {company.isin: company for company in companies}
+    if isins[0] not in by_isin:
+        return None
+
+    rows = []
+    groups = set()
+    for isin in isins:
+        company = by_isin.get(isin)
+        if company is None:
+            continue
+        rank = company.selected_ranks[0] if company.selected_ranks else None
+        row = {'isin': company.isin, 'company_name': company.company_name}
+        for name, (current, legacy) in DICTIONARY_SOURCES.items():
+            row[name] = (getattr(company, current) or (getattr(company, legacy) if legacy else None) or '').strip() or None
+        row['scores'] = {name: to_float(getattr(company, current) or getattr(company, legacy))
+                         for name, (current, legacy) in SCORE_COLUMNS.items()}
+        row['percentile_ranks'] = rank_payload(rank) if rank else None
+        if rank:
+            groups.add(rank.group_name)
+        rows.append(row)
+
+    peer_benchmarks = {}
+    for row in PeerBenchmark.objects.filter(group_type=peers, group_name__in=groups):
+        peer_benchmarks.setdefault(row.group_name, {})[row.metric] = _benchmark_stats(row)
+
+    return {
+        'peers': peers,
+        'metrics': list(METRICS),
+        'companies': rows,
+        'missing': [isin for isin in isins if isin not in by_isin],
+        'peer_benchmarks': peer_benchmarks,
+    }
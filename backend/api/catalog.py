@@ -0,0 +1,155 @@
+"""
+Cached, pre-encoded snapshots of the public company catalog.
+
+The snapshot key is derived from the Company table itself (row count and
+latest updated_at), so every process sees a new version as soon as an
+ingest or an admin edit commits, whatever cache backend is configured.
+Code that changes companies with QuerySet.update() must also set
+updated_at for the new version to be picked up.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .metrics import cache_lookup
+from .models import Company
+from .renderers import encode_json, encode_msgpack
+from .serializers import CompanyListSerializer
+
+CATALOG_CACHE_PREFIX = 'catalog:'
+
+
+def catalog_queryset():
+    return (Company.objects
+            .filter(company_name__isnull=False)
+            .exclude(company_name__exact='')
+            .order_by('company_name'))
+
+
+def _version(stats):
+    updated = stats['updated'].timestamp() if stats['updated'] else 0
+    return f"{stats['rows']}-{updated:.6f}"
+
+
+def catalog_version():
+    """Cheap fingerprint of the Company table that changes on every write."""
+    return _version(Company.objects.aggregate(rows=Count('isin'), updated=Max('updated_at')))
+
+
+async def acatalog_version():
+    return _version(await Company.objects.aaggregate(rows=Count('isin'), updated=Max('updated_at')))
+
+
+def get_catalog_snapshot(name, build, encode=encode_json):
+    """
+    Return the encoded bytes for catalog view `name`, building them with
+    `encode(build())` on a cache miss.
+    """
+    key = f'{CATALOG_CACHE_PREFIX}{name}:{catalog_version()}'
+    payload = cache.get(key)
+    cache_lookup('catalog', payload is not None)
+    if payload is None:
+        payload = encode(build())
+        cache.set(key, payload, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+    return payload
+
+
+async def aget_catalog_snapshot(name, build, encode=encode_json):
+    """get_catalog_snapshot() for async views; a miss is built in a worker thread."""
+    key = f'{CATALOG_CACHE_PREFIX}{name}:{await acatalog_version()}'
+    payload = await cache.aget(key)
+    cache_lookup('catalog', payload is not None)
+    if payload is None:
+        payload = await sync_to_async(lambda: encode(build()))()
+        await cache.aset(key, payload, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+    return payload
+
+
+def _company_list():
+    return CompanyListSerializer(catalog_queryset(), many=True).data
+
+
+def company_list_payload():
+    return get_catalog_snapshot('companies', _company_list)
+
+
+async def acompany_list_payload():
+    return await aget_catalog_snapshot('companies', _company_list)
+
+
+# Columnar catalog for the comparison tool: one array per field instead of one
+# object per company. Low-cardinality text fields are dictionary-encoded
+# (an index into `dictionaries[field]`, null when blank) and scores are numbers.
+CATALOG_COLUMNS_FORMAT_VERSION = 1
+DICTIONARY_COLUMNS = ('sector', 'esg_sector', 'grade', 'positive', 'negative', 'controversy')
+# Column name -> (current field, legacy field used when the current one is blank)
+SCORE_COLUMNS = {
+    'e_score': ('e_pillar', 'e_score'),
+    's_score': ('s_pillar', 's_score'),
+    'g_score': ('g_pillar', 'g_score'),
+    'esg_score': ('esg_pillar', 'esg_score'),
+    'composite': ('composite_rating', 'composite'),
+}
+# Column name -> (current field, legacy field) for the dictionary columns
+DICTIONARY_SOURCES = {
+    'sector': ('sector', None),
+    'esg_sector': ('esg_sector', None),
+    'grade': ('esg_rating', 'grade'),
+    'positive': ('positive_screen', 'positive'),
+    'negative': ('negative_screen', 'negative'),
+    'controversy': ('controversy_rating', 'controversy'),
+}
+
+
+def to_float(value):
+    """A score cell as a float; None when it is blank or not a number."""
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def company_columns():
+    """Build the columnar catalog from the Company table."""
+    fields = {'isin', 'company_name', 'pdf_filename'}
+    for current, legacy in (*SCORE_COLUMNS.values(), *DICTIONARY_SOURCES.values()):
+        fields.update(f for f in (current, legacy) if f)
+    rows = catalog_queryset().values_list(*sorted(fields), named=True)
+
+    dictionaries = {name: [] for name in DICTIONARY_COLUMNS}
+    lookups = {name: {} for name in DICTIONARY_COLUMNS}
+    columns = {'isin': [], 'company_name': [], 'has_pdf_report': []}
+    columns.update({name: [] for name in DICTIONARY_COLUMNS})
+    columns.update({name: [] for name in SCORE_COLUMNS})
+
+    for row in rows:
+        columns['isin'].append(row.isin)
+        columns['company_name'].append(row.company_name)
+        columns['has_pdf_report'].append(bool(row.pdf_filename and row.pdf_filename.strip()))
+        for name, (current, legacy) in DICTIONARY_SOURCES.items():
+            value = (getattr(row, current) or (getattr(row, legacy) if legacy else None) or '').strip()
+            if not value:
+                columns[name].append(None)
+                continue
+            index = lookups[name].get(value)
+            if index is None:
+                index = lookups[name][value] = len(dictionaries[name])
+                dictionaries[name].append(value)
+            columns[name].append(index)
+        for name, (current, legacy) in SCORE_COLUMNS.items():
+            columns[name].append(to_float(getattr(row, current) or getattr(row, legacy)))
+
+    return {
+        'format_version': CATALOG_COLUMNS_FORMAT_VERSION,
+        'count': len(columns['isin']),
+        'dictionaries': dictionaries,
+        'columns': columns,
+    }
+
+
+def company_columns_payload(fmt='json'):
+    """Encoded columnar catalog; `fmt` is the accepted renderer format."""
+    if fmt == 'msgpack':
+        return get_catalog_snapshot('company-columns-msgpack', company_columns, encode_msgpack)
+    return get_catalog_snapshot('company-columns-json', company_columns)
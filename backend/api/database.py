@@ -0,0 +1,156 @@
+"""
+Database connection helpers: read-replica routing and pool statistics.
+
+Read replica
+------------
+When settings.DATABASES has a "replica" alias (DB_REPLICA_HOST), reads made
+inside a replica_reads view, or a view using ReplicaReadsMixin, go to the
+replica; everything else, and every write, uses "default". Views opt in
+explicitly because only some reads can tolerate replication lag: the public
+catalog, funds, articles, benchmarks and admin exports.
+
+A user who has just written something should see it, so
+api.middleware.ReplicaPinMiddleware pins the user to the primary for
+DB_REPLICA_PIN_SECONDS after any successful unsafe request (see pin_user).
+Reads inside a transaction on the primary also stay on the primary.
+
+Pools
+-----
+With DB_POOL=True (see settings.py) each worker process keeps a psycopg 3
+connection pool per database. pool_stats() reports its size and usage
+counters (psycopg_pool's get_stats(): pool_size, pool_available,
+requests_waiting, requests_wait_ms, connections_num, ...).
+"""
+import contextvars
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DB_ALIAS = 'replica'
+REPLICA_PIN_CACHE_PREFIX = 'db:pin:'
+
+# True while a replica-tolerant view is running
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def read_alias():
+    """Database the current context reads from: the replica inside replica views."""
+    if (_replica_reads.get() and replica_configured()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+        return REPLICA_DB_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+# =========================
+# Read-your-writes pinning
+# =========================
+def pin_user(user_id):
+    """Send `user_id`'s reads to the primary for DB_REPLICA_PIN_SECONDS."""
+    if replica_configured():
+        cache.set(f'{REPLICA_PIN_CACHE_PREFIX}{user_id}', True,
+                  getattr(settings, 'DB_REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned(user_id):
+    return bool(user_id) and cache.get(f'{REPLICA_PIN_CACHE_PREFIX}{user_id}', False)
+
+
+def _use_replica(request):
+    return (replica_configured() and request.method in SAFE_METHODS
+            and not is_pinned(getattr(getattr(request, 'user', None), 'pk', None)))
+
+
+# =========================
+# Opting views in
+# =========================
+def replica_reads(view):
+    """
+    Let `view` read from the replica. Put it below @api_view, so that it
+    runs after authentication and can see which user is pinned.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            # request.user may be a lazy session lookup, and is_pinned() reads the cache
+            token = _replica_reads.set(await sync_to_async(_use_replica)(request))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_reads.set(_use_replica(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+class ReplicaReadsMixin:
+    """APIView mixin: safe-method requests read from the replica."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._replica_token = _replica_reads.set(_use_replica(request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """Routes reads to the replica inside replica_reads views; see module docstring."""
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema through replication
+        return db != REPLICA_DB_ALIAS
+
+
+# =========================
+# Pools
+# =========================
+def pool_stats():
+    """{alias: pool statistics} for every database that uses a connection pool."""
+    stats = {}
+    for alias in connections:
+        # Only the PostgreSQL backend has a pool (None unless OPTIONS["pool"] is set)
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+    return stats
+
+
+def connection_settings():
+    """How each database reuses connections: pooled, persistent (max age) or per request."""
+    return {
+        alias: {
+            'pool': bool(connections.settings[alias].get('OPTIONS', {}).get('pool')),
+            'conn_max_age': connections.settings[alias].get('CONN_MAX_AGE', 0),
+            'conn_health_checks': connections.settings[alias].get('CONN_HEALTH_CHECKS', False),
+        }
+        for alias in connections
+    }
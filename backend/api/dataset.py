@@ -0,0 +1,127 @@
+"""
+Company and fund datasets for the frontend, published once per ingest.
+
+The Comparison and Report pages used to download public/data.xlsx and parse
+it in the browser. Instead, each Excel ingest calls publish_dataset(), which
+serializes both datasets from the database, hashes the JSON, and stores it
+gzip- and brotli-compressed in a DatasetSnapshot. The JSON is served from
+/api/dataset/<version>/ with an immutable Cache-Control, so browsers and
+CDNs only download it again when the data actually changes.
+
+The current version is the most recently published snapshot. Data that
+goes back to an earlier state hashes to that earlier snapshot, which is
+published again rather than stored twice. Only the DATASET_KEEP_VERSIONS
+most recently published snapshots are kept.
+"""
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Company, DatasetSnapshot, Fund
+from .renderers import encode_json
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+DATASET_FORMAT_VERSION = 1
+
+
+def _number(value):
+    """Score as a number, 0 when blank or unparseable (as the Excel parser did)."""
+    try:
+        return float(value) if value not in (None, '') else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def build_dataset():
+    """Datasets in the row shapes of frontend/lib/excel-data.ts."""
+    companies = [
+        {
+            'companyName': c.company_name,
+            'sector': c.sector or '',
+            'e_score': _number(c.e_pillar or c.e_score),
+            's_score': _number(c.s_pillar or c.s_score),
+            'g_score': _number(c.g_pillar or c.g_score),
+            'positive': c.positive_screen or c.positive or '',
+            'negative': c.negative_screen or c.negative or '',
+            'controversy': c.controversy_rating or c.controversy or '',
+            'grade': c.esg_rating or c.grade or '',
+            'isin': c.isin,
+            'esgScore': _number(c.esg_pillar or c.esg_score),
+            'composite': _number(c.composite_rating or c.composite),
+        }
+        for c in (Company.objects
+                  .filter(company_name__isnull=False)
+                  .exclude(company_name__exact='')
+                  .order_by('company_name', 'isin'))
+    ]
+    funds = [
+        {
+            'fundName': f.fund_name,
+            'score': f.score or 0,
+            'percentage': f.percentage or '',
+            'grade': f.grade or '',
+            'companyIsins': f.company_isins or '',
+        }
+        for f in Fund.objects.order_by('fund_name')
+    ]
+    return {'format_version': DATASET_FORMAT_VERSION, 'companies': companies, 'funds': funds}
+
+
+def _without_content():
+    return DatasetSnapshot.objects.defer('content', 'content_gzip', 'content_brotli')
+
+
+def publish_dataset():
+    """
+    Snapshot the current datasets and make them the current version.
+    Returns (snapshot, created): a dataset that hashes to an existing version
+    reuses that snapshot, republishing it if another version is current.
+    """
+    dataset = build_dataset()
+    content = encode_json(dataset)
+    version = hashlib.sha256(content).hexdigest()[:20]
+
+    existing = _without_content().filter(version=version).first()
+    if existing is None:
+        try:
+            with transaction.atomic():
+                snapshot = DatasetSnapshot.objects.create(
+                    version=version,
+                    content=content,
+                    content_gzip=gzip.compress(content, compresslevel=9, mtime=0),
+                    content_brotli=brotli.compress(content, quality=11) if brotli else None,
+                    company_count=len(dataset['companies']),
+                    fund_count=len(dataset['funds']),
+                )
+        except IntegrityError:  # published concurrently
+            existing = _without_content().get(version=version)
+        else:
+            prune_datasets()
+            return snapshot, True
+
+    if _without_content().first().pk != existing.pk:
+        existing.published_at = timezone.now()
+        existing.save(update_fields=['published_at'])
+    return existing, False
+
+
+def prune_datasets(keep=None):
+    """Delete all but the `keep` (DATASET_KEEP_VERSIONS) most recently published snapshots."""
+    keep = keep or getattr(settings, 'DATASET_KEEP_VERSIONS', 10)
+    stale = list(DatasetSnapshot.objects.values_list('pk', flat=True)[keep:])
+    return DatasetSnapshot.objects.filter(pk__in=stale).delete()[0] if stale else 0
+
+
+def current_dataset():
+    """Latest snapshot, publishing one first if none exists yet."""
+    snapshot = _without_content().first()
+    if snapshot is None:
+        snapshot, _ = publish_dataset()
+    return snapshot
@@ -0,0 +1,144 @@
+"""
+Streaming reader for ingestion workbooks.
+
+pd.read_excel loads the whole sheet into memory and infers dtypes for every
+column. The ingest commands only need a dozen columns read once, top to
+bottom, so iter_rows() streams the sheet instead: python-calamine when it is
+installed, otherwise openpyxl in read_only mode. Rows come back as tuples of
+the requested columns, typed as stored in the workbook (str, int, float,
+datetime or None for blank cells). Strings pandas reads as NaN by default
+("None", "N/A", "NULL", ...) also come back as None, so switching an ingest
+command to this reader doesn't change what it stores.
+"""
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # optional, faster engine
+    CalamineWorkbook = None
+
+# pandas' default na_values for read_excel
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+
+
+def strip_header(value):
+    return str(value).strip()
+
+
+def snake_header(value):
+    """'Company Name ' -> 'company_name'."""
+    return str(value).strip().lower().replace(' ', '_')
+
+
+def _positions(header, columns, normalize):
+    """Index of each requested column in `header` (None when absent)."""
+    index = {}
+    for position, value in enumerate(header):
+        if value is not None:
+            index.setdefault(normalize(value), position)
+    return [index.get(column) for column in columns]
+
+
+def _cell(row, position):
+    if position is None or position >= len(row):
+        return None
+    value = row[position]
+    if isinstance(value, str) and value in NA_STRINGS:
+        return None
+    return value
+
+
+def _project(rows, positions):
+    for row in rows:
+        yield tuple(_cell(row, p) for p in positions)
+
+
+def _calamine_rows(path, sheet, columns, normalize):
+    workbook = CalamineWorkbook.from_path(str(path))
+    if sheet is None:
+        worksheet = workbook.get_sheet_by_index(0)
+    else:
+        worksheet = workbook.get_sheet_by_name(sheet)
+    rows = worksheet.iter_rows()
+    # calamine reports blank cells as '', which _project() maps to None
+    yield from _project(rows, _positions(next(rows, ()), columns, normalize))
+
+
+def _openpyxl_rows(path, sheet, columns, normalize):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0] if sheet is None else workbook[sheet]
+        header = next(worksheet.iter_rows(max_row=1, values_only=True), ())
+        positions = _positions(header, columns, normalize)
+        present = [p for p in positions if p is not None]
+        if not present:
+            return
+        # Only parse the span of columns we need
+        offset = min(present)
+        rows = worksheet.iter_rows(min_row=2, min_col=offset + 1, max_col=max(present) + 1,
+                                   values_only=True)
+        yield from _project(rows, [None if p is None else p - offset for p in positions])
+    finally:
+        workbook.close()
+
+
+def sheet_names(path):
+    """Sheet names in workbook order."""
+    if CalamineWorkbook is not None:
+        return list(CalamineWorkbook.from_path(str(path)).sheet_names)
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def header_names(path, sheet=None, normalize=strip_header):
+    """Normalized names of the non-blank header cells of `sheet`."""
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_path(str(path))
+        if sheet is None:
+            worksheet = workbook.get_sheet_by_index(0)
+        else:
+            worksheet = workbook.get_sheet_by_name(sheet)
+        header = next(worksheet.iter_rows(), ())
+    else:
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0] if sheet is None else workbook[sheet]
+            header = next(worksheet.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+    return {normalize(value) for value in header if value not in (None, '')}
+
+
+def iter_rows(path, columns, sheet=None, normalize=strip_header):
+    """
+    Yield one tuple per data row with the values of `columns`, in that order.
+
+    Headers are read from the first row and compared after `normalize`;
+    columns missing from the sheet yield None. Rows where every requested
+    value is blank are skipped. `sheet` defaults to the first sheet, like
+    pd.read_excel.
+    """
+    columns = list(columns)
+    reader = _calamine_rows if CalamineWorkbook is not None else _openpyxl_rows
+    for values in reader(path, sheet, columns, normalize):
+        if any(value is not None for value in values):
+            yield values
+
+
+def iter_records(path, columns, sheet=None, normalize=strip_header):
+    """Like iter_rows(), but yield {column: value} dicts."""
+    columns = list(columns)
+    for values in iter_rows(path, columns, sheet, normalize):
+        yield dict(zip(columns, values))
+
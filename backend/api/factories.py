@@ -0,0 +1,136 @@
+"""
+Synthetic data for benchmarks: companies, users, assignments, portfolios,
+purchase logs and ingestion workbooks at any scale, plus the percentile()
+the benchmark commands report latencies with.
+
+Everything is written with bulk_create and is deterministic for a given
+size, so runs at the same scale are comparable across commits. Users share
+one pre-computed password hash (hashing is deliberately slow). ISINs are
+12 characters starting with "IN", which is what the portfolio endpoint
+treats as an ISIN.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from .loaders import CompanyLoader, FundLoader
+from .models import Company, CustomUser, Fund, Portfolio, PortfolioCompany, PurchaseLog, UserCompany
+
+BATCH_SIZE = 1000
+PASSWORD = 'benchmark'
+SECTORS = ('Banks', 'IT Services', 'Pharmaceuticals', 'Automobiles', 'Power', 'FMCG', 'Cement', 'Telecom')
+GRADES = ('A+', 'A', 'B+', 'B', 'C+', 'C')
+
+
+def isin(i):
+    return f'INBENCH{i:05d}'
+
+
+def synthetic_companies(n):
+    """`n` unsaved companies shaped like the ingested catalog."""
+    now = timezone.now()
+    companies = []
+    for i in range(n):
+        e, s, g = (str(round(40 + (i * k) % 60, 2)) for k in (7, 11, 13))
+        companies.append(Company(
+            isin=isin(i), company_name=f'Benchmark Company {i:05d}', sr_no=str(i + 1),
+            nse_symbol=f'BENCH{i}', sector=SECTORS[i % len(SECTORS)],
+            esg_sector=SECTORS[(i // 3) % len(SECTORS)], market_cap=str(1000 + i),
+            e_pillar=e, s_pillar=s, g_pillar=g, esg_pillar=e, composite_rating=s,
+            esg_rating=GRADES[i % len(GRADES)], grade=GRADES[i % len(GRADES)],
+            e_score=e, s_score=s, g_score=g, esg_score=e, composite=s,
+            updated_at=now,
+        ))
+    return companies
+
+
+def make_companies(n):
+    return Company.objects.bulk_create(synthetic_companies(n), batch_size=BATCH_SIZE)
+
+
+def make_users(m, prefix='user', is_staff=False):
+    password = make_password(PASSWORD)
+    return CustomUser.objects.bulk_create([
+        CustomUser(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password,
+                   first_name='Bench', last_name=f'User {i}', organization='Benchmarks', is_staff=is_staff)
+        for i in range(m)
+    ], batch_size=BATCH_SIZE)
+
+
+def make_assignments(users, companies, k, assigned_by=None):
+    """`k` active assignments spread evenly: user i gets companies i, i + len(users), ... (mod N)."""
+    if k > len(users) * len(companies):
+        raise ValueError(f'{k} assignments need more than {len(users)} users x {len(companies)} companies')
+    return UserCompany.objects.bulk_create([
+        UserCompany(user=users[i % len(users)],
+                    company=companies[(i // len(users) + i % len(users)) % len(companies)],
+                    assigned_by=assigned_by)
+        for i in range(k)
+    ], batch_size=BATCH_SIZE)
+
+
+def make_portfolio(user, companies, size, name='Benchmark portfolio'):
+    portfolio = Portfolio.objects.create(user=user, name=name)
+    PortfolioCompany.objects.bulk_create([
+        PortfolioCompany(portfolio=portfolio, company=companies[i % len(companies)], aum_value=float(i + 1))
+        for i in range(size)
+    ], batch_size=BATCH_SIZE)
+    return portfolio
+
+
+def portfolio_input(companies, size, name='Benchmark portfolio'):
+    """Body for POST /api/portfolio/ holding the first `size` companies."""
+    return [{'id_key': companies[i % len(companies)].isin, 'aum': float(i + 1)} for i in range(size)]
+
+
+def make_purchase_logs(users, companies, n):
+    """`n` logs, one second apart going back from now, cycling through users and companies."""
+    now = timezone.now()
+    return PurchaseLog.objects.bulk_create([
+        PurchaseLog(user=users[i % len(users)], user_id_recorded=users[i % len(users)].pk,
+                    company_name=companies[i % len(companies)].company_name,
+                    timestamp=now - timedelta(seconds=i))
+        for i in range(n)
+    ], batch_size=BATCH_SIZE)
+
+
+def make_funds(n, companies):
+    return Fund.objects.bulk_create([
+        Fund(fund_name=f'Benchmark Fund {i}', score=50.0 + i % 50, grade=GRADES[i % len(GRADES)],
+             company_isins=','.join(c.isin for c in companies[i:i + 10]))
+        for i in range(n)
+    ], batch_size=BATCH_SIZE)
+
+
+def write_workbook(path, companies=None, funds=None):
+    """
+    Write an ingestion workbook to `path`: the Company and Fund tables, or
+    the given `companies` / `funds` (e.g. synthetic_companies() for a
+    workbook of any size without touching the database).
+    """
+    import openpyxl  # only needed to write workbooks
+
+    if companies is None:
+        companies = Company.objects.order_by('isin').iterator()
+    if funds is None:
+        funds = Fund.objects.order_by('fund_name').iterator()
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(CompanyLoader.sheet)
+    sheet.append(CompanyLoader.columns)
+    for c in companies:
+        sheet.append((c.sr_no, c.isin, c.company_name, c.bse_symbol, c.nse_symbol, c.sector, c.industry,
+                      c.esg_sector, c.market_cap, c.e_pillar, c.s_pillar, c.g_pillar, c.esg_pillar,
+                      c.positive_screen, c.negative_screen, c.controversy_rating, c.composite_rating,
+                      c.esg_rating))
+    sheet = workbook.create_sheet(FundLoader.sheet)
+    sheet.append((*FundLoader.columns, *FundLoader.optional_columns))
+    for f in funds:
+        sheet.append((f.fund_name, f.score, f.percentage, f.grade, f.company_isins))
+    workbook.save(path)
+
+
+def percentile(values, q):
+    """Nearest-rank `q` quantile (0-1) of `values`, or None when there are none."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
@@ -0,0 +1,115 @@
+"""
+Password hashers with settings-driven cost and a bounded hashing pool.
+
+PASSWORD_HASH_POLICY in settings picks the preferred hasher (pbkdf2, scrypt or
+argon2); password_hashers() lists the others after it, then Django's default
+hashers (bcrypt, PBKDF2-SHA1, ...), so existing hashes keep verifying. Django
+rehashes a password on the next successful login whenever its stored
+algorithm or cost differs from the preferred hasher, so changing the policy
+or its parameters migrates users transparently.
+
+Hashing runs on a process-wide executor (PASSWORD_HASH_EXECUTOR = "thread",
+"process" or "inline") capped at PASSWORD_HASH_WORKERS. hashlib and
+argon2-cffi release the GIL, so under threaded workers a login storm is held
+to that many cores while other requests keep running.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import global_settings, settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+from django.utils.module_loading import import_string
+
+PASSWORD_HASH_POLICIES = {
+    'pbkdf2': 'api.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'api.hashers.TunedScryptPasswordHasher',
+    'argon2': 'api.hashers.TunedArgon2PasswordHasher',
+}
+
+
+def password_hashers(policy):
+    """PASSWORD_HASHERS for a policy: its hasher, the other tuned ones, then Django's defaults."""
+    preferred = PASSWORD_HASH_POLICIES[policy]
+    tuned = [preferred, *(hasher for hasher in PASSWORD_HASH_POLICIES.values() if hasher != preferred)]
+    return tuned + [hasher for hasher in global_settings.PASSWORD_HASHERS if hasher not in tuned]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_hash_executor():
+    """Return the shared hashing executor, or None when hashing runs inline."""
+    global _executor
+    mode = getattr(settings, 'PASSWORD_HASH_EXECUTOR', 'thread')
+    if mode == 'inline':
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+                if mode == 'process':
+                    _executor = ProcessPoolExecutor(max_workers=workers)
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=workers,
+                                                   thread_name_prefix='password-hash')
+    return _executor
+
+
+def _run_unpooled(hasher_path, method, args):
+    """Run a hasher method directly; executed inside the pool."""
+    hasher = import_string(hasher_path)()
+    _local.in_pool = True
+    try:
+        return getattr(super(PooledHasherMixin, hasher), method)(*args)
+    finally:
+        _local.in_pool = False
+
+
+class PooledHasherMixin:
+    """Send encode() and verify() to the hashing executor."""
+
+    def _offload(self, method, *args):
+        executor = get_hash_executor()
+        if executor is None or getattr(_local, 'in_pool', False):
+            return getattr(super(), method)(*args)
+        hasher_path = f'{type(self).__module__}.{type(self).__qualname__}'
+        return executor.submit(_run_unpooled, hasher_path, method, args).result()
+
+    def encode(self, *args):
+        return self._offload('encode', *args)
+
+    def verify(self, password, encoded):
+        return self._offload('verify', password, encoded)
+
+
+class TunedPBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_PBKDF2_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+
+
+class TunedScryptPasswordHasher(PooledHasherMixin, ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return getattr(settings, 'PASSWORD_HASH_SCRYPT_WORK_FACTOR', None) or ScryptPasswordHasher.work_factor
+
+
+class TunedArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return getattr(settings, 'PASSWORD_HASH_ARGON2_TIME_COST', None) or Argon2PasswordHasher.time_cost
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'PASSWORD_HASH_ARGON2_MEMORY_COST', None) or Argon2PasswordHasher.memory_cost
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'PASSWORD_HASH_ARGON2_PARALLELISM', None) or Argon2PasswordHasher.parallelism
@@ -0,0 +1,87 @@
+"""
+Score history: one CompanyScoreSnapshot per (ISIN, vintage).
+
+Excel ingests overwrite Company in place, so record_score_snapshots() runs
+after each one and appends the current scores under the ingest's vintage
+(today unless given). A company whose scores and grade match its snapshot
+as of that vintage (the latest one on or before it) gets no new row, so
+history only grows when ratings change; a backfill of an older vintage is
+compared with what was recorded before it, not with later snapshots.
+Re-ingesting on the same vintage updates that vintage's row in place.
+"""
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .catalog import DICTIONARY_SOURCES, SCORE_COLUMNS, catalog_queryset, to_float
+from .models import CompanyScoreSnapshot
+
+METRICS = tuple(SCORE_COLUMNS)
+SNAPSHOT_FIELDS = (*METRICS, 'grade')
+MAX_HISTORY_COMPANIES = 100
+
+
+def current_scores():
+    """{isin: {metric: float|None, 'grade': str|None}} from the Company table."""
+    grade_fields = DICTIONARY_SOURCES['grade']
+    fields = {'isin', *grade_fields}
+    for current, legacy in SCORE_COLUMNS.values():
+        fields.update((current, legacy))
+
+    scores = {}
+    for row in catalog_queryset().values_list(*sorted(fields), named=True):
+        values = {name: to_float(getattr(row, current) or getattr(row, legacy))
+                  for name, (current, legacy) in SCORE_COLUMNS.items()}
+        grade = (getattr(row, grade_fields[0]) or getattr(row, grade_fields[1]) or '').strip()
+        values['grade'] = grade or None
+        scores[row.isin] = values
+    return scores
+
+
+def latest_snapshots(as_of=None):
+    """{isin: latest CompanyScoreSnapshot with vintage <= as_of (default: any)}, in one query."""
+    snapshots = CompanyScoreSnapshot.objects.all()
+    if as_of is not None:
+        snapshots = snapshots.filter(vintage__lte=as_of)
+    latest_vintage = (snapshots
+                      .filter(isin=OuterRef('isin'))
+                      .order_by('-vintage')
+                      .values('vintage')[:1])
+    return {snapshot.isin: snapshot for snapshot in snapshots.filter(vintage=Subquery(latest_vintage))}
+
+
+def record_score_snapshots(vintage=None):
+    """Snapshot every company's scores. Returns (created, updated, unchanged)."""
+    vintage = vintage or timezone.localdate()
+    latest = latest_snapshots(as_of=vintage)
+
+    snapshots, created, updated, unchanged = [], 0, 0, 0
+    for isin, values in current_scores().items():
+        previous = latest.get(isin)
+        if previous and all(getattr(previous, field) == values[field] for field in SNAPSHOT_FIELDS):
+            unchanged += 1
+            continue
+        if previous and previous.vintage == vintage:
+            updated += 1
+        else:
+            created += 1
+        snapshots.append(CompanyScoreSnapshot(isin=isin, vintage=vintage, **values))
+
+    # Upsert: a vintage that already has a row (same-day re-ingest, backfill) is overwritten
+    with transaction.atomic():
+        CompanyScoreSnapshot.objects.bulk_create(
+            snapshots, batch_size=1000, update_conflicts=True,
+            unique_fields=['isin', 'vintage'], update_fields=list(SNAPSHOT_FIELDS))
+    return created, updated, unchanged
+
+
+def history_payload(isins):
+    """{isin: [{'vintage': ..., metric: ..., 'grade': ...}, ...]} oldest first, in one query."""
+    history = {isin: [] for isin in isins}
+    rows = (CompanyScoreSnapshot.objects
+            .filter(isin__in=isins)
+            .order_by('isin', 'vintage')
+            .values_list('isin', 'vintage', *SNAPSHOT_FIELDS))
+    for isin, vintage, *values in rows:
+        history[isin].append({'vintage': vintage.isoformat(), **dict(zip(SNAPSHOT_FIELDS, values))})
+    return history
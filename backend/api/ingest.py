@@ -0,0 +1,156 @@
+"""
+Change-detecting Excel sync.
+
+Every ingested row is normalized to a dict of model field values and hashed.
+A sync compares each workbook row with the hash of the stored row over the
+same fields and only writes rows that differ, so the database is the
+reference even when rows were edited elsewhere (the admin, load_excel_data).
+IngestManifestEntry keeps the hash last written for each (sheet, key), and
+keys that disappeared from the workbook are flagged there (removed_at)
+rather than deleted. Re-syncing an unchanged workbook is one read of the
+table and the manifest plus a hash pass, with no writes.
+"""
+import hashlib
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from .benchmarks import refresh_benchmarks
+from .dataset import publish_dataset
+from .history import record_score_snapshots
+from .models import IngestManifestEntry
+
+
+def row_hash(data):
+    """Stable hash of a normalized row."""
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def plan_sync(sheet, rows, force=False, stored_rows=None):
+    """
+    Diff `rows` ({key: normalized data}) against the database for `sheet`.
+
+    Returns a dict with the created, updated, removed and unchanged keys
+    (sorted lists) and the new hash for every key to write. A row is
+    unchanged when the stored row hashes the same over the workbook's
+    fields, so edits made outside the ingest (the admin, load_excel_data)
+    are written back rather than skipped. `stored_rows(rows)` returns
+    {key: stored field values} for the keys that have a database row;
+    without it the manifest hashes stand in for the table. With `force`,
+    every row in the workbook is treated as changed.
+    """
+    manifest = {entry.key: entry
+                for entry in IngestManifestEntry.objects.filter(sheet=sheet).only('key', 'row_hash', 'removed_at')}
+    hashes = {key: row_hash(data) for key, data in rows.items()}
+    if stored_rows is not None:
+        stored = {key: row_hash({field: values[field] for field in rows[key]})
+                  for key, values in stored_rows(rows).items()}
+    else:
+        stored = {key: entry.row_hash for key, entry in manifest.items()}
+
+    created, updated, unchanged = [], [], []
+    for key, digest in hashes.items():
+        entry = manifest.get(key)
+        if key not in stored:
+            created.append(key)
+        elif force or stored[key] != digest or entry is None or entry.removed_at is not None:
+            updated.append(key)
+        else:
+            unchanged.append(key)
+    removed = [key for key, entry in manifest.items() if key not in hashes and entry.removed_at is None]
+
+    return {
+        'sheet': sheet,
+        'created': sorted(created),
+        'updated': sorted(updated),
+        'removed': sorted(removed),
+        'unchanged': sorted(unchanged),
+        'hashes': {key: hashes[key] for key in (*created, *updated)},
+    }
+
+
+def has_changes(plan):
+    """True if a plan (or its summary) creates, updates or removes anything."""
+    return bool(plan['created'] or plan['updated'] or plan['removed'])
+
+
+def summarize(plan):
+    """The plan without hashes, with counts, for reports."""
+    report = {name: plan[name] for name in ('sheet', 'created', 'updated', 'removed', 'unchanged')}
+    report['counts'] = {name: len(plan[name]) for name in ('created', 'updated', 'removed', 'unchanged')}
+    return report
+
+
+def _save_manifest(plan, now):
+    """Record the hashes written by `plan` and flag its removed keys."""
+    sheet = plan['sheet']
+    IngestManifestEntry.objects.bulk_create(
+        [IngestManifestEntry(sheet=sheet, key=key, row_hash=digest, removed_at=None, updated_at=now)
+         for key, digest in plan['hashes'].items()],
+        batch_size=1000, update_conflicts=True,
+        unique_fields=['sheet', 'key'], update_fields=['row_hash', 'removed_at', 'updated_at'])
+    if plan['removed']:
+        (IngestManifestEntry.objects
+         .filter(sheet=sheet, key__in=plan['removed'])
+         .update(removed_at=now, updated_at=now))
+
+
+def stored_rows_for(model, key_field):
+    """stored_rows callable for plan_sync(): the `model` rows, limited to the workbook's fields."""
+    def stored_rows(rows):
+        fields = {key_field}.union(*rows.values())
+        # One pass over the table: the workbook normally covers most of it
+        return {values[key_field]: values
+                for values in model.objects.values(*fields).iterator(chunk_size=2000)
+                if values[key_field] in rows}
+    return stored_rows
+
+
+def apply_sync(plan, rows, model, key_field):
+    """
+    Write the rows `plan` marks as created or updated, then the manifest, in
+    one transaction. Changed rows are written with every field of the
+    workbook row, so the database matches the hash recorded for it. Rows
+    flagged as removed are left in place.
+    """
+    now = timezone.now()
+    changed = [*plan['created'], *plan['updated']]
+    with transaction.atomic():
+        existing = model.objects.in_bulk(changed, field_name=key_field)
+        to_create, to_update, fields = [], [], set()
+        for key in changed:
+            data = rows[key]
+            obj = existing.get(key)
+            if obj is None:
+                to_create.append(model(**data))
+                continue
+            for field, value in data.items():
+                if field != model._meta.pk.name:
+                    setattr(obj, field, value)
+                    fields.add(field)
+            to_update.append(obj)
+
+        if to_update and any(f.name == 'updated_at' for f in model._meta.fields):
+            # bulk_update() skips auto_now; the catalog version depends on updated_at
+            for obj in to_update:
+                obj.updated_at = now
+            fields.add('updated_at')
+
+        model.objects.bulk_create(to_create, batch_size=1000)
+        if to_update:
+            model.objects.bulk_update(to_update, sorted(fields), batch_size=1000)
+        _save_manifest(plan, now)
+    return len(to_create), len(to_update)
+
+
+def after_ingest(vintage=None):
+    """
+    Refresh everything derived from the Company and Fund tables: score
+    history, peer benchmarks and the published dataset.
+    """
+    history = record_score_snapshots(vintage)
+    benchmarks = refresh_benchmarks()
+    snapshot, published = publish_dataset()
+    return {'history': history, 'benchmarks': benchmarks, 'dataset': (snapshot.version, published)}
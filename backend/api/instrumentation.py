@@ -0,0 +1,159 @@
+"""
+Per-request metrics: SQL query count, DB time, serializer time and latency.
+
+RequestMetricsMiddleware (api.middleware) keeps a RequestMetrics for the
+current request in a context variable. Every database connection gets an
+execute wrapper, installed when it connects, that adds each query and its
+time to it; DRF's serializer .data, where instances become primitives and
+lazy querysets and related objects get fetched, is timed the same way.
+Context variables follow sync_to_async, so queries from async views count
+too. Queries made while a StreamingHttpResponse is being sent (the purchase
+log export) run after the middleware has returned and are not counted.
+
+QUERY_BUDGETS_FILE maps URL names to the most queries one request may
+make. QUERY_BUDGET_ACTION says what happens when a request goes over:
+"warn" logs a warning, "fail" raises QueryBudgetExceeded (for tests),
+"off" does nothing.
+
+The same numbers feed the Prometheus request metrics (api.metrics).
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import observe_request
+
+logger = logging.getLogger('api.requests')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestMetrics:
+    __slots__ = ('start', 'queries', 'db_seconds', 'serializer_seconds', 'serializing')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def start_request():
+    """Start collecting metrics for this context; returns (metrics, token for end_request)."""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Also fires on reconnects and pool checkouts; the wrapper list outlives them.
+    # Outermost, so connection.execute_wrapper() blocks still pop their own wrapper.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def instrument_serializers():
+    """Time BaseSerializer.data (Serializer.data and ListSerializer.data go through it)."""
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.__dict__['data']
+    if getattr(data.fget, 'instrumented', False):
+        return
+
+    @functools.wraps(data.fget)
+    def timed_data(self):
+        metrics = _current.get()
+        # Only the outermost .data: nested serializers are part of its time
+        if metrics is None or metrics.serializing:
+            return data.fget(self)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            metrics.serializer_seconds += time.perf_counter() - start
+            metrics.serializing = False
+
+    timed_data.instrumented = True
+    BaseSerializer.data = property(timed_data)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_budgets(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def query_budget(endpoint):
+    """Most queries `endpoint` (a URL name) may make: its entry, else "default", else None."""
+    budgets = _load_budgets(settings.QUERY_BUDGETS_FILE)
+    return budgets.get('endpoints', {}).get(endpoint, budgets.get('default'))
+
+
+def server_timing(metrics, total):
+    return (f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.queries} queries", '
+            f'serialize;dur={metrics.serializer_seconds * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}')
+
+
+def report(request, response, metrics):
+    """Server-Timing header, one JSON log line, and the query budget check."""
+    total = metrics.elapsed()
+    match = getattr(request, 'resolver_match', None)
+    endpoint = match.view_name if match else None
+    budget = query_budget(endpoint)
+    response['Server-Timing'] = server_timing(metrics, total)
+    observe_request(endpoint, request.method, response.status_code, total, metrics.queries)
+    logger.info(json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'endpoint': endpoint,
+        'status': response.status_code,
+        'queries': metrics.queries,
+        'db_ms': round(metrics.db_seconds * 1000, 2),
+        'serialize_ms': round(metrics.serializer_seconds * 1000, 2),
+        'total_ms': round(total * 1000, 2),
+        'query_budget': budget,
+    }))
+
+    if budget is None or metrics.queries <= budget:
+        return
+    message = f'{endpoint} made {metrics.queries} queries, over its budget of {budget}'
+    action = settings.QUERY_BUDGET_ACTION
+    if action == 'fail':
+        raise QueryBudgetExceeded(message)
+    if action == 'warn':
+        logger.warning(message)
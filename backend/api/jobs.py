@@ -0,0 +1,200 @@
+"""
+Database-backed background jobs.
+
+Views enqueue a Job row and return its id; `manage.py run_jobs` claims
+queued jobs oldest first and runs the handler registered for the job's kind
+with @register_job. Handlers receive the job's params and a progress()
+callback, whose latest message and counts are stored on the job. A
+handler's return value becomes job.result; an exception marks the job
+failed with its traceback.
+
+No broker is involved: on PostgreSQL several workers can poll the same
+table, since claiming uses SELECT ... FOR UPDATE SKIP LOCKED. While a job
+runs, a thread in its worker refreshes job.updated_at every
+JOB_HEARTBEAT_INTERVAL seconds, however long a single step takes; a job
+whose heartbeat is older than JOB_STALE_AFTER seconds (its worker died) is
+picked up again, at most JOB_MAX_ATTEMPTS times. Writes from a run are
+matched on its worker and attempt, so a run that was given up on cannot
+overwrite the retry's progress or outcome.
+
+At most one job per kind and params waits in the queue (a partial unique
+constraint on Job), so concurrent requests for the same sync share a job.
+"""
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ingest import after_ingest, has_changes
+from .loaders import default_workbook_path, ingest_workbook
+from .models import Job
+
+JOB_HANDLERS = {}
+
+
+def register_job(kind):
+    """Decorator: run `handler(params, progress)` for jobs of `kind`."""
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(kind, params=None, user=None):
+    """
+    Queue a job, or return the identical job that is still waiting in the
+    queue. Returns (job, created).
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    params = params or {}
+    while True:
+        pending = Job.objects.filter(kind=kind, status='queued', params=params).first()
+        if pending:
+            return pending, False
+        try:
+            with transaction.atomic():
+                return Job.objects.create(kind=kind, params=params, created_by=user), True
+        except IntegrityError:
+            # Another request queued it in the meantime (job_one_queued constraint);
+            # look again, unless a worker has claimed it already
+            continue
+
+
+def claim_next_job(worker=None):
+    """Mark the oldest runnable job as running for `worker` and return it (None if idle)."""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'JOB_STALE_AFTER', 1800))
+    max_attempts = getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+
+    # Jobs whose worker died too many times are given up on
+    (Job.objects
+     .filter(status='running', updated_at__lt=stale_before, attempts__gte=max_attempts)
+     .update(status='failed', finished_at=now, updated_at=now,
+             error='Worker stopped responding; giving up after the maximum number of attempts'))
+
+    with transaction.atomic():
+        job = (Job.objects.select_for_update(skip_locked=True)
+               .filter(Q(status='queued') | Q(status='running', updated_at__lt=stale_before))
+               .order_by('created_at', 'id')
+               .first())
+        if job is None:
+            return None
+        job.status = 'running'
+        job.worker = worker or worker_name()
+        job.attempts += 1
+        job.started_at = now
+        job.finished_at = None
+        job.error = None
+        job.progress = {'message': 'Started'}
+        job.save()
+    return job
+
+
+def this_run(job):
+    """The job's row, as long as it is still running under this claim."""
+    return Job.objects.filter(pk=job.pk, status='running', worker=job.worker, attempts=job.attempts)
+
+
+def heartbeat(job, stop, interval):
+    try:
+        while not stop.wait(interval):
+            this_run(job).update(updated_at=timezone.now())
+    finally:
+        connection.close()  # this thread's own connection
+
+
+def run_job(job):
+    """Run a claimed job to completion, recording its result or error."""
+    def progress(message, **counts):
+        this_run(job).update(progress={'message': message, **counts}, updated_at=timezone.now())
+
+    stop = threading.Event()
+    beat = threading.Thread(target=heartbeat, name=f'heartbeat-{job.pk}', daemon=True,
+                            args=(job, stop, getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 60)))
+    beat.start()
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f'Unknown job kind: {job.kind}')
+        job.result = handler(job.params, progress)
+        job.status = 'succeeded'
+        job.progress = {'message': 'Finished'}
+    except Exception:
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+        job.refresh_from_db(fields=['progress'])
+    finally:
+        stop.set()
+        beat.join()
+    job.finished_at = timezone.now()
+    finished = this_run(job).update(status=job.status, result=job.result, error=job.error,
+                                    progress=job.progress, finished_at=job.finished_at,
+                                    updated_at=job.finished_at)
+    if not finished:
+        # Given up on, or retried by another worker, while this run was stuck
+        job.refresh_from_db()
+    return job
+
+
+def job_payload(job):
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'params': job.params,
+        'progress': job.progress,
+        'result': job.result,
+        'error': job.error,
+        'attempts': job.attempts,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@register_job('sync_excel')
+def sync_excel(params, progress):
+    """Ingest the workbook (default: frontend/public/data.xlsx) and refresh derived data."""
+    path = params.get('file_path') or default_workbook_path()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'Excel file not found: {path}')
+
+    sheets = {}
+
+    def sheet_written(sheet, stats):
+        sheets[sheet] = {
+            'counts': stats['counts'],
+            'parse_seconds': stats['parse_seconds'],
+            'write_seconds': stats['write_seconds'],
+            # Unchanged keys are left out: they are most of the workbook
+            **{name: stats[name] for name in ('created', 'updated', 'removed')},
+            'notes': stats.get('notes', {}),
+        }
+        progress(f'{sheet} written', sheets_done=len(sheets), **{
+            f'{sheet.lower()}_{name}': count for name, count in stats['counts'].items()})
+
+    progress('Parsing workbook')
+    # The parse processes are spawned, so they share neither the heartbeat
+    # thread nor its database connection
+    results = ingest_workbook(path, sheets=params.get('sheets'), force=params.get('force', False),
+                              progress=sheet_written)
+
+    result = {'sheets': sheets}
+    if any(has_changes(stats) for stats in results.values()):
+        progress('Refreshing score history, benchmarks and dataset', sheets_done=len(sheets))
+        derived = after_ingest()
+        result['history'] = dict(zip(('created', 'updated', 'unchanged'), derived['history']))
+        result['benchmarks'] = dict(zip(('benchmarks', 'ranks'), derived['benchmarks']))
+        result['dataset'] = dict(zip(('version', 'published'), derived['dataset']))
+    return result
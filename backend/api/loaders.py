@@ -0,0 +1,246 @@
+"""
+Workbook ingestion pipeline: one loader per sheet.
+
+Loaders register themselves under a sheet name with @register_loader.
+ingest_workbook() lists the workbook's sheets, keeps the ones that have a
+loader, and parses them concurrently in a process pool. Parsing only reads
+the workbook (excel_reader) and returns {key: normalized row}. Each parsed
+sheet is then diffed against its table (see ingest.plan_sync) and written in its own
+transaction in this process, while the other sheets are still parsing.
+
+To ingest a new sheet, subclass SheetLoader with its sheet name, columns,
+parse_row() and model, and decorate it with @register_loader. Columns a
+sheet may not carry yet go in optional_columns: when the sheet lacks one,
+its key is left out of the row passed to parse_row(), so the field is
+neither hashed nor overwritten.
+"""
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+
+from .excel_reader import header_names, iter_records, sheet_names
+from .ingest import apply_sync, has_changes, plan_sync, stored_rows_for, summarize
+from .metrics import ingested_sheet
+from .models import Company, Fund
+from .pdf_matcher import NO_MATCH, PdfMatcher
+
+SHEET_LOADERS = {}
+
+
+def register_loader(cls):
+    """Class decorator: make `cls` the loader for its `sheet`."""
+    SHEET_LOADERS[cls.sheet] = cls
+    return cls
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+class SheetLoader:
+    """Parses one sheet into {key: field values} for `model`, keyed by `key_field`."""
+    sheet = None
+    columns = ()
+    optional_columns = ()
+    model = None
+    key_field = None
+
+    def __init__(self):
+        # Anything worth reporting about the parse, e.g. questionable matches
+        self.notes = {}
+
+    def parse_row(self, row, context):
+        """Return the model field values for one row, or None to skip it."""
+        raise NotImplementedError
+
+    def parse(self, path, context):
+        columns = list(self.columns)
+        if self.optional_columns:
+            present = header_names(path, sheet=self.sheet)
+            columns += [column for column in self.optional_columns if column in present]
+        rows = {}
+        for row in iter_records(path, columns, sheet=self.sheet):
+            data = self.parse_row(row, context)
+            if data:
+                rows[data[self.key_field]] = data  # Later duplicates win
+        return rows
+
+
+# =========================
+# Company sheet
+# =========================
+@register_loader
+class CompanyLoader(SheetLoader):
+    sheet = 'Company'
+    model = Company
+    key_field = 'isin'
+    columns = (
+        'Sr No.', 'ISIN', 'Company Name', 'BSE Symbol', 'NSE Symbol', 'Sector', 'Industry', 'ESG Sector',
+        'Mcap', 'E Pillar', 'S Pillar', 'G Pillar', 'ESG Pillar',
+        'Positive Screen', 'Negative Screen', 'Controversy Rating', 'Composite Rating', 'ESG Rating',
+    )
+
+    def parse_row(self, row, context):
+        isin = _text(row['ISIN'])
+        company_name = _text(row['Company Name'])
+        if not isin or not company_name:
+            return None  # Skip rows without essential data
+
+        match = context['pdf_matcher'].match(company_name) if 'pdf_matcher' in context else NO_MATCH
+        self.notes.setdefault('pdf_matches', Counter())[match.kind] += 1
+        if match.alternatives:
+            self.notes.setdefault('ambiguous_pdf_matches', []).append({
+                'isin': isin,
+                'company_name': company_name,
+                'pdf_filename': match.filename,
+                'confidence': match.confidence,
+                'alternatives': [{'pdf_filename': filename, 'confidence': confidence}
+                                 for filename, confidence in match.alternatives],
+            })
+        pdf_filename = match.filename
+        values = {
+            'isin': isin,
+            'company_name': company_name,
+            'sr_no': _text(row['Sr No.']),
+            'bse_symbol': _text(row['BSE Symbol']),
+            'nse_symbol': _text(row['NSE Symbol']),
+            'sector': _text(row['Sector']),
+            'industry': _text(row['Industry']),
+            'esg_sector': _text(row['ESG Sector']),
+            'market_cap': _text(row['Mcap']),
+
+            # ESG Scores
+            'e_pillar': _text(row['E Pillar']),
+            's_pillar': _text(row['S Pillar']),
+            'g_pillar': _text(row['G Pillar']),
+            'esg_pillar': _text(row['ESG Pillar']),
+
+            # Screening and Ratings
+            'positive_screen': _text(row['Positive Screen']),
+            'negative_screen': _text(row['Negative Screen']),
+            'controversy_rating': _text(row['Controversy Rating']),
+            'composite_rating': _text(row['Composite Rating']),
+            'esg_rating': _text(row['ESG Rating']),
+
+            # PDF Information
+            'pdf_filename': pdf_filename,
+            'has_pdf_report': pdf_filename is not None,
+        }
+        # Legacy fields (for backward compatibility)
+        values.update({
+            'grade': values['esg_rating'],
+            'e_score': values['e_pillar'],
+            's_score': values['s_pillar'],
+            'g_score': values['g_pillar'],
+            'esg_score': values['esg_pillar'],
+            'positive': values['positive_screen'],
+            'negative': values['negative_screen'],
+            'controversy': values['controversy_rating'],
+            'composite': values['composite_rating'],
+        })
+        return values
+
+
+# =========================
+# Fund sheet
+# =========================
+@register_loader
+class FundLoader(SheetLoader):
+    sheet = 'Fund'
+    model = Fund
+    key_field = 'fund_name'
+    columns = ('Fund Name', 'Score', 'Percentage', 'Grade')
+    # Not in the shipped workbook yet
+    optional_columns = ('Company ISIN',)
+
+    def parse_row(self, row, context):
+        fund_name = _text(row['Fund Name'])
+        if not fund_name:
+            return None
+        try:
+            score = float(row['Score']) if row['Score'] is not None else None
+        except (TypeError, ValueError):
+            score = None
+        values = {
+            'fund_name': fund_name,
+            'score': score,
+            'percentage': _text(row['Percentage']),
+            'grade': _text(row['Grade']),
+        }
+        if 'Company ISIN' in row:
+            values['company_isins'] = _text(row['Company ISIN'])
+        return values
+
+
+# =========================
+# Pipeline
+# =========================
+def _parse_sheet(sheet, path, context):
+    """Parse one sheet; runs in a worker process."""
+    start = time.perf_counter()
+    loader = SHEET_LOADERS[sheet]()
+    rows = loader.parse(path, context)
+    return sheet, rows, time.perf_counter() - start, loader.notes
+
+
+def _parsed_sheets(path, sheets, context, workers):
+    """Yield (sheet, rows, parse seconds, notes) as each sheet finishes parsing."""
+    if workers <= 1 or len(sheets) <= 1:
+        for sheet in sheets:
+            yield _parse_sheet(sheet, path, context)
+        return
+    # Spawned, not forked: a fork would copy this process's database
+    # connections and any other thread's state (e.g. a job heartbeat)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=django.setup) as pool:
+        futures = [pool.submit(_parse_sheet, sheet, path, context) for sheet in sheets]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def default_workbook_path():
+    return os.path.join(settings.BASE_DIR, '..', 'frontend', 'public', 'data.xlsx')
+
+
+def ingest_workbook(path, sheets=None, force=False, dry_run=False, workers=None, progress=None):
+    """
+    Ingest every sheet of `path` that has a registered loader (or only `sheets`).
+
+    Returns {sheet: stats}, where stats is the sheet's diff summary (see
+    ingest.summarize) plus parse_seconds, write_seconds and, when the loader
+    had something to report, its notes (e.g. ambiguous PDF matches). With
+    `dry_run` nothing is written. `workers` caps the parsing processes
+    (default: one per sheet, up to the CPU count). `progress(sheet, stats)`
+    is called as each sheet is written.
+    """
+    available = sheet_names(path)
+    selected = [sheet for sheet in available if sheet in SHEET_LOADERS and (not sheets or sheet in sheets)]
+    if workers is None:
+        workers = min(len(selected), os.cpu_count() or 1)
+    context = {'pdf_matcher': PdfMatcher.from_directory()} if 'Company' in selected else {}
+
+    results = {}
+    for sheet, rows, parse_seconds, notes in _parsed_sheets(path, selected, context, workers):
+        loader = SHEET_LOADERS[sheet]
+        start = time.perf_counter()
+        plan = plan_sync(sheet, rows, force=force,
+                         stored_rows=stored_rows_for(loader.model, loader.key_field))
+        if not dry_run and has_changes(plan):
+            apply_sync(plan, rows, loader.model, loader.key_field)
+        stats = summarize(plan)
+        stats['parse_seconds'] = round(parse_seconds, 3)
+        stats['write_seconds'] = round(time.perf_counter() - start, 3)
+        if not dry_run:
+            ingested_sheet(sheet, parse_seconds + stats['write_seconds'], stats['counts'])
+        if notes:
+            stats['notes'] = notes
+        results[sheet] = stats
+        if progress:
+            progress(sheet, stats)
+    # Keep workbook order for reporting
+    return {sheet: results[sheet] for sheet in selected}
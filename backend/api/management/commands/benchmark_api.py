@@ -0,0 +1,229 @@
+"""
+Benchmark the API hot paths on synthetic data at several scales.
+Usage: python manage.py benchmark_api [--scales small medium large] [--repeat 5] [--ops company_list ...]
+       [--json out.json] [--compare baseline.json] [--threshold 0.2]
+
+Runs in a throwaway test database (created and destroyed like `manage.py
+test`), never the configured one. For each scale, api/factories.py builds
+N companies, M users (plus an admin), K company assignments, one large
+portfolio and a purchase log history, then each operation runs once to warm
+up and `repeat` more times. Reported per operation: median and min wall time,
+SQL queries (one extra run) and peak Python memory from tracemalloc (another
+extra run, as tracing slows everything down).
+
+    company_list            GET /api/companies/, catalog snapshot cached
+    company_list_cold       the same with an empty cache
+    my_reports              GET /api/my-reports/ for a user with K/M assignments
+    portfolio_read          GET /api/portfolio/ with one large portfolio
+    portfolio_create        POST /api/portfolio/ replacing that portfolio's holdings
+    report_access_granted   GET /api/reports/view/<name>/ for an assigned company
+                            (no PDF on disk: access check, then 404)
+    report_access_denied    the same for a company that is not assigned (403)
+    purchase_logs_first     GET /api/admin/purchase-logs/?page_size=100
+    purchase_logs_deep      the same from a cursor halfway through the history
+    excel_ingest_unchanged  ingest_workbook() of the scale's own data, nothing to write
+    excel_ingest_force      the same with force=True, every row rewritten
+
+--json writes the results with the commit they ran on; --compare prints each
+operation's change against an earlier file and flags slowdowns above
+--threshold (0.2 = 20%) and any added queries.
+"""
+import json
+import logging
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from django.utils import timezone
+
+SCALES = {
+    'small': {'companies': 500, 'users': 50, 'assignments': 2_000, 'portfolio': 50, 'purchase_logs': 5_000},
+    'medium': {'companies': 2_000, 'users': 200, 'assignments': 10_000, 'portfolio': 200,
+               'purchase_logs': 50_000},
+    'large': {'companies': 5_000, 'users': 1_000, 'assignments': 50_000, 'portfolio': 1_000,
+              'purchase_logs': 200_000},
+}
+FUNDS = 50
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(run, repeat):
+    """Warm up, then time `repeat` runs; one more run each for queries and peak memory."""
+    run()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    # Not CaptureQueriesContext: request_started empties connection.queries_log mid-capture
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        run()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'min_ms': round(min(timings) * 1000, 2),
+        'queries': len(queries),
+        'peak_mb': round(peak / 2**20, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API hot paths and Excel ingestion on synthetic data at several scales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small', 'medium'])
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per operation')
+        parser.add_argument('--ops', nargs='+', default=None,
+                            help='Only run these operations (default: all)')
+        parser.add_argument('--json', dest='json_path', default=None,
+                            help='Also write results to this JSON file')
+        parser.add_argument('--compare', default=None,
+                            help='Earlier --json output to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Relative slowdown reported as a regression (default 0.2)')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = {(r['scale'], r['op']): r for r in json.load(f)['results']}
+
+        # Per-request log lines would drown the output
+        logging.getLogger('api.requests').setLevel(logging.WARNING)
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        results = []
+        try:
+            with override_settings(QUERY_BUDGET_ACTION='off'), tempfile.TemporaryDirectory() as tmp:
+                for scale in options['scales']:
+                    call_command('flush', interactive=False, verbosity=0)
+                    cache.clear()
+                    start = time.perf_counter()
+                    operations = self.build(SCALES[scale], os.path.join(tmp, f'{scale}.xlsx'))
+                    self.stdout.write(f"\n{scale}: {SCALES[scale]} (seeded in {time.perf_counter() - start:.1f}s)")
+                    for op, run in operations.items():
+                        if options['ops'] and op not in options['ops']:
+                            continue
+                        result = {'scale': scale, 'op': op, **measure(run, options['repeat'])}
+                        results.append(result)
+                        self.stdout.write(self.format(result, baseline, options['threshold']))
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({
+                    'commit': git_commit(),
+                    'recorded_at': timezone.now().isoformat(),
+                    'database': connection.vendor,
+                    'repeat': options['repeat'],
+                    'scales': {scale: SCALES[scale] for scale in options['scales']},
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
+
+    def format(self, result, baseline, threshold):
+        line = (f"  {result['op']:<24} median {result['median_ms']:>9.2f}ms  min {result['min_ms']:>9.2f}ms  "
+                f"{result['queries']:>5} queries  peak {result['peak_mb']:>7.2f}MB")
+        before = baseline and baseline.get((result['scale'], result['op']))
+        if not before:
+            return line
+        change = result['median_ms'] / before['median_ms'] - 1 if before['median_ms'] else 0
+        line += f"  {change:+.0%} vs {before['median_ms']}ms"
+        if result['queries'] != before['queries']:
+            line += f", queries {before['queries']} -> {result['queries']}"
+        regressed = change > threshold or result['queries'] > before['queries']
+        return self.style.WARNING(line) if regressed else line
+
+    def build(self, scale, workbook_path):
+        """Seed the database for `scale`; returns {operation: callable running it once}."""
+        from rest_framework.test import APIClient
+
+        from api import factories
+        from api.loaders import ingest_workbook
+        from api.models import PurchaseLog
+        from api.pagination import KeysetPagination
+
+        companies = factories.make_companies(scale['companies'])
+        users = factories.make_users(scale['users'])
+        admin = factories.make_users(1, prefix='admin', is_staff=True)[0]
+        factories.make_assignments(users, companies, scale['assignments'], assigned_by=admin)
+        factories.make_funds(FUNDS, companies)
+        factories.make_portfolio(users[0], companies, scale['portfolio'])
+        factories.make_purchase_logs(users, companies, scale['purchase_logs'])
+        factories.write_workbook(workbook_path)
+
+        reader = users[0]
+        assigned = reader.assigned_companies.select_related('company').first().company
+        not_assigned = next(c for c in companies
+                            if not reader.assigned_companies.filter(company=c).exists())
+        middle = (PurchaseLog.objects.order_by('-timestamp', '-id')
+                  [scale['purchase_logs'] // 2])
+        deep_cursor = KeysetPagination().encode_cursor(middle.timestamp, middle.pk)
+        holdings = json.dumps(factories.portfolio_input(companies, scale['portfolio']))
+
+        def client(user=None):
+            api = APIClient()
+            api.force_authenticate(user)
+            return api
+
+        def get(api, path, expected=200):
+            def run():
+                response = api.get(path)
+                if response.status_code != expected:
+                    raise CommandError(f'{path} returned {response.status_code}, expected {expected}')
+            return run
+
+        def cold_company_list():
+            cache.clear()
+            get(anonymous, '/api/companies/')()
+
+        def portfolio_create():
+            response = as_reader.post('/api/portfolio/', {'name': 'Benchmark portfolio',
+                                                          'companies_data': holdings})
+            if response.status_code != 200:
+                raise CommandError(f'POST /api/portfolio/ returned {response.status_code}')
+
+        anonymous, as_reader, as_admin = client(), client(reader), client(admin)
+        return {
+            'company_list': get(anonymous, '/api/companies/'),
+            'company_list_cold': cold_company_list,
+            'my_reports': get(as_reader, '/api/my-reports/'),
+            'portfolio_read': get(as_reader, '/api/portfolio/'),
+            'portfolio_create': portfolio_create,
+            'report_access_granted': get(as_reader, f'/api/reports/view/{assigned.company_name}/', 404),
+            'report_access_denied': get(as_reader, f'/api/reports/view/{not_assigned.company_name}/', 403),
+            'purchase_logs_first': get(as_admin, '/api/admin/purchase-logs/?page_size=100'),
+            'purchase_logs_deep': get(as_admin, f'/api/admin/purchase-logs/?page_size=100&cursor={deep_cursor}'),
+            'excel_ingest_unchanged': lambda: ingest_workbook(workbook_path, workers=1),
+            'excel_ingest_force': lambda: ingest_workbook(workbook_path, force=True, workers=1),
+        }
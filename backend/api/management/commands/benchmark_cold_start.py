@@ -0,0 +1,123 @@
+"""
+Measure cold-start time: how long a fresh process takes to be ready to serve.
+Usage: python manage.py benchmark_cold_start [--runs 5] [--targets wsgi asgi check] [--top 15]
+       [--json out.json]
+
+Each target runs `runs` times in a new interpreter:
+
+    wsgi   import backend.wsgi and the URLconf (what a gunicorn worker loads)
+    asgi   the same for backend.asgi (SERVER_MODE=asgi)
+    check  manage.py check (what every management command pays first)
+
+Reported per target: median and max wall time, peak RSS, and the heavy
+modules (HEAVY_MODULES) that ended up imported. --top lists the slowest
+imports of the wsgi target from `python -X importtime`; api/tests.py checks
+that the wsgi and asgi targets import none of HEAVY_MODULES.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Only the ingestion and report subsystems may import these
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'pyarrow', 'boto3', 'botocore', 'PIL')
+
+SERVE = "import {module}; from django.urls import get_resolver; get_resolver().url_patterns"
+LOADED = "; import sys; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+TARGETS = {
+    'wsgi': ['-c', SERVE.format(module='backend.wsgi') + LOADED.format(heavy=HEAVY_MODULES)],
+    'asgi': ['-c', SERVE.format(module='backend.asgi') + LOADED.format(heavy=HEAVY_MODULES)],
+    'check': ['manage.py', 'check'],
+}
+
+
+def run_python(args, env=None):
+    """Run a fresh interpreter in BASE_DIR; returns (seconds, peak RSS in MB, stdout, stderr)."""
+    with tempfile.TemporaryFile('w+') as out, tempfile.TemporaryFile('w+') as err:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, *args], cwd=settings.BASE_DIR, env=env,
+                                   stdout=out, stderr=err, text=True)
+        # wait4 rather than wait: it returns this child's own resource usage
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        err.seek(0)
+        stdout, stderr = out.read(), err.read()
+    if process.returncode:
+        raise CommandError(f"{' '.join(args)} failed:\n{stderr}")
+    return elapsed, usage.ru_maxrss / 1024, stdout, stderr
+
+
+def import_times(code):
+    """
+    Run `code` under `python -X importtime` with the current settings module.
+    Returns {module: cumulative microseconds} and the total for top-level imports.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    _, _, _, stderr = run_python(['-X', 'importtime', '-c', code], env=env)
+    cumulative, total = {}, 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, us, name = line.split('|')
+        cumulative[name.strip()] = int(us)
+        if not name[1:].startswith(' '):  # top level: not nested under another import
+            total += int(us)
+    return cumulative, total
+
+
+class Command(BaseCommand):
+    help = 'Benchmark process cold-start time (worker boot and manage.py) and import costs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh processes per target')
+        parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+        parser.add_argument('--top', type=int, default=15,
+                            help='Slowest imports of the wsgi target to list (0 to skip)')
+        parser.add_argument('--json', dest='json_path', default=None,
+                            help='Also write results to this JSON file')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        results = []
+        for target in options['targets']:
+            timings, rss, heavy = [], [], ''
+            for _ in range(options['runs']):
+                elapsed, max_rss, stdout, _ = run_python(TARGETS[target], env=env)
+                timings.append(elapsed)
+                rss.append(max_rss)
+                if target != 'check':
+                    heavy = stdout.strip()
+            result = {
+                'target': target,
+                'runs': len(timings),
+                'median_ms': round(statistics.median(timings) * 1000, 1),
+                'max_ms': round(max(timings) * 1000, 1),
+                'peak_rss_mb': round(max(rss), 1),
+                'heavy_modules': heavy.split(',') if heavy else [],
+            }
+            results.append(result)
+            heavy_note = f"  heavy: {', '.join(result['heavy_modules'])}" if result['heavy_modules'] else ''
+            self.stdout.write(f"{target:<6} median {result['median_ms']:>7.1f}ms  max {result['max_ms']:>7.1f}ms  "
+                              f"rss {result['peak_rss_mb']}MB{heavy_note}")
+
+        slowest = []
+        if options['top']:
+            cumulative, total = import_times(TARGETS['wsgi'][1])
+            slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:options['top']]
+            self.stdout.write(f'\nwsgi imports: {total / 1000:.1f}ms total; slowest (cumulative):')
+            for name, us in slowest:
+                self.stdout.write(f'  {us / 1000:>8.1f}ms  {name}')
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'results': results,
+                           'slowest_imports_ms': {name: us / 1000 for name, us in slowest}}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
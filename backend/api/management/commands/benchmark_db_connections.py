@@ -0,0 +1,128 @@
+"""
+Compare request latency with and without connection reuse.
+Usage: python manage.py benchmark_db_connections [--requests 500] [--threads 4] [--path /api/companies/]
+       [--modes close persistent pool] [--json out.json]
+
+Each mode reconfigures the default database and sends `requests` GETs
+straight to Django's WSGIHandler, as a gunicorn worker would, from
+`threads` threads. (The test client is not used: it disconnects the
+request signals that close or recycle connections.)
+
+    close       CONN_MAX_AGE=0: a new connection for every request
+    persistent  CONN_MAX_AGE=60: each thread keeps its connection
+    pool        psycopg 3 pool (OPTIONS["pool"]), PostgreSQL only
+
+The default path, company_list, serves a cached snapshot after one cheap
+aggregate query, so connection setup dominates what is left.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+from api.database import pool_stats
+from api.factories import percentile
+
+MODES = {
+    'close': {'CONN_MAX_AGE': 0},
+    'persistent': {'CONN_MAX_AGE': 60},
+    'pool': {'CONN_MAX_AGE': 0, 'OPTIONS': {'pool': {'min_size': 2, 'max_size': 10}}},
+}
+WARMUP_REQUESTS = 20
+
+
+class Command(BaseCommand):
+    help = 'Benchmark request latency with per-request, persistent and pooled DB connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per mode')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent request threads')
+        parser.add_argument('--path', default='/api/companies/', help='Path to request')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--json', dest='json_path', default=None,
+                            help='Also write results to this JSON file')
+
+    def handle(self, *args, **options):
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        original = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'OPTIONS')}
+        modes = options['modes']
+        if 'pool' in modes and connections[DEFAULT_DB_ALIAS].vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('Skipping pool: connection pooling needs PostgreSQL'))
+            modes = [mode for mode in modes if mode != 'pool']
+
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        results = []
+        try:
+            for mode in modes:
+                self._reset()
+                settings_dict.update({'OPTIONS': {}, **MODES[mode]})
+                result = self.run_mode(options, opened)
+                result['mode'] = mode
+                if mode == 'pool':
+                    # connection_created fires on every checkout; count physical connections instead
+                    result['pool'] = pool_stats().get(DEFAULT_DB_ALIAS)
+                    result['connections_opened'] = result['pool'].get('connections_num', 0)
+                results.append(result)
+                self.stdout.write(
+                    f"{mode:<11} p50 {result['p50_ms']:>7.2f}ms  p99 {result['p99_ms']:>7.2f}ms  "
+                    f"{result['req_per_sec']:>7.1f} req/s  {result['connections_opened']} connections opened"
+                )
+        finally:
+            connection_created.disconnect(count_connection)
+            self._reset()
+            settings_dict.update(original)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'path': options['path'], 'threads': options['threads'], 'results': results},
+                          f, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
+
+    def _reset(self):
+        connections.close_all()
+        close_pool = getattr(connections[DEFAULT_DB_ALIAS], 'close_pool', None)
+        if close_pool:
+            close_pool()
+
+    def run_mode(self, options, opened):
+        path = options['path']
+        handler = WSGIHandler()
+
+        def get(_):
+            environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path}
+            setup_testing_defaults(environ)
+            statuses = []
+            start = time.perf_counter()
+            response = handler(environ, lambda status, headers: statuses.append(status))
+            b''.join(response)
+            response.close()  # Sends request_finished, which closes or keeps the connection
+            elapsed = time.perf_counter() - start
+            if not statuses[0].startswith('200'):
+                raise CommandError(f'{path} returned {statuses[0]}')
+            return elapsed
+
+        # Fresh threads per mode, so no thread reuses a connection from the previous mode
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(get, range(WARMUP_REQUESTS)))
+            opened.clear()
+            start = time.perf_counter()
+            latencies = list(pool.map(get, range(options['requests'])))
+            elapsed = time.perf_counter() - start
+            connections_opened = len(opened)
+        return {
+            'requests': len(latencies),
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'req_per_sec': len(latencies) / elapsed,
+            'connections_opened': connections_opened,
+        }
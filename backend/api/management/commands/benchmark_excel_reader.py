@@ -0,0 +1,111 @@
+"""
+Compare pd.read_excel with the streaming ingestion reader.
+Usage: python manage.py benchmark_excel_reader [--rows 50000] [--workbook path.xlsx] [--memory] [--json out.json]
+
+A synthetic Company sheet shaped like data.xlsx (api/factories.py) is
+written to a temporary file (unless --workbook is given). Each reader then
+goes through every row and pulls the columns the Company loader uses.
+--memory adds a second pass per reader under tracemalloc to report peak
+Python allocations; it is slower, so it is off by default.
+"""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from api.excel_reader import CalamineWorkbook, iter_records, iter_rows
+from api.factories import synthetic_companies, write_workbook
+from api.loaders import CompanyLoader
+
+COMPANY_COLUMNS = CompanyLoader.columns
+
+def read_with_pandas(path):
+    """The previous ingest path: read the whole sheet, then iterrows()."""
+    df = pd.read_excel(path)
+    df.columns = df.columns.str.strip()
+    count = 0
+    for _, row in df.iterrows():
+        values = [row.get(column) for column in COMPANY_COLUMNS]
+        count += values[1] is not None
+    return count
+
+
+def read_records(path):
+    count = 0
+    for row in iter_records(path, COMPANY_COLUMNS):
+        count += row['ISIN'] is not None
+    return count
+
+
+def read_tuples(path):
+    count = 0
+    for values in iter_rows(path, COMPANY_COLUMNS):
+        count += values[1] is not None
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Benchmark pd.read_excel against the streaming Excel reader'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000,
+                            help='Rows in the synthetic workbook (ignored with --workbook)')
+        parser.add_argument('--workbook', default=None,
+                            help='Benchmark an existing workbook instead of a synthetic one')
+        parser.add_argument('--memory', action='store_true',
+                            help='Also measure peak Python allocations (extra pass per reader)')
+        parser.add_argument('--json', dest='json_path', default=None,
+                            help='Also write results to this JSON file')
+
+    def handle(self, *args, **options):
+        path = options['workbook']
+        cleanup = None
+        if path is None:
+            handle, path = tempfile.mkstemp(suffix='.xlsx')
+            os.close(handle)
+            cleanup = path
+            start = time.perf_counter()
+            write_workbook(path, synthetic_companies(options['rows']), funds=())
+            self.stdout.write(f"Wrote {options['rows']} rows to {path} in {time.perf_counter() - start:.1f}s")
+
+        engine = 'python-calamine' if CalamineWorkbook is not None else 'openpyxl read_only'
+        cases = [
+            ('pd.read_excel + iterrows', read_with_pandas),
+            (f'{engine} dicts', read_records),
+            (f'{engine} tuples', read_tuples),
+        ]
+        results = []
+        try:
+            for name, reader in cases:
+                start = time.perf_counter()
+                rows = reader(path)
+                elapsed = time.perf_counter() - start
+                result = {'reader': name, 'rows': rows, 'seconds': round(elapsed, 3),
+                          'rows_per_sec': round(rows / elapsed) if elapsed else None}
+                if options['memory']:
+                    tracemalloc.start()
+                    reader(path)
+                    result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+                    tracemalloc.stop()
+                results.append(result)
+        finally:
+            if cleanup:
+                os.unlink(cleanup)
+
+        baseline = results[0]['seconds']
+        self.stdout.write(f"{'reader':<32} {'rows':>7} {'seconds':>8} {'rows/s':>9} {'peak MB':>8} {'speedup':>8}")
+        for row in results:
+            speedup = baseline / row['seconds'] if row['seconds'] else float('inf')
+            self.stdout.write(
+                f"{row['reader']:<32} {row['rows']:>7} {row['seconds']:>8} {row['rows_per_sec']:>9} "
+                f"{row.get('peak_mb', '-'):>8} {speedup:>7.1f}x"
+            )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'workbook': options['workbook'], 'rows': options['rows'], 'results': results}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
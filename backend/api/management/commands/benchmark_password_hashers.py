@@ -0,0 +1,91 @@
+"""
+Benchmark login cost for each password hashing policy.
+Usage: python manage.py benchmark_password_hashers [--seconds 3] [--policies pbkdf2 argon2] [--json out.json]
+
+A login is one verify() of a stored hash. "per core" runs verifies back to
+back on one thread; "pooled" runs --concurrency logins at once through the
+shared hashing executor, the way concurrent requests would.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from api.hashers import PASSWORD_HASH_POLICIES, PooledHasherMixin
+
+
+class Command(BaseCommand):
+    help = 'Measure logins/sec per core for each password hashing policy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policies', nargs='+', choices=sorted(PASSWORD_HASH_POLICIES),
+                            default=sorted(PASSWORD_HASH_POLICIES),
+                            help='Policies to benchmark (default: all)')
+        parser.add_argument('--seconds', type=float, default=3.0,
+                            help='Minimum time to spend on each measurement')
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1,
+                            help='Concurrent logins for the pooled measurement')
+        parser.add_argument('--json', dest='json_path', default=None,
+                            help='Also write results to this JSON file')
+
+    def handle(self, *args, **options):
+        results = []
+        for policy in options['policies']:
+            hasher = import_string(PASSWORD_HASH_POLICIES[policy])()
+            try:
+                encoded = hasher.encode('correct horse battery staple', hasher.salt())
+            except ValueError as e:
+                # e.g. argon2-cffi not installed
+                self.stdout.write(self.style.WARNING(f'{policy}: skipped ({e})'))
+                continue
+
+            def verify_inline():
+                return super(PooledHasherMixin, hasher).verify('correct horse battery staple', encoded)
+
+            def verify_pooled():
+                return hasher.verify('correct horse battery staple', encoded)
+
+            per_core = self._rate(verify_inline, options['seconds'], 1)
+            pooled = self._rate(verify_pooled, options['seconds'], options['concurrency'])
+            results.append({
+                'policy': policy,
+                'params': {k: v for k, v in hasher.decode(encoded).items()
+                           if k not in ('salt', 'hash', 'params')},
+                'logins_per_sec_per_core': round(per_core, 2),
+                'ms_per_login': round(1000 / per_core, 2) if per_core else None,
+                'pooled_logins_per_sec': round(pooled, 2),
+                'concurrency': options['concurrency'],
+            })
+
+        self.stdout.write(f"{'policy':<8} {'logins/s/core':>14} {'ms/login':>9} {'pooled/s':>9}  params")
+        for row in results:
+            self.stdout.write(
+                f"{row['policy']:<8} {row['logins_per_sec_per_core']:>14} {row['ms_per_login']:>9} "
+                f"{row['pooled_logins_per_sec']:>9}  {row['params']}"
+            )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
+
+    def _rate(self, fn, seconds, concurrency):
+        """Run fn repeatedly on `concurrency` threads for at least `seconds`; return calls/sec."""
+        def worker(deadline):
+            calls = 0
+            while time.perf_counter() < deadline:
+                fn()
+                calls += 1
+            return calls
+
+        start = time.perf_counter()
+        deadline = start + seconds
+        if concurrency <= 1:
+            calls = worker(deadline)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                calls = sum(pool.map(worker, [deadline] * concurrency))
+        return calls / (time.perf_counter() - start)
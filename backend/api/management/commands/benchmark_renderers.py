@@ -0,0 +1,71 @@
+"""
+Compare JSON render time for the company catalog across DRF renderers.
+Usage: python manage.py benchmark_renderers [--companies 5000] [--from-db] [--json out.json]
+
+The catalog is serialized once with CompanyListSerializer; only the render
+step is timed, which is the part the renderer controls. "pre-encoded" is the
+cost of serving a cached snapshot through ORJSONRenderer.
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.catalog import catalog_queryset
+from api.factories import synthetic_companies
+from api.renderers import ORJSONRenderer
+from api.serializers import CompanyListSerializer
+
+class Command(BaseCommand):
+    help = 'Benchmark JSONRenderer vs ORJSONRenderer on the company catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=5000,
+                            help='Number of synthetic companies (ignored with --from-db)')
+        parser.add_argument('--from-db', action='store_true',
+                            help='Use the Company table instead of synthetic data')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Renders per renderer; the median is reported')
+        parser.add_argument('--json', dest='json_path', default=None,
+                            help='Also write results to this JSON file')
+
+    def handle(self, *args, **options):
+        companies = catalog_queryset() if options['from_db'] else synthetic_companies(options['companies'])
+        data = CompanyListSerializer(companies, many=True).data
+        pre_encoded = ORJSONRenderer().render(data)
+
+        cases = [
+            ('JSONRenderer', JSONRenderer(), data),
+            ('ORJSONRenderer', ORJSONRenderer(), data),
+            ('pre-encoded', ORJSONRenderer(), pre_encoded),
+        ]
+        results = []
+        for name, renderer, payload in cases:
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                body = renderer.render(payload, 'application/json', {})
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            results.append({
+                'renderer': name,
+                'rows': len(data),
+                'median_ms': round(timings[len(timings) // 2] * 1000, 3),
+                'min_ms': round(timings[0] * 1000, 3),
+                'bytes': len(body),
+            })
+
+        baseline = results[0]['median_ms']
+        self.stdout.write(f"{'renderer':<16} {'rows':>7} {'median ms':>10} {'min ms':>9} {'bytes':>10} {'speedup':>8}")
+        for row in results:
+            speedup = baseline / row['median_ms'] if row['median_ms'] else float('inf')
+            self.stdout.write(
+                f"{row['renderer']:<16} {row['rows']:>7} {row['median_ms']:>10} {row['min_ms']:>9} "
+                f"{row['bytes']:>10} {speedup:>7.1f}x"
+            )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'results': results}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
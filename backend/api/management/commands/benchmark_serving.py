@@ -0,0 +1,178 @@
+"""
+Load-test the sync (WSGI) and async (ASGI) serving modes side by side.
+Usage: python manage.py benchmark_serving [--path /api/health/ ...] [--concurrency 1 10 50]
+       [--requests 200] [--user someone@example.com] [--read-delay 0.01] [--json out.json]
+
+Each mode runs as a single gunicorn worker on a free local port: a sync
+worker serving backend.wsgi, and a uvicorn worker serving backend.asgi with
+ASYNC_VIEWS=True (what SERVER_MODE=asgi does in docker-entrypoint.sh). An
+asyncio client keeps `concurrency` connections busy until `requests`
+responses have come back for each path.
+
+"peak in flight" is the most responses the worker was sending at the same
+time (first byte received, last byte not yet): the concurrent connections
+one worker actually serves. --read-delay makes clients read slowly
+(seconds per 16 KB, with a small receive buffer), like users downloading
+a report over a slow link; that is where a sync worker stays pinned.
+--user authenticates as that user, for /api/my-reports/ and report URLs.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.factories import percentile
+
+MODES = {
+    'sync': ['backend.wsgi:application', '--worker-class', 'sync', '--threads', '1'],
+    'async': ['backend.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker'],
+}
+READ_SIZE = 16 * 1024
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, port):
+    env = dict(os.environ, ASYNC_VIEWS='True' if mode == 'async' else 'False')
+    command = [sys.executable, '-m', 'gunicorn', *MODES[mode], '--workers', '1',
+               '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', '--chdir', str(settings.BASE_DIR)]
+    server = subprocess.Popen(command, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health/', timeout=1).read()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.2)
+    server.kill()
+    raise CommandError(f'{mode} server did not start on port {port}')
+
+
+async def fetch(port, path, token, read_delay, state):
+    sock = socket.socket()
+    if read_delay:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, READ_SIZE)
+    sock.setblocking(False)
+    start = time.perf_counter()
+    await asyncio.get_running_loop().sock_connect(sock, ('127.0.0.1', port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    auth = f'Authorization: Bearer {token}\r\n' if token else ''
+    writer.write(f'GET {quote(path, safe="/?&=%")} HTTP/1.1\r\nHost: localhost\r\n{auth}Connection: close\r\n\r\n'.encode())
+    await writer.drain()
+
+    chunk = await reader.read(READ_SIZE)
+    status = int(chunk.split(b' ', 2)[1]) if chunk.startswith(b'HTTP/') else 0
+    state['in_flight'] += 1
+    state['peak'] = max(state['peak'], state['in_flight'])
+    size = len(chunk)
+    try:
+        while chunk:
+            if read_delay:
+                await asyncio.sleep(read_delay)
+            chunk = await reader.read(READ_SIZE)
+            size += len(chunk)
+    finally:
+        state['in_flight'] -= 1
+        writer.close()
+    return status, size, time.perf_counter() - start
+
+
+async def load(port, path, token, concurrency, total, read_delay):
+    state = {'in_flight': 0, 'peak': 0}
+    latencies, errors, received = [], 0, 0
+    remaining = iter(range(total))
+
+    async def client():
+        nonlocal errors, received
+        for _ in remaining:
+            try:
+                status, size, elapsed = await fetch(port, path, token, read_delay, state)
+            except OSError:
+                errors += 1
+                continue
+            if status != 200:
+                errors += 1
+            latencies.append(elapsed)
+            received += size
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': total,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'req_per_sec': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        'peak_in_flight': state['peak'],
+        'mb_received': round(received / 2**20, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Load-test the sync WSGI and async ASGI serving modes (one gunicorn worker each)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', nargs='+', default=['/api/health/', '/api/companies/'],
+                            help='Paths to request (default: /api/health/ /api/companies/)')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50],
+                            help='Concurrent connections to test')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per path and concurrency level')
+        parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['sync', 'async'])
+        parser.add_argument('--user', default=None,
+                            help='Email of the user to authenticate as (bearer token)')
+        parser.add_argument('--read-delay', type=float, default=0.0,
+                            help='Seconds clients wait between 16 KB reads (slow clients)')
+        parser.add_argument('--json', dest='json_path', default=None,
+                            help='Also write results to this JSON file')
+
+    def handle(self, *args, **options):
+        token = None
+        if options['user']:
+            from api.authentication import get_tokens_for_user
+            from api.models import CustomUser
+            user = CustomUser.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user with email {options['user']}")
+            token = str(get_tokens_for_user(user).access_token)
+
+        results = []
+        for mode in options['modes']:
+            port = free_port()
+            server = start_server(mode, port)
+            try:
+                for path in options['path']:
+                    for concurrency in options['concurrency']:
+                        result = asyncio.run(load(port, path, token, concurrency,
+                                                  options['requests'], options['read_delay']))
+                        result.update({'mode': mode, 'path': path, 'concurrency': concurrency})
+                        results.append(result)
+                        self.stdout.write(
+                            f"{mode:<6} {path:<40} c={concurrency:<4} {result['req_per_sec']:>8} req/s "
+                            f"p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms "
+                            f"peak in flight {result['peak_in_flight']} errors {result['errors']}"
+                        )
+            finally:
+                server.terminate()
+                server.wait()
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'read_delay': options['read_delay'], 'results': results}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
@@ -2,13 +2,13 @@
 Django management command to load all Excel data into the database
 Usage: python manage.py load_excel_data
 """
+import json
 import os
-import pandas as pd
+from datetime import date
 from django.core.management.base import BaseCommand
-from django.conf import settings
-from django.db import transaction
-from api.models import Company, Fund
-import glob
+from api.ingest import after_ingest
+from api.loaders import SHEET_LOADERS, default_workbook_path, ingest_workbook
+from api.models import Company
 
 
 class Command(BaseCommand):
@@ -26,6 +26,31 @@ class Command(BaseCommand):
             help='Custom path to Excel file',
             default=None
         )
+        parser.add_argument(
+            '--sheets',
+            nargs='+',
+            choices=sorted(SHEET_LOADERS),
+            default=None,
+            help='Only load these sheets (default: every sheet with a loader)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processes used to parse sheets in parallel (default: one per sheet, up to the CPU count)',
+        )
+        parser.add_argument(
+            '--match-report',
+            type=str,
+            default=None,
+            help='Write every ambiguous company -> PDF match, with confidences, to this JSON file',
+        )
+        parser.add_argument(
+            '--vintage',
+            type=date.fromisoformat,
+            default=None,
+            help='Date (YYYY-MM-DD) to record score history under (default: today)',
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('🚀 Starting Excel data loading...'))
@@ -34,164 +59,61 @@ class Command(BaseCommand):
         if options['excel_path']:
             excel_path = options['excel_path']
         else:
-            excel_path = os.path.join(settings.BASE_DIR, '..', 'frontend', 'public', 'data.xlsx')
+            excel_path = default_workbook_path()
 
         if not os.path.exists(excel_path):
             self.stdout.write(self.style.ERROR(f'❌ Excel file not found: {excel_path}'))
             return
 
-        # Get PDF files mapping
-        pdf_mapping = self.get_pdf_filename_mapping()
-        self.stdout.write(self.style.SUCCESS(f'📁 Found {len(pdf_mapping)} PDF files'))
-
         # Clear existing data if force flag is used
-        if options['force']:
+        if options['force'] and (not options['sheets'] or 'Company' in options['sheets']):
             self.stdout.write(self.style.WARNING('🗑️  Clearing existing data...'))
             Company.objects.all().delete()
 
-        # Load Excel data
+        # Load Excel data: sheets are parsed in parallel, each written in its own transaction
         try:
-            with transaction.atomic():
-                companies_loaded = self.load_companies_data(excel_path, pdf_mapping)
-                funds_loaded = self.load_funds_data(excel_path)
-
-            self.stdout.write(self.style.SUCCESS(
-                f'✅ Successfully loaded {companies_loaded} companies and {funds_loaded} funds'
-            ))
-
+            results = ingest_workbook(excel_path, sheets=options['sheets'], force=options['force'],
+                                      workers=options['workers'])
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'❌ Error loading data: {str(e)}'))
             raise
 
-    def get_pdf_filename_mapping(self):
-        """Create mapping of company names to PDF filenames"""
-        pdf_dir = os.path.join(settings.BASE_DIR, 'media', 'secure_reports')
-        if not os.path.exists(pdf_dir):
-            self.stdout.write(self.style.WARNING(f'⚠️  PDF directory not found: {pdf_dir}'))
-            return {}
-
-        pdf_files = glob.glob(os.path.join(pdf_dir, '*.pdf'))
-        pdf_mapping = {}
-
-        for pdf_path in pdf_files:
-            filename = os.path.basename(pdf_path)
-            # Convert filename to company name format
-            # "Bajaj_Finance_Limited.pdf" -> "Bajaj Finance Limited"
-            company_name = filename.replace('.pdf', '').replace('_', ' ')
-            pdf_mapping[company_name.upper()] = filename
-
-        return pdf_mapping
-
-    def load_companies_data(self, excel_path, pdf_mapping):
-        """Load companies data from Excel"""
-        self.stdout.write('📊 Loading companies data from Excel...')
-        
-        df = pd.read_excel(excel_path)
-        df.columns = df.columns.str.strip()  # Clean column names
-        
-        companies_loaded = 0
-        
-        for _, row in df.iterrows():
-            try:
-                # Basic company information
-                isin = str(row.get('ISIN', '')).strip() if pd.notna(row.get('ISIN')) else ''
-                company_name = str(row.get('Company Name', '')).strip() if pd.notna(row.get('Company Name')) else ''
-                
-                if not isin or not company_name:
-                    continue  # Skip rows without essential data
-                
-                # Check if PDF exists for this company
-                company_name_upper = company_name.upper()
-                pdf_filename = None
-                has_pdf = False
-                
-                # Try exact match first
-                if company_name_upper in pdf_mapping:
-                    pdf_filename = pdf_mapping[company_name_upper]
-                    has_pdf = True
-                else:
-                    # Try partial matches
-                    for pdf_company, pdf_file in pdf_mapping.items():
-                        if self.companies_match(company_name_upper, pdf_company):
-                            pdf_filename = pdf_file
-                            has_pdf = True
-                            break
-                
-                # Create or update company record
-                company, created = Company.objects.update_or_create(
-                    isin=isin,
-                    defaults={
-                        # Basic info
-                        'company_name': company_name,
-                        'sr_no': str(row.get('Sr No.', '')).strip() if pd.notna(row.get('Sr No.')) else '',
-                        'bse_symbol': str(row.get('BSE Symbol', '')).strip() if pd.notna(row.get('BSE Symbol')) else '',
-                        'nse_symbol': str(row.get('NSE Symbol', '')).strip() if pd.notna(row.get('NSE Symbol')) else '',
-                        'sector': str(row.get('Sector', '')).strip() if pd.notna(row.get('Sector')) else '',
-                        'industry': str(row.get('Industry', '')).strip() if pd.notna(row.get('Industry')) else '',
-                        'esg_sector': str(row.get('ESG Sector', '')).strip() if pd.notna(row.get('ESG Sector')) else '',
-                        'market_cap': str(row.get('Mcap', '')).strip() if pd.notna(row.get('Mcap')) else '',
-                        
-                        # ESG Scores
-                        'e_pillar': str(row.get('E Pillar', '')).strip() if pd.notna(row.get('E Pillar')) else '',
-                        's_pillar': str(row.get('S Pillar', '')).strip() if pd.notna(row.get('S Pillar')) else '',
-                        'g_pillar': str(row.get('G Pillar', '')).strip() if pd.notna(row.get('G Pillar')) else '',
-                        'esg_pillar': str(row.get('ESG Pillar', '')).strip() if pd.notna(row.get('ESG Pillar')) else '',
-                        
-                        # Screening and Ratings
-                        'positive_screen': str(row.get('Positive Screen', '')).strip() if pd.notna(row.get('Positive Screen')) else '',
-                        'negative_screen': str(row.get('Negative Screen', '')).strip() if pd.notna(row.get('Negative Screen')) else '',
-                        'controversy_rating': str(row.get('Controversy Rating', '')).strip() if pd.notna(row.get('Controversy Rating')) else '',
-                        'composite_rating': str(row.get('Composite Rating', '')).strip() if pd.notna(row.get('Composite Rating')) else '',
-                        'esg_rating': str(row.get('ESG Rating', '')).strip() if pd.notna(row.get('ESG Rating')) else '',
-                        
-                        # PDF Information
-                        'pdf_filename': pdf_filename,
-                        'has_pdf_report': has_pdf,
-                        
-                        # Legacy fields (for backward compatibility)
-                        'grade': str(row.get('ESG Rating', '')).strip() if pd.notna(row.get('ESG Rating')) else '',
-                        'e_score': str(row.get('E Pillar', '')).strip() if pd.notna(row.get('E Pillar')) else '',
-                        's_score': str(row.get('S Pillar', '')).strip() if pd.notna(row.get('S Pillar')) else '',
-                        'g_score': str(row.get('G Pillar', '')).strip() if pd.notna(row.get('G Pillar')) else '',
-                        'esg_score': str(row.get('ESG Pillar', '')).strip() if pd.notna(row.get('ESG Pillar')) else '',
-                        'positive': str(row.get('Positive Screen', '')).strip() if pd.notna(row.get('Positive Screen')) else '',
-                        'negative': str(row.get('Negative Screen', '')).strip() if pd.notna(row.get('Negative Screen')) else '',
-                        'controversy': str(row.get('Controversy Rating', '')).strip() if pd.notna(row.get('Controversy Rating')) else '',
-                        'composite': str(row.get('Composite Rating', '')).strip() if pd.notna(row.get('Composite Rating')) else '',
-                    }
-                )
-                
-                if created:
-                    self.stdout.write(f'➕ Created: {company_name}')
-                else:
-                    self.stdout.write(f'🔄 Updated: {company_name}')
-                    
-                companies_loaded += 1
-                
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'❌ Error processing row: {str(e)}'))
-                continue
-        
-        return companies_loaded
-
-    def load_funds_data(self, excel_path):
-        """Load funds data from Excel if exists"""
-        # This can be expanded later if there's a funds sheet
-        return 0
+        for sheet, stats in results.items():
+            counts = stats['counts']
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {sheet}: {counts['created']} created, {counts['updated']} updated, "
+                f"{counts['removed']} removed, {counts['unchanged']} unchanged "
+                f"(parse {stats['parse_seconds']}s, write {stats['write_seconds']}s)"
+            ))
 
-    def companies_match(self, name1, name2):
-        """Check if two company names are similar enough to be the same company"""
-        # Remove common words that might differ
-        stop_words = ['LIMITED', 'LTD', 'PRIVATE', 'PVT', 'COMPANY', 'CO', 'CORPORATION', 'CORP', 'INC']
-        
-        def clean_name(name):
-            name = name.upper().strip()
-            for word in stop_words:
-                name = name.replace(f' {word}', '').replace(f'{word} ', '').replace(word, '')
-            return name.strip()
-        
-        clean1 = clean_name(name1)
-        clean2 = clean_name(name2)
-        
-        # Check if one is contained in the other (for partial matches)
-        return clean1 in clean2 or clean2 in clean1 or clean1 == clean2
\ No newline at end of file
+        notes = results.get('Company', {}).get('notes', {})
+        if notes.get('pdf_matches'):
+            self.stdout.write('📄 PDF matches: ' + ', '.join(
+                f'{count} {kind}' for kind, count in sorted(notes['pdf_matches'].items())))
+        ambiguous = notes.get('ambiguous_pdf_matches', [])
+        for item in ambiguous[:20]:
+            others = ', '.join(f"{alt['pdf_filename']} ({alt['confidence']})" for alt in item['alternatives'])
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  Ambiguous PDF for {item['company_name']}: using {item['pdf_filename']} "
+                f"({item['confidence']}), also matched {others}"
+            ))
+        if len(ambiguous) > 20:
+            self.stdout.write(self.style.WARNING(f'⚠️  ... and {len(ambiguous) - 20} more ambiguous PDF matches'))
+        if options['match_report']:
+            with open(options['match_report'], 'w') as f:
+                json.dump(ambiguous, f, indent=2)
+            self.stdout.write(f"📝 {len(ambiguous)} ambiguous PDF matches written to {options['match_report']}")
+
+        derived = after_ingest(options['vintage'])
+        created, updated, unchanged = derived['history']
+        self.stdout.write(self.style.SUCCESS(
+            f'🕑 Score history: {created} new, {updated} updated, {unchanged} unchanged'
+        ))
+        benchmark_rows, rank_rows = derived['benchmarks']
+        self.stdout.write(self.style.SUCCESS(
+            f'📊 Refreshed {benchmark_rows} peer benchmarks and {rank_rows} company ranks'
+        ))
+        version, published = derived['dataset']
+        self.stdout.write(self.style.SUCCESS(
+            f"📦 Dataset version {version} {'published' if published else 'unchanged'}"
+        ))
@@ -0,0 +1,19 @@
+"""
+Recompute sector / ESG-sector peer benchmarks and company percentile ranks.
+Usage: python manage.py refresh_benchmarks
+
+Excel ingests run this automatically; use it after editing companies by hand.
+"""
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import refresh_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Refresh peer benchmarks and percentile ranks from the Company table'
+
+    def handle(self, *args, **options):
+        benchmark_rows, rank_rows = refresh_benchmarks()
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed {benchmark_rows} peer benchmarks and {rank_rows} company ranks'
+        ))
@@ -0,0 +1,49 @@
+"""
+Background job worker.
+Usage: python manage.py run_jobs [--once] [--poll 5]
+
+Claims queued jobs (see api/jobs.py) one at a time and runs them. Run one
+or more of these next to the web server; --once drains the queue and exits,
+which also suits a cron entry.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.jobs import claim_next_job, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (e.g. admin-triggered Excel syncs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling')
+        parser.add_argument('--poll', type=float, default=5.0,
+                            help='Seconds to wait between polls when the queue is empty')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        self.stdout.write(self.style.SUCCESS(f'Job worker {worker} started'))
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job(worker)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                self.stdout.write(f'Running {job}')
+                start = time.perf_counter()
+                job = run_job(job)
+                elapsed = time.perf_counter() - start
+                if job.status == 'succeeded':
+                    self.stdout.write(self.style.SUCCESS(f'{job} finished in {elapsed:.1f}s'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'{job} failed after {elapsed:.1f}s: '
+                                                       f'{job.error.strip().splitlines()[-1]}'))
+        except KeyboardInterrupt:
+            self.stdout.write('Job worker stopped')
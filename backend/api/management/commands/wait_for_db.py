@@ -0,0 +1,40 @@
+"""
+Block until the database accepts connections.
+Usage: python manage.py wait_for_db [--timeout 60]
+
+Used by docker-entrypoint.sh before starting gunicorn. Unlike probing the
+port, this also waits for PostgreSQL to finish starting up and checks the
+configured credentials and database.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+
+class Command(BaseCommand):
+    help = 'Wait until the database accepts connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database alias to wait for (default: default)')
+        parser.add_argument('--timeout', type=float, default=60.0,
+                            help='Seconds to wait before giving up')
+        parser.add_argument('--interval', type=float, default=0.5,
+                            help='Seconds between attempts')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        deadline = time.monotonic() + options['timeout']
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                connection.ensure_connection()
+                break
+            except OperationalError as e:
+                if time.monotonic() >= deadline:
+                    raise CommandError(f"Database unavailable after {attempts} attempts: {e}")
+                time.sleep(options['interval'])
+        connection.close()
+        self.stdout.write(self.style.SUCCESS(f"Database available after {attempts} attempt(s)"))
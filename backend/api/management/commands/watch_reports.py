@@ -0,0 +1,98 @@
+"""
+Watch media/secure_reports and keep Company PDF flags in sync.
+Usage: python manage.py watch_reports [--polling] [--interval 2] [--once]
+
+Uses watchdog (inotify on Linux) when it is installed, otherwise polls the
+directory. Either way the directory is rescanned after a short quiet
+period, and only companies whose report was added, removed or replaced
+are updated (see api/report_files.py).
+"""
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.pdf_matcher import is_pdf, pdf_dir
+from api.report_files import diff_scans, scan_reports, sync_report_flags
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional, falls back to polling
+    Observer = None
+
+
+if Observer is not None:
+    class _DirtyHandler(FileSystemEventHandler):
+        """Flags the directory as changed on any PDF event."""
+
+        def __init__(self, dirty):
+            self.dirty = dirty
+
+        def on_any_event(self, event):
+            paths = (getattr(event, 'src_path', ''), getattr(event, 'dest_path', ''))
+            if any(path and is_pdf(str(path)) for path in paths):
+                self.dirty.set()
+
+
+class Command(BaseCommand):
+    help = 'Watch the secure reports directory and update Company PDF flags as PDFs come and go'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', type=str, default=None,
+                            help='Reports directory (default: media/secure_reports)')
+        parser.add_argument('--polling', action='store_true',
+                            help='Poll the directory even if watchdog is installed')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds between polls, and the quiet period before a rescan')
+        parser.add_argument('--once', action='store_true',
+                            help='Reconcile the flags with the directory once and exit')
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or pdf_dir()
+        interval = options['interval']
+
+        scan = scan_reports(directory)
+        self.sync(directory, f'{len(scan)} PDFs on disk')
+        if options['once']:
+            return
+
+        dirty = threading.Event()
+        observer = None
+        if Observer is not None and not options['polling']:
+            observer = Observer()
+            observer.schedule(_DirtyHandler(dirty), directory, recursive=False)
+            observer.start()
+            self.stdout.write(self.style.SUCCESS(f'Watching {directory}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Polling {directory} every {interval}s'))
+
+        try:
+            while True:
+                if observer is not None:
+                    dirty.wait()
+                    # Let copies finish before rescanning
+                    while dirty.wait(interval):
+                        dirty.clear()
+                else:
+                    time.sleep(interval)
+
+                current = scan_reports(directory)
+                added, removed, changed = diff_scans(scan, current)
+                if added or removed or changed:
+                    self.sync(directory, f'{len(added)} added, {len(removed)} removed, {len(changed)} changed',
+                              changed)
+                scan = current
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped watching')
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def sync(self, directory, summary, changed=()):
+        close_old_connections()
+        isins = sync_report_flags(changed, directory)
+        self.stdout.write(f'{summary}: {len(isins)} companies updated'
+                          + (f" ({', '.join(isins[:20])}{' ...' if len(isins) > 20 else ''})" if isins else ''))
@@ -0,0 +1,104 @@
+"""
+Prometheus metrics, served by views.metrics at /metrics.
+
+Each gunicorn worker is its own process, so prometheus_client runs in
+multiprocess mode when PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py
+sets and empties it at startup; docker-compose sets it for the whole
+container so ingest commands write there too): every process writes its
+samples to files in that directory and the scrape merges them, whichever
+worker answers it. Gauges are summed over live processes. Without the
+variable (runserver, tests) metrics stay in the process's default registry.
+
+The variable must be set before prometheus_client is first imported.
+prometheus_client is optional: without it nothing is recorded and /metrics
+answers 503.
+"""
+import os
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                                   Histogram, generate_latest, multiprocess)
+except ImportError:  # optional dependency
+    Counter = None
+
+from .database import pool_stats
+
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+POOL_STATS = {
+    'pool_size': 'Connections in the pool, in use or idle',
+    'pool_available': 'Idle connections in the pool',
+    'requests_waiting': 'Requests waiting for a connection',
+}
+
+if Counter is not None:
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Processes may start before gunicorn creates it (wait_for_db, the preloading master)
+        os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+    REQUESTS = Counter('api_requests_total', 'HTTP requests by view', ['endpoint', 'method', 'status'])
+    REQUEST_SECONDS = Histogram('api_request_duration_seconds', 'Request latency by view', ['endpoint'],
+                                buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+    REQUEST_QUERIES = Histogram('api_request_queries', 'SQL queries per request by view', ['endpoint'],
+                                buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+    DB_POOL = {
+        name: Gauge(f'api_db_{name}', description, ['alias'], multiprocess_mode='livesum')
+        for name, description in POOL_STATS.items()
+    }
+    CACHE_LOOKUPS = Counter('api_cache_lookups_total', 'Cache lookups by cache and result',
+                            ['cache', 'result'])
+    REPORT_RESPONSES = Counter('api_report_responses_total', 'PDF report requests by outcome',
+                               ['outcome'])
+    REPORT_BYTES = Counter('api_report_bytes_total', 'PDF report bytes served')
+    INGEST_SECONDS = Histogram('api_ingest_duration_seconds', 'Time to parse and write one sheet',
+                               ['sheet'], buckets=(.1, .5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+    INGEST_ROWS = Counter('api_ingest_rows_total', 'Ingested rows by sheet and change', ['sheet', 'change'])
+
+
+def enabled():
+    return Counter is not None
+
+
+def observe_request(endpoint, method, status, seconds, queries):
+    """Count one finished request and refresh this worker's pool gauges."""
+    if Counter is None:
+        return
+    endpoint = endpoint or 'unresolved'
+    REQUESTS.labels(endpoint, method if method in HTTP_METHODS else 'other', status).inc()
+    REQUEST_SECONDS.labels(endpoint).observe(seconds)
+    REQUEST_QUERIES.labels(endpoint).observe(queries)
+    for alias, stats in pool_stats().items():
+        for name, gauge in DB_POOL.items():
+            gauge.labels(alias).set(stats.get(name, 0))
+
+
+def cache_lookup(cache, hit):
+    if Counter is not None:
+        CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def report_response(outcome, size=0):
+    """outcome: served, denied (no access) or missing (no PDF or file)."""
+    if Counter is None:
+        return
+    REPORT_RESPONSES.labels(outcome).inc()
+    if size:
+        REPORT_BYTES.inc(size)
+
+
+def ingested_sheet(sheet, seconds, counts):
+    """`counts` is ingest.summarize()'s {'created': n, 'updated': n, ...}."""
+    if Counter is None:
+        return
+    INGEST_SECONDS.labels(sheet).observe(seconds)
+    for change, rows in counts.items():
+        INGEST_ROWS.labels(sheet, change).inc(rows)
+
+
+def exposition():
+    """(body, content type) for a scrape, merged across processes in multiprocess mode."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,66 @@
+"""
+Project middleware.
+
+RequestMetricsMiddleware: query count, DB, serializer and total time per
+request, as a Server-Timing header and a log line, checked against the
+endpoint's query budget (see api.instrumentation).
+
+ReplicaPinMiddleware: after a user's successful write, their reads stay on
+the primary database for a while (see api.database).
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from .database import pin_user
+from .instrumentation import end_request, instrument_serializers, report, start_request
+
+
+class RequestMetricsMiddleware:
+    """Outermost, so the numbers cover the other middleware too."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        instrument_serializers()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS:
+            return self.get_response(request)
+        metrics, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        report(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS:
+            return await self.get_response(request)
+        metrics, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        report(request, response, metrics)
+        return response
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    """Pin the user to the primary after any successful non-GET request."""
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            # DRF copies the token-authenticated user onto the Django request
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_user(user.pk)
+        return response
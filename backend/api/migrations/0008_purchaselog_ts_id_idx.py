@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_portfolio_portfoliocompany'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaselog',
+            index=models.Index(fields=['-timestamp', '-id'], name='purchaselog_ts_id_idx'),
+        ),
+    ]
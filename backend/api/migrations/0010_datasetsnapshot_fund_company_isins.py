@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_customuser_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=64, unique=True)),
+                ('content', models.BinaryField()),
+                ('content_gzip', models.BinaryField()),
+                ('content_brotli', models.BinaryField(blank=True, null=True)),
+                ('company_count', models.IntegerField(default=0)),
+                ('fund_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'get_latest_by': 'created_at',
+            },
+        ),
+        migrations.AddField(
+            model_name='fund',
+            name='company_isins',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_datasetsnapshot_fund_company_isins'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeerBenchmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_type', models.CharField(choices=[('sector', 'Sector'), ('esg_sector', 'ESG Sector')], max_length=20)),
+                ('group_name', models.CharField(max_length=100)),
+                ('metric', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('mean', models.FloatField(blank=True, null=True)),
+                ('median', models.FloatField(blank=True, null=True)),
+                ('p10', models.FloatField(blank=True, null=True)),
+                ('p25', models.FloatField(blank=True, null=True)),
+                ('p75', models.FloatField(blank=True, null=True)),
+                ('p90', models.FloatField(blank=True, null=True)),
+                ('min_value', models.FloatField(blank=True, null=True)),
+                ('max_value', models.FloatField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['group_type', 'group_name', 'metric'],
+                'unique_together': {('group_type', 'group_name', 'metric')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CompanyPeerRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group_type', models.CharField(choices=[('sector', 'Sector'), ('esg_sector', 'ESG Sector')], max_length=20)),
+                ('group_name', models.CharField(max_length=100)),
+                ('e_score', models.FloatField(blank=True, null=True)),
+                ('s_score', models.FloatField(blank=True, null=True)),
+                ('g_score', models.FloatField(blank=True, null=True)),
+                ('esg_score', models.FloatField(blank=True, null=True)),
+                ('composite', models.FloatField(blank=True, null=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='peer_ranks', to='api.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['group_type', 'group_name'], name='peerrank_group_idx')],
+                'unique_together': {('company', 'group_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_peerbenchmark_companypeerrank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyScoreSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('isin', models.CharField(max_length=14)),
+                ('vintage', models.DateField()),
+                ('e_score', models.FloatField(blank=True, null=True)),
+                ('s_score', models.FloatField(blank=True, null=True)),
+                ('g_score', models.FloatField(blank=True, null=True)),
+                ('esg_score', models.FloatField(blank=True, null=True)),
+                ('composite', models.FloatField(blank=True, null=True)),
+                ('grade', models.CharField(blank=True, max_length=4, null=True)),
+            ],
+            options={
+                'ordering': ['isin', 'vintage'],
+                'unique_together': {('isin', 'vintage')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_companyscoresnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestManifestEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sheet', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=200)),
+                ('row_hash', models.CharField(max_length=64)),
+                ('removed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('sheet', 'key')},
+            },
+        ),
+    ]
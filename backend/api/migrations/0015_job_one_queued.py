@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:28
+
+import json
+
+from django.db import migrations, models
+
+
+def fail_duplicate_queued_jobs(apps, schema_editor):
+    """Keep the oldest of identical queued jobs so the constraint can be created."""
+    Job = apps.get_model('api', 'Job')
+    seen = set()
+    for job in Job.objects.filter(status='queued').order_by('created_at', 'id'):
+        key = (job.kind, json.dumps(job.params, sort_keys=True))
+        if key in seen:
+            job.status = 'failed'
+            job.error = 'Duplicate of an earlier queued job'
+            job.save(update_fields=['status', 'error'])
+        seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_queued_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('kind', 'params'), name='job_one_queued'),
+        ),
+    ]
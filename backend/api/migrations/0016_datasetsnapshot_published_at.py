@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    DatasetSnapshot = apps.get_model('api', 'DatasetSnapshot')
+    DatasetSnapshot.objects.update(published_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_job_one_queued'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='datasetsnapshot',
+            options={'get_latest_by': 'published_at', 'ordering': ['-published_at', '-id']},
+        ),
+        migrations.AddField(
+            model_name='datasetsnapshot',
+            name='published_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -59,6 +59,9 @@ class CustomUser(AbstractUser):
     last_failed_login = models.DateTimeField(null=True, blank=True)
     is_locked = models.BooleanField(default=False)
     
+    # Bumped on password change; JWTs carrying an older version are rejected
+    token_version = models.PositiveIntegerField(default=0)
+    
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
@@ -72,9 +75,28 @@ class CustomUser(AbstractUser):
         # Convert email to lowercase
         if self.email:
             self.email = self.email.lower().strip()
+        
+        # A new password revokes tokens issued for the old one. set_password()
+        # leaves the raw password in _password until the next save; transparent
+        # hash upgrades on login clear it first, so they don't revoke anything.
+        if self.pk and self._password is not None:
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
             
         super().save(*args, **kwargs)
     
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # Users built from the cached auth principal have most columns
+        # deferred; load all of them together on first access instead of
+        # issuing one query per attribute.
+        if fields is not None:
+            fields = set(fields)
+            deferred_fields = self.get_deferred_fields()
+            if fields.intersection(deferred_fields):
+                fields = fields.union(deferred_fields)
+        super().refresh_from_db(using, fields, **kwargs)
+    
     def clean(self):
         super().clean()
         
@@ -176,6 +198,7 @@ class Fund(models.Model):
     score = models.FloatField(null=True, blank=True)
     percentage = models.CharField(max_length=20, blank=True, null=True)
     grade = models.CharField(max_length=10, blank=True, null=True)
+    company_isins = models.TextField(blank=True, null=True)  # Comma-separated ISINs held by the fund
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -185,6 +208,139 @@ class Fund(models.Model):
     class Meta:
         ordering = ['fund_name']
 
+class DatasetSnapshot(models.Model):
+    """Company + fund dataset published at ingest time, pre-compressed (see api/dataset.py)"""
+    version = models.CharField(max_length=64, unique=True)  # Content hash of the dataset
+    content = models.BinaryField()  # UTF-8 JSON
+    content_gzip = models.BinaryField()
+    content_brotli = models.BinaryField(null=True, blank=True)  # Only when the brotli package is installed
+    company_count = models.IntegerField(default=0)
+    fund_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When it last became the current version; a revert to older data republishes it
+    published_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Dataset {self.version} ({self.published_at:%Y-%m-%d %H:%M})"
+
+    class Meta:
+        ordering = ['-published_at', '-id']
+        get_latest_by = 'published_at'
+
+PEER_GROUP_CHOICES = [
+    ('sector', 'Sector'),
+    ('esg_sector', 'ESG Sector'),
+]
+
+class PeerBenchmark(models.Model):
+    """Score statistics for one metric within a sector / ESG sector (see api/benchmarks.py)"""
+    group_type = models.CharField(max_length=20, choices=PEER_GROUP_CHOICES)
+    group_name = models.CharField(max_length=100)
+    metric = models.CharField(max_length=20)  # e_score, s_score, g_score, esg_score, composite
+    count = models.IntegerField(default=0)  # Companies with a score for this metric
+    mean = models.FloatField(null=True, blank=True)
+    median = models.FloatField(null=True, blank=True)
+    p10 = models.FloatField(null=True, blank=True)
+    p25 = models.FloatField(null=True, blank=True)
+    p75 = models.FloatField(null=True, blank=True)
+    p90 = models.FloatField(null=True, blank=True)
+    min_value = models.FloatField(null=True, blank=True)
+    max_value = models.FloatField(null=True, blank=True)
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.group_type}:{self.group_name} {self.metric}"
+
+    class Meta:
+        unique_together = ('group_type', 'group_name', 'metric')
+        ordering = ['group_type', 'group_name', 'metric']
+
+class CompanyPeerRank(models.Model):
+    """A company's percentile rank (0-100) per metric within its peer group"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='peer_ranks')
+    group_type = models.CharField(max_length=20, choices=PEER_GROUP_CHOICES)
+    group_name = models.CharField(max_length=100)
+    e_score = models.FloatField(null=True, blank=True)
+    s_score = models.FloatField(null=True, blank=True)
+    g_score = models.FloatField(null=True, blank=True)
+    esg_score = models.FloatField(null=True, blank=True)
+    composite = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.company_id} in {self.group_type}:{self.group_name}"
+
+    class Meta:
+        unique_together = ('company', 'group_type')
+        indexes = [models.Index(fields=['group_type', 'group_name'], name='peerrank_group_idx')]
+
+class IngestManifestEntry(models.Model):
+    """Hash of the last ingested workbook row for one key (see api/ingest.py)"""
+    sheet = models.CharField(max_length=50)  # Workbook sheet, e.g. Company
+    key = models.CharField(max_length=200)  # ISIN for companies
+    row_hash = models.CharField(max_length=64)
+    removed_at = models.DateTimeField(blank=True, null=True)  # Set when the key disappears from the workbook
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.sheet}:{self.key}"
+
+    class Meta:
+        unique_together = ('sheet', 'key')
+
+class Job(models.Model):
+    """Background job run by the run_jobs worker (see api/jobs.py)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)  # Handler name, e.g. sync_excel
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.JSONField(default=dict, blank=True)  # Latest progress message and counts
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, null=True)  # host:pid of the worker running it
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Heartbeat while running
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'], name='job_status_created_idx')]
+        constraints = [
+            # One waiting job per kind and params: enqueue() returns it to concurrent requests
+            models.UniqueConstraint(fields=['kind', 'params'], condition=models.Q(status='queued'),
+                                    name='job_one_queued'),
+        ]
+
+class CompanyScoreSnapshot(models.Model):
+    """Scores of one company as of one ingest vintage (see api/history.py)"""
+    # Plain ISIN rather than a foreign key so history survives a full reload of Company
+    isin = models.CharField(max_length=14)
+    vintage = models.DateField()
+    e_score = models.FloatField(null=True, blank=True)
+    s_score = models.FloatField(null=True, blank=True)
+    g_score = models.FloatField(null=True, blank=True)
+    esg_score = models.FloatField(null=True, blank=True)
+    composite = models.FloatField(null=True, blank=True)
+    grade = models.CharField(max_length=4, blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.isin} @ {self.vintage}"
+
+    class Meta:
+        unique_together = ('isin', 'vintage')
+        ordering = ['isin', 'vintage']
+
 class Report(models.Model):
     """ESG Reports available in the system"""
     company_name = models.CharField(max_length=200)
@@ -257,6 +413,8 @@ class PurchaseLog(models.Model):
         return f"Purchase by {username}{company_info} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
     class Meta:
         ordering = ['-timestamp'] # Show newest logs first
+        # Backs keyset pagination on (timestamp, id) in the admin log views
+        indexes = [models.Index(fields=['-timestamp', '-id'], name='purchaselog_ts_id_idx')]
         verbose_name = "Purchase Log Entry"
         verbose_name_plural = "Purchase Log Entries"
 
@@ -0,0 +1,170 @@
+"""
+Count-free pagination for large, append-mostly tables such as PurchaseLog.
+
+KeysetPagination walks a queryset ordered on (timestamp, id) and encodes the
+last row of each page into an opaque cursor, so every page is a single indexed
+range scan: no COUNT(*) and no OFFSET, whatever page the client is on.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_row_count(queryset):
+    """
+    Return a planner estimate of the number of rows in `queryset`, or None.
+
+    Unfiltered querysets use pg_class.reltuples (maintained by ANALYZE /
+    autovacuum). Filtered querysets use the row estimate of the top plan node
+    from EXPLAIN, which costs a planning pass but never touches the table.
+    Only PostgreSQL is supported; other backends return None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been analyzed at least once
+        return max(row[0], 0) if row else None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination on (timestamp_field, id).
+
+    The sort direction follows the queryset's existing ordering on
+    `timestamp_field` (so DRF's OrderingFilter keeps working); `id` breaks
+    ties. Pass `include_total=true` to get an estimated `count`.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    total_query_param = 'include_total'
+    timestamp_field = 'timestamp'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.descending = self._is_descending(queryset)
+
+        ts_field = self.timestamp_field
+        if self.descending:
+            queryset = queryset.order_by(f'-{ts_field}', '-id')
+        else:
+            queryset = queryset.order_by(ts_field, 'id')
+
+        self.count = None
+        if request.query_params.get(self.total_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.count = estimate_row_count(queryset)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            timestamp, pk = cursor
+            op = 'lt' if self.descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{ts_field}__{op}': timestamp})
+                | Q(**{ts_field: timestamp, f'id__{op}': pk})
+            )
+
+        # Fetch one extra row to learn whether another page exists
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        next_cursor = self.get_next_cursor()
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_is_estimate', self.count is not None),
+            ('next', self.get_next_link(next_cursor)),
+            ('next_cursor', next_cursor),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'count_is_estimate': {'type': 'boolean'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_cursor(self):
+        if not self.has_next or not self.page:
+            return None
+        last = self.page[-1]
+        return self.encode_cursor(getattr(last, self.timestamp_field), last.pk)
+
+    def get_next_link(self, next_cursor):
+        if next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, next_cursor)
+
+    def encode_cursor(self, timestamp, pk):
+        raw = f'{timestamp.isoformat()}|{pk}'.encode('ascii')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii')
+            timestamp, pk = raw.rsplit('|', 1)
+            parsed = parse_datetime(timestamp)
+            if parsed is None:
+                raise ValueError(timestamp)
+            return parsed, int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _is_descending(self, queryset):
+        ts_field = self.timestamp_field
+        for field in queryset.query.order_by:
+            if isinstance(field, str) and field.lstrip('-') == ts_field:
+                return field.startswith('-')
+        return True
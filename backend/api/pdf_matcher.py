@@ -0,0 +1,130 @@
+"""
+Company name -> report PDF matching.
+
+Report PDFs in media/secure_reports are named after the company
+("Bajaj_Finance_Limited.pdf"). PdfMatcher normalizes every PDF name once
+into tokens, with the corporate suffixes (LIMITED, LTD, PVT, ...) dropped,
+and indexes them three ways: by exact upper-cased name, by normalized name,
+and by token (an inverted index). Matching a company is then a few dict
+lookups plus a walk over the posting lists of its own tokens, rather than
+a comparison against every PDF.
+
+A fuzzy match is a PDF whose tokens contain the company's tokens or are
+contained in them ("TATA MOTORS" vs "TATA MOTORS PASSENGER VEHICLES").
+Every match carries a confidence:
+
+    exact       1.0   same name, ignoring case
+    normalized  0.95  same tokens once suffixes and punctuation are dropped
+    partial     0.5-0.9, scaled by how much of the two names overlaps
+
+A match is ambiguous when other PDFs score within AMBIGUITY_MARGIN of it;
+the best one is still used (ties go to the first filename) and the others
+are returned as alternatives so they can be reported.
+"""
+import os
+import re
+from collections import Counter, defaultdict, namedtuple
+
+from django.conf import settings
+
+STOP_WORDS = frozenset({'LIMITED', 'LTD', 'PRIVATE', 'PVT', 'COMPANY', 'CO', 'CORPORATION', 'CORP', 'INC'})
+
+EXACT_CONFIDENCE = 1.0
+NORMALIZED_CONFIDENCE = 0.95
+AMBIGUITY_MARGIN = 0.05
+
+PdfMatch = namedtuple('PdfMatch', ['filename', 'confidence', 'kind', 'alternatives'])
+NO_MATCH = PdfMatch(None, 0.0, 'none', ())
+
+
+def pdf_dir():
+    return os.path.join(settings.BASE_DIR, 'media', 'secure_reports')
+
+
+def is_pdf(filename):
+    """True for report file names: any name ending in .pdf, in any case."""
+    return os.path.splitext(filename)[1].lower() == '.pdf'
+
+
+def pdf_filenames(directory=None):
+    """Names of the PDFs in `directory` (default: the reports directory)."""
+    try:
+        entries = list(os.scandir(directory or pdf_dir()))
+    except FileNotFoundError:
+        return []
+    return [entry.name for entry in entries if is_pdf(entry.name) and entry.is_file()]
+
+
+def pdf_company_name(filename):
+    """"Bajaj_Finance_Limited.pdf" -> "BAJAJ FINANCE LIMITED"."""
+    return os.path.splitext(os.path.basename(filename))[0].replace('_', ' ').upper()
+
+
+def name_tokens(name):
+    """"Dr. Reddy's Laboratories Ltd." -> ('DR', 'REDDYS', 'LABORATORIES')."""
+    name = re.sub(r"['.]", '', name.upper().replace('&', ' AND '))
+    return tuple(token for token in re.split(r'[^A-Z0-9]+', name) if token and token not in STOP_WORDS)
+
+
+class PdfMatcher:
+    def __init__(self, filenames=()):
+        self.exact = {}                     # Upper-cased name -> filename
+        self.normalized = defaultdict(list)  # Token tuple -> filenames
+        self.postings = defaultdict(list)    # Token -> filenames containing it
+        self.sizes = {}                      # Filename -> number of distinct tokens
+        for filename in sorted(filenames):
+            self.add(filename)
+
+    @classmethod
+    def from_directory(cls, directory=None):
+        return cls(pdf_filenames(directory))
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def add(self, filename):
+        name = pdf_company_name(filename)
+        self.exact.setdefault(name, filename)
+        tokens = name_tokens(name)
+        if not tokens:
+            return
+        self.normalized[tokens].append(filename)
+        for token in set(tokens):
+            self.postings[token].append(filename)
+        self.sizes[filename] = len(set(tokens))
+
+    def match(self, company_name):
+        """Best PdfMatch for `company_name` (NO_MATCH if there is none)."""
+        name = company_name.upper().strip()
+        if name in self.exact:
+            return PdfMatch(self.exact[name], EXACT_CONFIDENCE, 'exact', ())
+
+        tokens = name_tokens(name)
+        if not tokens:
+            return NO_MATCH
+        same = self.normalized.get(tokens)
+        if same:
+            alternatives = tuple((filename, NORMALIZED_CONFIDENCE) for filename in same[1:])
+            return PdfMatch(same[0], NORMALIZED_CONFIDENCE, 'normalized', alternatives)
+
+        # Shared tokens per PDF, from the posting lists of this name's tokens
+        distinct = set(tokens)
+        shared = Counter()
+        for token in distinct:
+            shared.update(self.postings.get(token, ()))
+
+        scored = []
+        for filename, common in shared.items():
+            size = self.sizes[filename]
+            # One name's tokens must all appear in the other's
+            if common == len(distinct) or common == size:
+                overlap = common / (len(distinct) + size - common)
+                scored.append((round(0.5 + 0.4 * overlap, 3), filename))
+        if not scored:
+            return NO_MATCH
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        confidence, filename = scored[0]
+        alternatives = tuple((other, score) for score, other in scored[1:]
+                             if confidence - score <= AMBIGUITY_MARGIN)
+        return PdfMatch(filename, confidence, 'partial', alternatives)
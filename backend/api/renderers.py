@@ -0,0 +1,89 @@
+"""
+Fast JSON rendering for DRF.
+
+ORJSONRenderer encodes with orjson when it is installed and falls back to
+DRF's JSONRenderer otherwise (and for indented output, which orjson only
+supports at width 2). Types orjson doesn't know (lazy translation strings,
+Decimal, QuerySets, ...) go through DRF's JSONEncoder.default. The output
+decodes to the same document as JSONRenderer's, but is not byte-identical:
+floats use orjson's shortest form (1e16, not 1e+16), and NaN and Infinity
+are written as null where JSONRenderer raises ValueError.
+
+Views can also return Response(<bytes>) holding a document that was
+encoded earlier, e.g. a cached catalog snapshot; those bytes are sent
+unchanged instead of being decoded and encoded again. Such views must pick
+the snapshot matching request.accepted_renderer.
+
+MessagePackRenderer is opt-in per view (Accept: application/x-msgpack).
+"""
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is in requirements.txt
+    msgpack = None
+
+PRE_ENCODED_TYPES = (bytes, bytearray, memoryview)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson that passes pre-encoded bytes through."""
+    _fallback_encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, PRE_ENCODED_TYPES):
+            return bytes(data)
+        if data is None:
+            return b''
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Datetimes go through DRF's encoder so their format is unchanged
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent == 2:
+            options |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=self._fallback_encoder.default, option=options)
+        # Match JSONRenderer: keep the output a strict JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def encode_json(data):
+    """Encode `data` the way ORJSONRenderer would, for caching as a pre-encoded body."""
+    return ORJSONRenderer().render(data)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Binary MessagePack output for clients that send Accept: application/x-msgpack."""
+    media_type = 'application/x-msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    _fallback_encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, PRE_ENCODED_TYPES):
+            return bytes(data)
+        if data is None:
+            return b''
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackRenderer requires the msgpack package')
+        return msgpack.packb(data, use_bin_type=True, datetime=False,
+                             default=self._fallback_encoder.default)
+
+
+def encode_msgpack(data):
+    """Encode `data` the way MessagePackRenderer would."""
+    return MessagePackRenderer().render(data)
@@ -0,0 +1,72 @@
+"""
+Keep Company.pdf_filename / has_pdf_report in step with media/secure_reports.
+
+The Excel ingest matches companies to report PDFs, but PDFs dropped into
+the directory later would otherwise stay invisible until the next reload.
+sync_report_flags() re-matches every company against the PDFs on disk (one
+read of the Company table plus PdfMatcher lookups) and writes only the rows
+whose match changed, plus the rows whose PDF was replaced. Written rows get
+a new updated_at, which moves the catalog cache version (see catalog.py).
+
+`manage.py watch_reports` calls it whenever scan_reports() sees the
+directory change.
+"""
+import os
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Company
+from .pdf_matcher import PdfMatcher, is_pdf, pdf_dir
+
+
+def scan_reports(directory=None):
+    """{filename: (mtime_ns, size)} for every PDF in the reports directory."""
+    directory = directory or pdf_dir()
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return {}
+    scan = {}
+    for entry in entries:
+        if is_pdf(entry.name) and entry.is_file():
+            stat = entry.stat()
+            scan[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return scan
+
+
+def diff_scans(before, after):
+    """(added, removed, changed) filenames between two scan_reports() results."""
+    added = sorted(set(after) - set(before))
+    removed = sorted(set(before) - set(after))
+    changed = sorted(name for name in set(before) & set(after) if before[name] != after[name])
+    return added, removed, changed
+
+
+def sync_report_flags(changed=(), directory=None):
+    """
+    Point every company at the PDF it matches now. Rows whose match is
+    unchanged are left alone unless their PDF is in `changed`, in which case
+    only updated_at is bumped. Returns the list of updated ISINs.
+    """
+    matcher = PdfMatcher.from_directory(directory)
+    changed = set(changed)
+    now = timezone.now()
+
+    to_update = []
+    companies = Company.objects.only('isin', 'company_name', 'pdf_filename', 'has_pdf_report')
+    for company in companies.iterator():
+        pdf_filename = matcher.match(company.company_name or '').filename
+        if (pdf_filename == company.pdf_filename and company.has_pdf_report == (pdf_filename is not None)
+                and pdf_filename not in changed):
+            continue
+        company.pdf_filename = pdf_filename
+        company.has_pdf_report = pdf_filename is not None
+        company.updated_at = now
+        to_update.append(company)
+
+    if to_update:
+        with transaction.atomic():
+            Company.objects.bulk_update(to_update, ['pdf_filename', 'has_pdf_report', 'updated_at'],
+                                        batch_size=500)
+    return [company.isin for company in to_update]
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_principal
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_principal(sender, instance, **kwargs):
+    """Drop the cached auth principal whenever a user row changes."""
+    invalidate_cached_principal(instance.pk)
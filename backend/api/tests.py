@@ -1,3 +1,1375 @@
-from django.test import TestCase
+import ast
+import csv
+import gzip
+import importlib
+import io
+import json
+import logging
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import addModuleCleanup, mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import IntegrityError, close_old_connections, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+try:
+    from prometheus_client import CollectorRegistry, multiprocess
+except ImportError:  # MetricsTests are skipped
+    pass
+
+from . import async_views, excel_reader, factories
+from . import views as api_views
+from . import metrics as prometheus_metrics
+from . import urls as api_urls
+from .authentication import CachedJWTAuthentication, check_principal_cache, get_tokens_for_user
+from .benchmarks import MAX_COMPARE_COMPANIES, refresh_benchmarks
+from .database import REPLICA_DB_ALIAS, ReplicaRouter, replica_configured
+from .dataset import current_dataset, publish_dataset
+from .hashers import password_hashers
+from .history import record_score_snapshots
+from .instrumentation import QueryBudgetExceeded
+from .jobs import JOB_HANDLERS, claim_next_job, enqueue, run_job
+from .loaders import FundLoader, ingest_workbook
+from .management.commands.benchmark_cold_start import TARGETS, run_python
+from .models import (Article, Company, CompanyScoreSnapshot, CustomUser, DatasetSnapshot, Fund, Job, Note, Portfolio,
+                     PortfolioCompany, PurchaseLog, Report, Tag, UserCompany, UserReport)
+from .pagination import KeysetPagination
+from .pdf_matcher import NO_MATCH, PdfMatcher, pdf_company_name
+from .renderers import ORJSONRenderer
+from .report_files import scan_reports, sync_report_flags
+
+
+def setUpModule():
+    # One JSON line per request would bury the test output; tests that check
+    # the line use assertLogs, which lowers the level again
+    logger = logging.getLogger('api.requests')
+    addModuleCleanup(logger.setLevel, logger.level)
+    logger.setLevel(logging.WARNING)
+
+
+class ReplicaRouterTests(TestCase):
+    def test_writes_and_migrations_stay_on_primary(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Fund), 'default')
+        self.assertTrue(router.allow_migrate('default', 'api'))
+        self.assertFalse(router.allow_migrate(REPLICA_DB_ALIAS, 'api'))
+
+    def test_reads_outside_replica_views_use_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Fund), 'default')
+
+
+# Needs a "replica" alias, e.g. DB_REPLICA_HOST set to the primary's host, or
+# a settings module with two SQLite databases where "replica" mirrors "default".
+# TransactionTestCase: reads inside a transaction always stay on the primary.
+@skipUnless(replica_configured(), 'no "replica" database configured')
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient(SERVER_NAME='localhost')
+        Fund.objects.create(fund_name='Replica Fund', score=70.0, grade='A')
+        self.user = CustomUser.objects.create_user(username='reader', email='reader@example.com',
+                                                   password='x')
+        self.admin = CustomUser.objects.create_user(username='admin', email='admin@example.com',
+                                                    password='x', is_staff=True)
+
+    def get(self, path, user=None):
+        """GET `path` as `user`; returns (response, primary queries, replica queries)."""
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as replica:
+            response = self.client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, len(primary), len(replica)
+
+    def test_replica_view_reads_from_replica(self):
+        response, primary, replica = self.get('/api/funds/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['fund_name'], 'Replica Fund')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_other_views_read_from_primary(self):
+        response, primary, replica = self.get('/api/profile/', self.user)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, 0)
+
+    def test_user_is_pinned_to_primary_after_a_write(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post('/api/log-purchase/', {'company_name': 'Acme'}).status_code, 201)
+
+        _, primary, replica = self.get('/api/funds/', self.user)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        # Only the user who wrote is pinned
+        _, primary, replica = self.get('/api/funds/', self.admin)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_streamed_export_reads_from_replica(self):
+        PurchaseLog.objects.create(user=self.user, company_name='Acme', user_id_recorded=self.user.pk)
+        response, primary, replica = self.get('/api/admin/purchase-logs/export/', self.admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+
+
+# What a fresh worker imports to serve (timings are benchmark_cold_start's job)
+class StartupImportTests(SimpleTestCase):
+    def heavy_modules_loaded(self, target):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        _, _, stdout, _ = run_python(TARGETS[target], env=env)
+        return [name for name in stdout.strip().split(',') if name]
+
+    def test_heavy_modules_load_lazily(self):
+        for target in ('wsgi', 'asgi'):
+            with self.subTest(target=target):
+                self.assertEqual(self.heavy_modules_loaded(target), [],
+                                 'import these inside the ingestion/report code that uses them')
+
+
+class ConnectionSettingsTests(SimpleTestCase):
+    def conn_max_age(self, **env):
+        code = "import backend.settings as s; print(s.DATABASES['default']['CONN_MAX_AGE'])"
+        env = {**os.environ, 'SECRET_KEY': 'x', 'DB_CONN_MAX_AGE': '60', **env}
+        env.pop('DB_POOL', None)
+        result = subprocess.run([sys.executable, '-c', code], env=env, cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, check=True)
+        return int(result.stdout)
+
+    def test_no_persistent_connections_under_asgi(self):
+        self.assertEqual(self.conn_max_age(SERVER_MODE='wsgi'), 60)
+        self.assertEqual(self.conn_max_age(SERVER_MODE='asgi'), 0)
+
+
+# Every list holds several rows, so a per-row query (N+1) pushes an endpoint
+# over its budget in query_budgets.json.
+@override_settings(QUERY_BUDGET_ACTION='fail')
+class QueryBudgetTests(TestCase):
+    ROWS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(username='admin', email='admin@example.com',
+                                                   password='x', is_staff=True)
+        cls.user = CustomUser.objects.create_user(username='reader', email='reader@example.com',
+                                                  password='x')
+        tags = [Tag.objects.create(name=f'Tag {i}') for i in range(cls.ROWS)]
+        for i in range(cls.ROWS):
+            member = CustomUser.objects.create_user(username=f'member{i}', email=f'member{i}@example.com',
+                                                    password='x')
+            company = Company.objects.create(isin=f'INE00000000{i}', company_name=f'Company {i}',
+                                             sector='Banks', esg_sector='Financials')
+            report = Report.objects.create(company_name=company.company_name, year=2024, rating='A')
+            for owner in (member, cls.user):
+                UserCompany.objects.create(user=owner, company=company, assigned_by=cls.admin)
+                UserReport.objects.create(user=owner, report=report, assigned_by=cls.admin)
+                PurchaseLog.objects.create(user=owner, company_name=company.company_name,
+                                           user_id_recorded=owner.pk)
+            Fund.objects.create(fund_name=f'Fund {i}', score=70.0, grade='A')
+            Note.objects.create(title=f'Note {i}', content='...', author=cls.user)
+            article = Article.objects.create(category='SPECIALS', title=f'Article {i}', content='...')
+            article.tags.set(tags)
+            portfolio = Portfolio.objects.create(user=cls.user, name=f'Portfolio {i}')
+            for company_id in Company.objects.values_list('isin', flat=True):
+                PortfolioCompany.objects.create(portfolio=portfolio, company_id=company_id, aum_value=1.0)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertWithinBudget(self, path, user):
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        with self.assertLogs('api.requests', 'INFO') as logs:
+            response = client.get(path)  # QueryBudgetExceeded propagates from the middleware
+        self.assertEqual(response.status_code, 200, path)
+        self.assertIn('Server-Timing', response)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], path)
+        self.assertLessEqual(record['queries'], record['query_budget'])
+        return response
+
+    def test_user_endpoints(self):
+        for path in ('/api/profile/', '/api/companies/', '/api/my-reports/', '/api/funds/',
+                     '/api/portfolio/', '/api/notes/', '/api/user-reports/', '/api/reports/',
+                     '/api/tags/', '/api/articles/'):
+            with self.subTest(path=path):
+                self.assertWithinBudget(path, self.user)
+
+    def test_admin_endpoints(self):
+        for path in ('/api/admin/users/', '/api/admin/user-reports/', '/api/admin/company-assignments/',
+                     f'/api/admin/user-reports/{self.user.pk}/', '/api/admin/purchase-logs/',
+                     '/api/admin/reports/'):
+            with self.subTest(path=path):
+                self.assertWithinBudget(path, self.admin)
+
+    def test_server_timing_header(self):
+        response = self.assertWithinBudget('/api/funds/', self.user)
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=[\d.]+$')
+
+    @override_settings(QUERY_BUDGET_ACTION='warn')
+    def test_warn_logs_requests_over_budget(self):
+        with mock.patch('api.instrumentation.query_budget', return_value=0), \
+                self.assertLogs('api.requests', 'WARNING') as logs:
+            self.assertEqual(self.client.get('/api/funds/').status_code, 200)
+        self.assertIn('funds made 1 queries, over its budget of 0', logs.output[-1])
+
+    def test_fail_raises_over_budget(self):
+        with mock.patch('api.instrumentation.query_budget', return_value=0), \
+                self.assertLogs('api.requests'), self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/api/funds/')
+
+
+def sample(name, **labels):
+    return prometheus_metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+
+@skipUnless(prometheus_metrics.enabled(), 'prometheus_client is not installed')
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.user = CustomUser.objects.create_user(username='reader', email='reader@example.com',
+                                                   password='x')
+        Company.objects.create(isin='INE000000001', company_name='Acme', pdf_filename='Acme.pdf',
+                               has_pdf_report=True)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_scrape_includes_request_metrics(self):
+        before = sample('api_requests_total', endpoint='funds', method='GET', status='200')
+        self.client.get('/api/funds/')
+        self.assertEqual(sample('api_requests_total', endpoint='funds', method='GET', status='200'),
+                         before + 1)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'api_request_duration_seconds_bucket{endpoint="funds"', response.content)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_token_required_when_configured(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+
+    def scrape_as(self, user):
+        return self.client.get('/metrics', HTTP_AUTHORIZATION=f'Bearer {get_tokens_for_user(user).access_token}')
+
+    @override_settings(METRICS_TOKEN='')
+    def test_staff_only_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.scrape_as(self.user).status_code, 401)
+        admin = CustomUser.objects.create_user(username='admin', email='admin@example.com', password='x',
+                                               is_staff=True)
+        self.assertEqual(self.scrape_as(admin).status_code, 200)
+        self.client.force_login(admin)  # admin site session
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_catalog_cache_hits_and_misses(self):
+        misses = sample('api_cache_lookups_total', cache='catalog', result='miss')
+        hits = sample('api_cache_lookups_total', cache='catalog', result='hit')
+        self.client.get('/api/companies/')
+        self.client.get('/api/companies/')
+        self.assertEqual(sample('api_cache_lookups_total', cache='catalog', result='miss'), misses + 1)
+        self.assertEqual(sample('api_cache_lookups_total', cache='catalog', result='hit'), hits + 1)
+
+    def test_report_denied_without_assignment(self):
+        denied = sample('api_report_responses_total', outcome='denied')
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/reports/view/Acme/').status_code, 403)
+        self.assertEqual(sample('api_report_responses_total', outcome='denied'), denied + 1)
+
+    def test_workers_aggregate_in_multiprocess_mode(self):
+        record = ("import django; django.setup(); from api.metrics import observe_request; "
+                  "observe_request('funds', 'GET', 200, 0.02, 1)")
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory)
+            for _ in range(2):  # two "workers"
+                subprocess.run([sys.executable, '-c', record], cwd=settings.BASE_DIR, env=env, check=True)
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry, path=directory)
+            labels = {'endpoint': 'funds', 'method': 'GET', 'status': '200'}
+            self.assertEqual(registry.get_sample_value('api_requests_total', labels), 2)
+            self.assertEqual(registry.get_sample_value('api_request_duration_seconds_count',
+                                                       {'endpoint': 'funds'}), 2)
+
+
+def echo_job(params, progress):
+    progress('Halfway', done=1)
+    return {'echo': params}
+
+
+def failing_job(params, progress):
+    progress('About to fail')
+    raise RuntimeError('workbook is corrupt')
+
+
+@mock.patch.dict(JOB_HANDLERS, {'echo': echo_job, 'fail': failing_job})
+@override_settings(JOB_STALE_AFTER=60, JOB_MAX_ATTEMPTS=2)
+class JobTests(TestCase):
+    def make_stale(self, job):
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(seconds=120))
+
+    def test_enqueue_returns_the_queued_job_for_identical_params(self):
+        job, created = enqueue('echo', {'force': False})
+        self.assertTrue(created)
+        self.assertEqual(enqueue('echo', {'force': False}), (job, False))
+        self.assertTrue(enqueue('echo', {'force': True})[1])
+
+        # Once claimed, the next request queues a new run
+        claim_next_job('worker-1')
+        self.assertTrue(enqueue('echo', {'force': False})[1])
+
+    def test_only_one_identical_job_can_be_queued(self):
+        Job.objects.create(kind='echo', params={'force': False})
+        with self.assertRaises(IntegrityError):
+            Job.objects.create(kind='echo', params={'force': False})
+
+    def test_enqueue_rejects_unknown_kinds(self):
+        with self.assertRaises(ValueError):
+            enqueue('nope')
+
+    def test_claim_takes_the_oldest_queued_job(self):
+        first, _ = enqueue('echo', {'n': 1})
+        enqueue('echo', {'n': 2})
+        job = claim_next_job('worker-1')
+        self.assertEqual(job.pk, first.pk)
+        self.assertEqual((job.status, job.worker, job.attempts), ('running', 'worker-1', 1))
+        self.assertEqual(claim_next_job('worker-2').params, {'n': 2})
+        self.assertIsNone(claim_next_job('worker-3'))
+
+    def test_stale_running_job_is_reclaimed_then_given_up(self):
+        enqueue('echo')
+        job = claim_next_job('worker-1')
+        self.assertIsNone(claim_next_job('worker-2'))  # still heartbeating
+
+        self.make_stale(job)
+        retry = claim_next_job('worker-2')
+        self.assertEqual((retry.pk, retry.worker, retry.attempts), (job.pk, 'worker-2', 2))
+
+        self.make_stale(retry)
+        self.assertIsNone(claim_next_job('worker-3'))
+        retry.refresh_from_db()
+        self.assertEqual(retry.status, 'failed')
+        self.assertIn('maximum number of attempts', retry.error)
+
+    def test_run_records_result(self):
+        enqueue('echo', {'force': True})
+        job = run_job(claim_next_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.result, {'echo': {'force': True}})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failure_keeps_traceback_and_last_progress(self):
+        enqueue('fail')
+        job = run_job(claim_next_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('RuntimeError: workbook is corrupt', job.error)
+        self.assertEqual(job.progress, {'message': 'About to fail'})
+
+    def test_reclaimed_run_cannot_overwrite_the_retry(self):
+        enqueue('echo')
+        stuck = claim_next_job('worker-1')
+        self.make_stale(stuck)
+        claim_next_job('worker-2')
+
+        stuck = run_job(stuck)
+        self.assertEqual((stuck.status, stuck.worker, stuck.attempts), ('running', 'worker-2', 2))
+        self.assertEqual(stuck.progress, {'message': 'Started'})
+
+
+def slow_job(params, progress):
+    """One long step, without progress() calls; reports whether the heartbeat moved meanwhile."""
+    started = Job.objects.get(kind='slow').updated_at
+    time.sleep(0.5)
+    return {'heartbeat': Job.objects.get(kind='slow').updated_at > started}
+
+
+# TransactionTestCase: the heartbeat thread has its own database connection
+@mock.patch.dict(JOB_HANDLERS, {'slow': slow_job})
+@override_settings(JOB_HEARTBEAT_INTERVAL=0.1)
+class JobHeartbeatTests(TransactionTestCase):
+    def test_heartbeat_while_a_step_runs(self):
+        enqueue('slow')
+        job = run_job(claim_next_job('worker-1'))
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.result, {'heartbeat': True})
+
+    def test_sync_excel_parses_sheets_in_processes_under_the_heartbeat(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'data.xlsx')
+        factories.make_funds(3, factories.make_companies(10))
+        factories.write_workbook(path)
+        Fund.objects.all().delete()
+
+        enqueue('sync_excel', {'file_path': path})
+        with mock.patch('api.loaders.os.cpu_count', return_value=2):  # one process per sheet
+            job = run_job(claim_next_job('worker-1'))
+        self.assertEqual(job.status, 'succeeded', job.error)
+        self.assertEqual(job.result['sheets']['Fund']['counts']['created'], 3)
+        self.assertEqual(Fund.objects.count(), 3)
+
+
+def reload_urls():
+    """Re-read api/urls.py, e.g. under another ASYNC_VIEWS, and the root URLconf that includes it."""
+    importlib.reload(api_urls)
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='reader', email='reader@example.com',
+                                                   password='x')
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.client.force_authenticate(self.user)
+
+    def batch(self, body):
+        return self.client.post('/api/batch/', body, format='json')
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [item['status'] for item in response.json()['responses']]
+
+    def test_items_come_back_in_request_order(self):
+        response = self.batch({'requests': [
+            {'path': '/api/profile/', 'id': 'me'},
+            {'path': '/api/nope/', 'id': 2},
+            {'path': 'http://example.com/api/profile/'},
+            {'path': '/api/funds/?page=1', 'id': None},
+        ]})
+        self.assertEqual(self.statuses(response), [200, 404, 400, 200])
+        responses = response.json()['responses']
+        self.assertEqual([item['id'] for item in responses], ['me', 2, None, None])
+        self.assertEqual(responses[0]['body']['username'], 'reader')
+        self.assertEqual(responses[3]['path'], '/api/funds/?page=1')
+
+    def test_body_must_be_an_object_with_requests(self):
+        for body in ([1, 2], {'requests': []}, {'requests': 'profile'}):
+            with self.subTest(body=body):
+                self.assertEqual(self.batch(body).status_code, 400)
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_size_limit(self):
+        self.assertEqual(self.batch({'requests': [{'path': '/api/profile/'}] * 3}).status_code, 400)
+
+    def test_nested_batches_are_rejected(self):
+        response = self.batch({'requests': [{'path': '/api/batch/'}]})
+        self.assertEqual(self.statuses(response), [400])
+        self.assertIn('nested', response.json()['responses'][0]['body']['error'])
+
+    def test_file_views_are_rejected_without_running(self):
+        with mock.patch('api.views.report_response') as report_response:
+            response = self.batch({'requests': [{'path': '/api/reports/download/Acme/'},
+                                                {'path': '/api/reports/view/Acme/'},
+                                                {'path': '/api/admin/purchase-logs/export/'}]})
+        self.assertEqual(self.statuses(response), [400, 400, 400])
+        report_response.assert_not_called()  # the access check never ran
+
+    def test_errors_are_logged_not_returned(self):
+        with mock.patch('api.views.UserDetailSerializer', side_effect=RuntimeError('secret detail')), \
+                self.assertLogs('api.views', 'ERROR'):
+            response = self.batch({'requests': [{'path': '/api/profile/'}, {'path': '/api/funds/'}]})
+        self.assertEqual(self.statuses(response), [500, 200])
+        self.assertEqual(response.json()['responses'][0]['body'], {'error': 'Server error'})
+        self.assertNotIn(b'secret detail', response.content)
+
+    def test_token_is_validated_once_for_the_batch(self):
+        client = APIClient(SERVER_NAME='localhost',
+                           HTTP_AUTHORIZATION=f'Bearer {get_tokens_for_user(self.user).access_token}')
+        with mock.patch.object(CachedJWTAuthentication, 'get_validated_token', autospec=True,
+                               side_effect=CachedJWTAuthentication.get_validated_token) as validate:
+            response = client.post('/api/batch/', {'requests': [{'path': '/api/profile/'},
+                                                                {'path': '/api/my-reports/'},
+                                                                {'path': '/api/portfolio/'}]},
+                                   format='json')
+        self.assertEqual(self.statuses(response), [200, 200, 200])
+        self.assertEqual(validate.call_count, 1)
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_async_routes_run_their_sync_views(self):
+        reload_urls()
+        self.addCleanup(reload_urls)  # after override_settings has been undone
+        self.assertIs(api_urls.hot_views, async_views)
+        response = self.batch({'requests': [{'path': '/api/companies/'}, {'path': '/api/my-reports/'}]})
+        self.assertEqual(self.statuses(response), [200, 200])
+
+
+# TransactionTestCase: parallel items run on threads with their own database connections
+class BatchParallelTests(TransactionTestCase):
+    def test_parallel_items_keep_request_order(self):
+        user = CustomUser.objects.create_user(username='reader', email='reader@example.com', password='x')
+        Fund.objects.create(fund_name='Fund A', score=70.0, grade='A')
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(user)
+        paths = ['/api/profile/', '/api/funds/', '/api/nope/', '/api/my-reports/', '/api/tags/']
+        response = client.post('/api/batch/', {'parallel': True, 'requests': [
+            {'path': path, 'id': i} for i, path in enumerate(paths)]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        responses = response.json()['responses']
+        self.assertEqual([item['id'] for item in responses], [0, 1, 2, 3, 4])
+        self.assertEqual([item['status'] for item in responses], [200, 200, 404, 200, 200])
+        self.assertEqual(responses[0]['body']['username'], 'reader')
+        self.assertEqual(responses[1]['body'][0]['fund_name'], 'Fund A')
+
+
+class ReportAccessTests(TestCase):
+    """Reports are only served to users with an active assignment to the company."""
+    def setUp(self):
+        cache.clear()
+        base_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(base_dir.cleanup)
+        os.makedirs(os.path.join(base_dir.name, 'media', 'secure_reports'))
+        with open(os.path.join(base_dir.name, 'media', 'secure_reports', 'Acme.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4 acme')
+        self.enterContext(override_settings(BASE_DIR=base_dir.name))
+
+        self.user = CustomUser.objects.create_user(username='reader', email='reader@example.com',
+                                                   password='x')
+        acme = Company.objects.create(isin='INE000000001', company_name='Acme', pdf_filename='Acme.pdf',
+                                      has_pdf_report=True)
+        Company.objects.create(isin='INE000000002', company_name='Globex', pdf_filename='Acme.pdf',
+                               has_pdf_report=True)
+        Company.objects.create(isin='INE000000003', company_name='Initech', pdf_filename='Acme.pdf',
+                               has_pdf_report=True)
+        UserCompany.objects.create(user=self.user, company=acme)
+        UserCompany.objects.create(user=self.user, company=Company.objects.get(company_name='Initech'),
+                                   is_active=False)
+        token = get_tokens_for_user(self.user).access_token
+        self.client = APIClient(SERVER_NAME='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def get(self, kind, company_name):
+        response = self.client.get(f'/api/reports/{kind}/{company_name}/')
+        # The PDF body itself is not under test. Closing sends request_finished;
+        # like the test client does, keep it from closing the test's connection
+        request_finished.disconnect(close_old_connections)
+        try:
+            response.close()
+        finally:
+            request_finished.connect(close_old_connections)
+        return response
+
+    def assertAccessChecked(self):
+        for kind in ('view', 'download'):
+            with self.subTest(kind=kind):
+                self.assertEqual(self.get(kind, 'Acme').status_code, 200)
+                self.assertEqual(self.get(kind, 'Globex').status_code, 403)  # not assigned
+                self.assertEqual(self.get(kind, 'Initech').status_code, 403)  # assignment inactive
+
+    def test_sync_views(self):
+        self.assertAccessChecked()
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_async_views(self):
+        reload_urls()
+        self.addCleanup(reload_urls)
+        self.assertAccessChecked()
+
+
+class ViewModuleTests(SimpleTestCase):
+    def test_no_view_is_defined_twice(self):
+        # A later definition silently replaces the earlier one: an unchecked
+        # copy of view_company_report once shadowed the access-checked view
+        for module in (api_views, async_views):
+            with self.subTest(module=module.__name__):
+                with open(module.__file__) as f:
+                    tree = ast.parse(f.read())
+                names = [node.name for node in tree.body
+                         if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+                self.assertEqual(sorted({name for name in names if names.count(name) > 1}), [])
+
+
+class DatasetTests(TestCase):
+    def setUp(self):
+        self.acme = Company.objects.create(isin='INE000000001', company_name='Acme', esg_pillar='61.5')
+        Fund.objects.create(fund_name='Fund A', score=70.0, grade='A')
+
+    def set_score(self, value):
+        Company.objects.filter(pk=self.acme.pk).update(esg_pillar=value)
+
+    def test_publish_stores_compressed_json(self):
+        snapshot, created = publish_dataset()
+        self.assertTrue(created)
+        self.assertEqual((snapshot.company_count, snapshot.fund_count), (1, 1))
+        dataset = json.loads(bytes(snapshot.content))
+        self.assertEqual(dataset['companies'][0]['esgScore'], 61.5)
+        self.assertEqual(gzip.decompress(bytes(snapshot.content_gzip)), bytes(snapshot.content))
+
+    def test_unchanged_data_reuses_the_snapshot(self):
+        first, _ = publish_dataset()
+        self.assertEqual(publish_dataset(), (first, False))
+        self.assertEqual(DatasetSnapshot.objects.count(), 1)
+
+    def test_revert_makes_the_earlier_version_current(self):
+        a, _ = publish_dataset()
+        self.set_score('70')
+        b, _ = publish_dataset()
+        self.assertEqual(current_dataset().version, b.version)
+
+        self.set_score('61.5')  # back to A's data
+        reverted, created = publish_dataset()
+        self.assertFalse(created)
+        self.assertEqual(reverted.version, a.version)
+        self.assertEqual(current_dataset().version, a.version)
+        self.assertEqual(self.client.get('/api/dataset/').json()['version'], a.version)
+
+    @override_settings(DATASET_KEEP_VERSIONS=2)
+    def test_old_versions_are_pruned(self):
+        versions = []
+        for score in ('1', '2', '3'):
+            self.set_score(score)
+            versions.append(publish_dataset()[0].version)
+        self.assertEqual(sorted(DatasetSnapshot.objects.values_list('version', flat=True)),
+                         sorted(versions[1:]))
+
+    def test_conditional_get(self):
+        version = publish_dataset()[0].version
+        url = f'/api/dataset/{version}/'
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response['ETag'], response['Content-Encoding']), (f'"{version}"', 'gzip'))
+        for header in (f'"{version}"', f'W/"{version}"', f'"other", "{version}"', '*'):
+            with self.subTest(if_none_match=header):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=header).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+        # Unknown versions are 404 whatever the client sends
+        self.assertEqual(self.client.get('/api/dataset/nope/', HTTP_IF_NONE_MATCH='"nope"').status_code, 404)
+        self.assertEqual(self.client.get('/api/dataset/nope/', HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='reader', email='reader@example.com',
+                                                   password='x')
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def profile(self, token=None):
+        token = token or get_tokens_for_user(self.user).access_token
+        return self.client.get('/api/profile/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def assertRejected(self, response, code):
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], code)
+
+    def deactivate_elsewhere(self):
+        """Deactivate the user the way another worker would: this process's cache keeps its entry."""
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+
+    def test_valid_token(self):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connections['default'].execute_wrapper(count):
+            response = self.profile()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'reader')
+        self.assertEqual(len(queries), 1)  # the user row, nothing deferred
+
+    def test_password_change_revokes_earlier_tokens(self):
+        token = get_tokens_for_user(self.user).access_token
+        self.assertEqual(self.profile(token).status_code, 200)
+        self.user.set_password('new password')
+        self.user.save()
+        self.assertRejected(self.profile(token), 'token_revoked')
+        self.assertEqual(self.profile().status_code, 200)  # a token issued after the change
+
+    def test_deactivation_applies_at_once_without_the_cache(self):
+        self.assertEqual(self.profile().status_code, 200)
+        self.deactivate_elsewhere()
+        self.assertRejected(self.profile(), 'user_inactive')
+
+    @override_settings(AUTH_USER_CACHE=True)
+    def test_cached_principal_is_reused_and_dropped_on_save(self):
+        token = get_tokens_for_user(self.user).access_token
+        self.assertEqual(self.profile(token).status_code, 200)
+        with mock.patch.object(CachedJWTAuthentication, '_user_query',
+                               side_effect=AssertionError('principal not cached')):
+            self.assertEqual(self.profile(token).status_code, 200)
+
+        # A save in this process drops the entry; one elsewhere waits for the timeout
+        self.deactivate_elsewhere()
+        self.assertEqual(self.profile(token).status_code, 200)
+        self.user.refresh_from_db()
+        self.user.save()
+        self.assertRejected(self.profile(token), 'user_inactive')
+
+    def test_deleted_user(self):
+        token = get_tokens_for_user(self.user).access_token
+        self.user.delete()
+        self.assertRejected(self.profile(token), 'user_not_found')
+
+    def test_per_process_cache_is_refused(self):
+        with override_settings(AUTH_USER_CACHE=True):
+            self.assertEqual([error.id for error in check_principal_cache(None)], ['api.E001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                              'LOCATION': 'redis://localhost:6379/1'}}
+        with override_settings(AUTH_USER_CACHE=True, CACHES=shared):
+            self.assertEqual(check_principal_cache(None), [])
+        with override_settings(AUTH_USER_CACHE=False):
+            self.assertEqual(check_principal_cache(None), [])
+
+
+class ScoreHistoryTests(TestCase):
+    JAN, FEB, MAR = date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)
+
+    def setUp(self):
+        Company.objects.create(isin='INE000000001', company_name='Acme', esg_pillar='60', esg_rating='B')
+        Company.objects.create(isin='INE000000002', company_name='Globex', esg_pillar='50', esg_rating='C')
+
+    def set_score(self, isin, value):
+        Company.objects.filter(isin=isin).update(esg_pillar=value)
+
+    def history(self, isin):
+        return list(CompanyScoreSnapshot.objects.filter(isin=isin).values_list('vintage', 'esg_score'))
+
+    def test_only_changes_are_recorded(self):
+        self.assertEqual(record_score_snapshots(self.JAN), (2, 0, 0))
+        self.set_score('INE000000001', '65')
+        self.assertEqual(record_score_snapshots(self.MAR), (1, 0, 1))
+        self.assertEqual(self.history('INE000000001'), [(self.JAN, 60.0), (self.MAR, 65.0)])
+        self.assertEqual(self.history('INE000000002'), [(self.JAN, 50.0)])
+
+    def test_same_vintage_is_updated_in_place(self):
+        record_score_snapshots(self.JAN)
+        self.set_score('INE000000001', '61')
+        self.assertEqual(record_score_snapshots(self.JAN), (0, 1, 1))
+        self.assertEqual(self.history('INE000000001'), [(self.JAN, 61.0)])
+
+    def test_backfill_compares_with_the_snapshot_before_its_vintage(self):
+        record_score_snapshots(self.JAN)
+        self.set_score('INE000000001', '70')
+        self.set_score('INE000000002', '55')
+        record_score_snapshots(self.MAR)
+
+        # February: Acme already had its March score, Globex still had January's.
+        # Against the latest (March) snapshots this looked like the reverse.
+        self.set_score('INE000000001', '70')
+        self.set_score('INE000000002', '50')
+        self.assertEqual(record_score_snapshots(self.FEB), (1, 0, 1))
+        self.assertEqual(self.history('INE000000001'), [(self.JAN, 60.0), (self.FEB, 70.0), (self.MAR, 70.0)])
+        self.assertEqual(self.history('INE000000002'), [(self.JAN, 50.0), (self.MAR, 55.0)])
+
+    def test_backfill_before_any_history(self):
+        record_score_snapshots(self.MAR)
+        self.assertEqual(record_score_snapshots(self.JAN), (2, 0, 0))
+        self.assertEqual(self.history('INE000000002'), [(self.JAN, 50.0), (self.MAR, 50.0)])
+
+
+class PasswordHasherTests(SimpleTestCase):
+    def test_policy_hasher_first_with_django_defaults_as_fallbacks(self):
+        hashers = password_hashers('scrypt')
+        self.assertEqual(hashers[0], 'api.hashers.TunedScryptPasswordHasher')
+        self.assertIn('django.contrib.auth.hashers.BCryptSHA256PasswordHasher', hashers)
+        self.assertIn('django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher', hashers)
+        self.assertEqual(len(hashers), len(set(hashers)))
+
+    @override_settings(PASSWORD_HASHERS=password_hashers('pbkdf2'), PASSWORD_HASH_EXECUTOR='inline',
+                       PASSWORD_HASH_PBKDF2_ITERATIONS=1000)
+    def test_legacy_hash_verifies_and_is_upgraded(self):
+        legacy = make_password('secret', hasher='pbkdf2_sha1')
+        rehashed = []
+        self.assertTrue(check_password('secret', legacy, setter=rehashed.append))
+        self.assertEqual(rehashed, ['secret'])  # Django saves it again with the preferred hasher
+        self.assertEqual(identify_hasher(make_password('secret')).algorithm, 'pbkdf2_sha256')
+
+
+class IngestTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'data.xlsx')
+
+    def write_funds(self, header, *rows):
+        import openpyxl
+
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = FundLoader.sheet
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(self.path)
+
+    def ingest(self, **kwargs):
+        return ingest_workbook(self.path, workers=1, **kwargs)['Fund']['counts']
+
+    def plan(self, **kwargs):
+        stats = ingest_workbook(self.path, workers=1, **kwargs)['Fund']
+        return {name: stats[name] for name in ('created', 'updated', 'removed', 'unchanged')}
+
+    def write_default_funds(self, *rows):
+        self.write_funds(('Fund Name', 'Score', 'Percentage', 'Grade', 'Company ISIN'), *rows)
+
+    def test_incremental_diff(self):
+        alpha, beta = ('Alpha', 61, '10%', 'B', ''), ('Beta', 48, '5%', 'C', '')
+        self.write_default_funds(alpha, beta)
+        self.assertEqual(self.plan(), {'created': ['Alpha', 'Beta'], 'updated': [], 'removed': [], 'unchanged': []})
+        self.assertEqual(self.plan()['unchanged'], ['Alpha', 'Beta'])
+
+        self.write_default_funds(('Alpha', 64, '10%', 'B', ''), ('Gamma', 55, '2%', 'C', ''))
+        self.assertEqual(self.plan(dry_run=True),
+                         {'created': ['Gamma'], 'updated': ['Alpha'], 'removed': ['Beta'], 'unchanged': []})
+        self.assertFalse(Fund.objects.filter(fund_name='Gamma').exists())
+        self.plan()
+        self.assertEqual(Fund.objects.get(fund_name='Alpha').score, 64)
+        # Removed keys are flagged, not deleted
+        self.assertTrue(Fund.objects.filter(fund_name='Beta').exists())
+        self.assertEqual(self.plan()['unchanged'], ['Alpha', 'Gamma'])
+        self.assertEqual(self.plan(force=True)['updated'], ['Alpha', 'Gamma'])
+
+    def test_unchanged_workbook_matches_the_stored_rows(self):
+        factories.make_funds(5, factories.make_companies(20))
+        factories.write_workbook(self.path)
+        ingest_workbook(self.path, workers=1)
+        results = ingest_workbook(self.path, workers=1)
+        self.assertEqual(results['Company']['counts']['unchanged'], 20)
+        self.assertEqual(results['Fund']['counts']['unchanged'], 5)
+
+    def test_sheets_parsed_in_worker_processes(self):
+        factories.make_funds(5, factories.make_companies(20))
+        factories.write_workbook(self.path)
+        ingest_workbook(self.path, workers=1)
+        Company.objects.filter(isin=factories.isin(0)).update(company_name='Renamed')
+        # Inside the test transaction, which the parse must leave usable
+        results = ingest_workbook(self.path, workers=2)
+        self.assertEqual(results['Company']['updated'], [factories.isin(0)])
+        self.assertEqual(results['Fund']['counts']['unchanged'], 5)
+        self.assertEqual(Company.objects.get(isin=factories.isin(0)).company_name, 'Benchmark Company 00000')
+
+    def test_rows_edited_outside_the_ingest_are_rewritten(self):
+        self.write_default_funds(('Alpha', 61, '10%', 'B', ''), ('Beta', 48, '5%', 'C', ''))
+        self.ingest()
+        Fund.objects.filter(fund_name='Alpha').update(grade='A')  # e.g. the admin
+        Fund.objects.filter(fund_name='Beta').delete()
+        self.assertEqual(self.plan(), {'created': ['Beta'], 'updated': ['Alpha'], 'removed': [], 'unchanged': []})
+        self.assertEqual(Fund.objects.get(fund_name='Alpha').grade, 'B')
+        self.assertEqual(Fund.objects.count(), 2)
+
+    def test_fund_sheet_without_company_isin_column(self):
+        header = ('Fund Name', 'Score', 'Percentage', 'Grade')
+        self.write_funds(header, ('Alpha', 61, '10%', 'B'), ('Beta', 48, '5%', 'C'))
+        self.assertEqual(self.ingest()['created'], 2)
+        Fund.objects.filter(fund_name='Alpha').update(company_isins='INE000000001')
+        self.assertEqual(self.ingest()['unchanged'], 2)
+        # A missing column leaves the field alone rather than blanking it
+        self.assertEqual(Fund.objects.get(fund_name='Alpha').company_isins, 'INE000000001')
+
+        self.write_funds((*header, 'Company ISIN'), ('Alpha', 61, '10%', 'B', 'INE000000001'),
+                         ('Beta', 48, '5%', 'C', 'INE000000002'))
+        self.ingest()
+        self.assertEqual(Fund.objects.get(fund_name='Beta').company_isins, 'INE000000002')
+        self.assertEqual(self.ingest()['unchanged'], 2)
+
+
+class KeysetPaginationTests(TestCase):
+    URL = '/api/admin/purchase-logs/'
+
+    def setUp(self):
+        admin = CustomUser.objects.create_user(username='admin', password='x', is_staff=True)
+        now = timezone.now().replace(microsecond=123456)
+        # Three rows share each timestamp, so pages split inside a tie
+        PurchaseLog.objects.bulk_create([
+            PurchaseLog(user=admin, company_name=f'Company {i}', timestamp=now - timedelta(seconds=i // 3))
+            for i in range(10)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def walk(self, query):
+        ids, url, pages = [], f'{self.URL}?{query}', 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url, pages = response.data['next'], pages + 1
+        return ids, pages
+
+    def test_pages_cover_every_row_once_across_ties(self):
+        expected = list(PurchaseLog.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('page_size=4'), (expected, 3))
+        self.assertEqual(self.walk('page_size=4&ordering=timestamp'), (expected[::-1], 3))
+
+    def test_last_page_has_no_cursor(self):
+        response = self.client.get(f'{self.URL}?page_size=5')
+        cursor = response.data['next_cursor']
+        response = self.client.get(f'{self.URL}?page_size=5&cursor={cursor}')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNone(response.data['next_cursor'])
+        self.assertIsNone(response.data['count'])
+
+    def test_cursor_round_trip(self):
+        timestamp = timezone.now().replace(microsecond=123456)
+        cursor = KeysetPagination().encode_cursor(timestamp, 42)
+        self.assertNotIn('=', cursor)
+        request = mock.Mock(query_params={'cursor': cursor})
+        self.assertEqual(KeysetPagination().decode_cursor(request), (timestamp, 42))
+
+    def test_bad_cursor_is_404(self):
+        bad = ['not base64!', 'bm90LWEtY3Vyc29y',  # 'not-a-cursor'
+               KeysetPagination().encode_cursor(timezone.now(), 1)[:-4]]
+        for cursor in bad:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.URL, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def test_same_document_as_json_renderer(self):
+        data = {'when': timezone.now(), 'price': Decimal('1.50'), 'label': gettext_lazy('Name'),
+                'big': 1e16, 'text': 'line\u2028break é', 'items': [1, None, True], 1: 'int key'}
+        expected = JSONRenderer().render(data)
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(json.loads(rendered), json.loads(expected))
+        self.assertIn(b'\\u2028', rendered)
+        self.assertIn(b'1e16', rendered)  # JSONRenderer: 1e+16
+        indented = ORJSONRenderer().render(data, 'application/json; indent=2')
+        self.assertEqual(json.loads(indented), json.loads(expected))
+
+    def test_non_finite_floats_are_null(self):
+        self.assertEqual(ORJSONRenderer().render({'nan': float('nan'), 'inf': float('inf')}),
+                         b'{"nan":null,"inf":null}')
+
+    def test_pre_encoded_bytes_pass_through(self):
+        self.assertEqual(ORJSONRenderer().render(memoryview(b'{"cached":1}')), b'{"cached":1}')
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class PurchaseLogExportTests(TestCase):
+    URL = '/api/admin/purchase-logs/export/'
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(username='admin', email='admin@example.com', password='x',
+                                                    is_staff=True)
+        self.alice = CustomUser.objects.create_user(username='alice', email='alice@example.com', password='x',
+                                                    organization='Acme Capital')
+        self.bob = CustomUser.objects.create_user(username='bob', email='bob@example.com', password='x')
+        now = timezone.now()
+        self.logs = PurchaseLog.objects.bulk_create([
+            PurchaseLog(user=self.alice if i % 2 else self.bob, company_name=f'Company {i}',
+                        user_id_recorded=(self.alice if i % 2 else self.bob).pk,
+                        timestamp=now - timedelta(days=i))
+            for i in range(5)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def csv_rows(self, **params):
+        return list(csv.DictReader(io.StringIO(self.export(**params).decode('utf-8'))))
+
+    def test_csv_streams_every_row_in_chunks(self):
+        with mock.patch.object(api_views, 'PURCHASE_LOG_EXPORT_CHUNK_SIZE', 2):
+            content = self.export()
+        header, *lines = content.decode('utf-8').splitlines()
+        self.assertEqual(header.split(','), [name for name, _ in api_views.PURCHASE_LOG_EXPORT_COLUMNS])
+        self.assertEqual(len(lines), 5)
+        rows = self.csv_rows()
+        self.assertEqual([row['company_name'] for row in rows], [f'Company {i}' for i in range(5)])
+        self.assertEqual(rows[1]['username'], 'alice')
+        self.assertEqual(rows[1]['organization'], 'Acme Capital')
+        self.assertEqual(rows[0]['timestamp'], self.logs[0].timestamp.isoformat())
+
+    def test_filters(self):
+        rows = self.csv_rows(user=self.alice.pk)
+        self.assertEqual([row['company_name'] for row in rows], ['Company 1', 'Company 3'])
+        rows = self.csv_rows(start_date=(timezone.now() - timedelta(days=2, hours=12)).isoformat())
+        self.assertEqual([row['company_name'] for row in rows], ['Company 0', 'Company 1', 'Company 2'])
+        rows = self.csv_rows(email='alice@', end_date=(timezone.now() - timedelta(days=2)).isoformat())
+        self.assertEqual([row['company_name'] for row in rows], ['Company 3'])
+
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        with mock.patch.object(api_views, 'PURCHASE_LOG_EXPORT_CHUNK_SIZE', 2):
+            table = pq.read_table(io.BytesIO(self.export(export_format='parquet', user=self.bob.pk)))
+        self.assertEqual(table.column_names, [name for name, _ in api_views.PURCHASE_LOG_EXPORT_COLUMNS])
+        self.assertEqual(table.column('company_name').to_pylist(), ['Company 0', 'Company 2', 'Company 4'])
+        self.assertEqual(table.column('username').to_pylist(), ['bob'] * 3)
+
+    def test_unknown_format_is_400(self):
+        response = self.client.get(self.URL, {'export_format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.get(self.URL).status_code, 403)
+
+
+class PdfMatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.matcher = PdfMatcher(['Bajaj_Finance_Limited.pdf', 'Infosys.PDF', 'Acme_Ltd.pdf', 'Acme_Limited.pdf',
+                                   'Tata_Motors_Finance.pdf', 'Tata_Motors_Vehicles.pdf'])
+
+    def test_extension_stripped_in_any_case(self):
+        self.assertEqual(pdf_company_name('reports/Infosys.PDF'), 'INFOSYS')
+        self.assertEqual(pdf_company_name('Bajaj_Finance_Limited.pdf'), 'BAJAJ FINANCE LIMITED')
+
+    def test_exact(self):
+        self.assertEqual(self.matcher.match('Bajaj Finance Limited'), ('Bajaj_Finance_Limited.pdf', 1.0, 'exact', ()))
+        self.assertEqual(self.matcher.match('infosys ').filename, 'Infosys.PDF')
+
+    def test_normalized(self):
+        self.assertEqual(self.matcher.match('Bajaj Finance Ltd.'),
+                         ('Bajaj_Finance_Limited.pdf', 0.95, 'normalized', ()))
+
+    def test_ambiguous(self):
+        # Same tokens once suffixes are dropped: the first filename wins
+        self.assertEqual(self.matcher.match('Acme Pvt. Ltd.'),
+                         ('Acme_Limited.pdf', 0.95, 'normalized', (('Acme_Ltd.pdf', 0.95),)))
+        match = self.matcher.match('Tata Motors')
+        self.assertEqual((match.filename, match.kind), ('Tata_Motors_Finance.pdf', 'partial'))
+        self.assertEqual(match.alternatives, (('Tata_Motors_Vehicles.pdf', match.confidence),))
+        self.assertTrue(0.5 <= match.confidence < 0.95)
+
+    def test_partial_prefers_the_closer_name(self):
+        match = PdfMatcher(['Tata.pdf', 'Tata_Motors_Passenger.pdf']).match('Tata Motors Passenger Vehicles Ltd')
+        self.assertEqual((match.filename, match.confidence), ('Tata_Motors_Passenger.pdf', 0.8))
+        self.assertEqual(match.alternatives, ())  # Tata.pdf scores 0.6
+
+    def test_no_match(self):
+        self.assertIs(self.matcher.match('Wipro'), NO_MATCH)
+        self.assertIs(self.matcher.match('Motors Finance Wipro'), NO_MATCH)  # neither name contains the other
+        self.assertIs(self.matcher.match('Ltd.'), NO_MATCH)
+
+    def test_from_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('Infosys.PDF', 'Wipro.pdf', 'notes.txt'):
+                open(os.path.join(directory, name), 'wb').close()
+            os.mkdir(os.path.join(directory, 'archive.pdf'))
+            matcher = PdfMatcher.from_directory(directory)
+            self.assertEqual(len(matcher), 2)
+            self.assertEqual(matcher.match('Infosys').filename, 'Infosys.PDF')
+        self.assertEqual(len(PdfMatcher.from_directory(os.path.join(directory, 'missing'))), 0)
+
+
+# TransactionTestCase: watch_reports calls close_old_connections() before each
+# sync, which would close the connection holding a TestCase's transaction
+class ReportFilesTests(TransactionTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        Company.objects.create(isin='INE000000001', company_name='Acme Limited')
+        Company.objects.create(isin='INE000000002', company_name='Globex')
+
+    def touch(self, name, content=b'%PDF-1.4'):
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(content)
+
+    def flags(self):
+        return dict(Company.objects.values_list('isin', 'pdf_filename'))
+
+    def sync(self, changed=()):
+        return sync_report_flags(changed, self.directory)
+
+    def test_add_remove_and_rename(self):
+        self.touch('Acme_Limited.PDF')
+        self.touch('notes.txt')
+        self.assertEqual(list(scan_reports(self.directory)), ['Acme_Limited.PDF'])
+        self.assertEqual(self.sync(), ['INE000000001'])
+        self.assertEqual(self.flags(), {'INE000000001': 'Acme_Limited.PDF', 'INE000000002': None})
+        self.assertTrue(Company.objects.get(isin='INE000000001').has_pdf_report)
+
+        os.rename(os.path.join(self.directory, 'Acme_Limited.PDF'), os.path.join(self.directory, 'Acme.pdf'))
+        self.assertEqual(self.sync(), ['INE000000001'])
+        self.assertEqual(self.flags()['INE000000001'], 'Acme.pdf')
+
+        os.remove(os.path.join(self.directory, 'Acme.pdf'))
+        self.assertEqual(self.sync(), ['INE000000001'])
+        self.assertEqual(self.flags()['INE000000001'], None)
+        self.assertFalse(Company.objects.get(isin='INE000000001').has_pdf_report)
+
+    def test_unchanged_rows_are_not_written(self):
+        self.touch('Globex.pdf')
+        self.sync()
+        updated_at = Company.objects.get(isin='INE000000002').updated_at
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.assertEqual(self.sync(), [])
+        self.assertEqual(len(queries), 1)  # the Company read
+        # A replaced PDF only moves updated_at, for the catalog version
+        self.assertEqual(self.sync(changed=['Globex.pdf']), ['INE000000002'])
+        self.assertGreater(Company.objects.get(isin='INE000000002').updated_at, updated_at)
+
+    def test_watch_reports_once(self):
+        self.touch('Globex.pdf')
+        out = io.StringIO()
+        call_command('watch_reports', '--once', directory=self.directory, stdout=out)
+        self.assertIn('1 PDFs on disk: 1 companies updated (INE000000002)', out.getvalue())
+
+    def test_watch_reports_polls_for_changes(self):
+        steps = iter([
+            lambda: self.touch('Acme_Limited.pdf'),
+            lambda: None,  # nothing changed: no resync
+            lambda: os.remove(os.path.join(self.directory, 'Acme_Limited.pdf')),
+        ])
+
+        def sleep(seconds):
+            step = next(steps, None)
+            if step is None:
+                raise KeyboardInterrupt
+            step()
+
+        out = io.StringIO()
+        with mock.patch('api.management.commands.watch_reports.time.sleep', sleep), \
+                mock.patch('api.management.commands.watch_reports.sync_report_flags',
+                           wraps=sync_report_flags) as sync:
+            call_command('watch_reports', '--polling', directory=self.directory, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(sync.call_count, 3)  # startup, added, removed
+        self.assertIn('1 added, 0 removed, 0 changed: 1 companies updated (INE000000001)', lines)
+        self.assertIn('0 added, 1 removed, 0 changed: 1 companies updated (INE000000001)', lines)
+        self.assertEqual(lines[-1], 'Stopped watching')
+        self.assertIsNone(self.flags()['INE000000001'])
+
+
+def make_peer_catalog():
+    """Two sectors with a tie, a blank score, a legacy-only score and a company without a sector."""
+    for isin, sector, esg_pillar, esg_score in [
+        ('INE000000001', 'Energy', '10', ''),
+        ('INE000000002', 'Energy', '20', ''),
+        ('INE000000003', 'Energy', '20', ''),
+        ('INE000000004', 'Energy', '30', ''),
+        ('INE000000005', 'Energy', '', ''),  # no score
+        ('INE000000006', 'Tech', '50', ''),
+        ('INE000000007', 'Tech', '', '70'),  # legacy field only
+        ('INE000000008', '', '40', ''),  # no sector
+    ]:
+        Company.objects.create(isin=isin, company_name=f'Company {isin[-1]}', sector=sector,
+                               esg_sector='All', esg_pillar=esg_pillar, esg_score=esg_score)
+    return refresh_benchmarks()
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        self.counts = make_peer_catalog()
+
+    def get(self, **params):
+        response = APIClient().get('/api/benchmarks/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_group_statistics(self):
+        # 5 metrics for Energy, Tech and the single esg_sector group; 7 sector ranks + 8 esg_sector ranks
+        self.assertEqual(self.counts, (15, 15))
+        energy = self.get(group_type='sector')['benchmarks']['sector']['Energy']['esg_score']
+        self.assertEqual(energy, {'count': 4, 'mean': 20.0, 'median': 20.0, 'p10': 13.0, 'p25': 17.5,
+                                  'p75': 22.5, 'p90': 27.0, 'min': 10.0, 'max': 30.0})
+        tech = self.get(group_type='sector', group='Tech')['benchmarks']['sector']['Tech']['esg_score']
+        self.assertEqual((tech['count'], tech['median']), (2, 60.0))
+        everyone = self.get(group_type='esg_sector')['benchmarks']['esg_sector']['All']['esg_score']
+        self.assertEqual((everyone['count'], everyone['max']), (7, 70.0))
+        # A metric nobody has
+        blank = self.get()['benchmarks']['sector']['Energy']['e_score']
+        self.assertEqual((blank['count'], blank['median']), (0, None))
+
+    def test_percentile_ranks(self):
+        ranks = self.get(group_type='sector', group='Energy')['ranks']
+        # Share of peers at or below the company; ties share the higher rank
+        self.assertEqual({isin: rank['sector']['esg_score'] for isin, rank in ranks.items()},
+                         {'INE000000001': 25.0, 'INE000000002': 75.0, 'INE000000003': 75.0,
+                          'INE000000004': 100.0, 'INE000000005': None})
+        ranks = self.get(isin='INE000000007,INE000000008')['ranks']
+        tech = ranks['INE000000007']['sector']
+        self.assertEqual((tech['group'], tech['esg_score'], tech['e_score']), ('Tech', 100.0, None))
+        self.assertEqual(list(ranks['INE000000008']), ['esg_sector'])  # no sector, no sector rank
+
+    def test_unknown_group_type_is_400(self):
+        self.assertEqual(APIClient().get('/api/benchmarks/', {'group_type': 'country'}).status_code, 400)
+
+
+class CompanyCompareTests(TestCase):
+    def setUp(self):
+        make_peer_catalog()
+
+    def compare(self, isin, **params):
+        return APIClient().get(f'/api/companies/{isin}/compare/', params)
+
+    def test_subject_and_peers_with_ranks(self):
+        response = self.compare('INE000000002', **{'with': 'INE000000004,INE000000006'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([row['isin'] for row in data['companies']], ['INE000000002', 'INE000000004', 'INE000000006'])
+        self.assertEqual([row['percentile_ranks']['esg_score'] for row in data['companies']], [75.0, 100.0, 50.0])
+        self.assertEqual([row['scores']['esg_score'] for row in data['companies']], [20.0, 30.0, 50.0])
+        self.assertEqual(sorted(data['peer_benchmarks']), ['Energy', 'Tech'])
+        self.assertEqual(data['peer_benchmarks']['Energy']['esg_score']['median'], 20.0)
+        self.assertEqual(data['missing'], [])
+
+        data = self.compare('INE000000002', peers='esg_sector').json()
+        self.assertEqual(data['companies'][0]['percentile_ranks']['group'], 'All')
+
+    def test_unknown_subject_is_404(self):
+        self.assertEqual(self.compare('INE999999999', **{'with': 'INE000000001'}).status_code, 404)
+
+    def test_unknown_peers_are_reported_missing(self):
+        data = self.compare('INE000000001', **{'with': 'INE999999999,INE000000003'}).json()
+        self.assertEqual([row['isin'] for row in data['companies']], ['INE000000001', 'INE000000003'])
+        self.assertEqual(data['missing'], ['INE999999999'])
+
+    def test_too_many_companies_is_400(self):
+        others = [f'INE{i:09d}' for i in range(2, MAX_COMPARE_COMPANIES + 2)]
+        self.assertEqual(self.compare('INE000000001', **{'with': ','.join(others[:-1])}).status_code, 200)
+        self.assertEqual(self.compare('INE000000001', **{'with': ','.join(others)}).status_code, 400)
+        self.assertEqual(self.compare('INE000000001', peers='country').status_code, 400)
+
+    def test_refresh_benchmarks_command(self):
+        Company.objects.filter(isin='INE000000001').update(esg_pillar='25')
+        out = io.StringIO()
+        call_command('refresh_benchmarks', stdout=out)
+        self.assertIn('Refreshed 15 peer benchmarks and 15 company ranks', out.getvalue())
+        ranks = self.compare('INE000000001').json()['companies'][0]['percentile_ranks']
+        self.assertEqual(ranks['esg_score'], 75.0)  # was 25.0: now above both 20s
+
+
+class ExcelReaderTests(SimpleTestCase):
+    def setUp(self):
+        import openpyxl
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'data.xlsx')
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = 'Company'
+        sheet.append([' ISIN ', 'Company Name', 'Mcap', None, 'Unused'])
+        sheet.append(['INE000000001', 'Acme', 1200.5, None, 'x'])
+        sheet.append(['INE000000002', 'N/A', 'NULL', None, 'x'])
+        sheet.append([None, None, None, None, 'only an unrequested column'])
+        sheet.append(['INE000000003', '', None, None, None])
+        workbook.create_sheet('Fund').append(['Fund Name'])
+        workbook.save(self.path)
+
+    def rows(self, *columns, **kwargs):
+        return list(excel_reader.iter_rows(self.path, columns, **kwargs))
+
+    def test_headers_are_normalized(self):
+        self.assertEqual(excel_reader.snake_header(' Company Name '), 'company_name')
+        self.assertEqual(self.rows('ISIN', sheet='Company')[0], ('INE000000001',))
+        self.assertEqual(self.rows('isin', 'company_name', normalize=excel_reader.snake_header)[0],
+                         ('INE000000001', 'Acme'))
+        self.assertEqual(excel_reader.header_names(self.path, sheet='Company'),
+                         {'ISIN', 'Company Name', 'Mcap', 'Unused'})
+
+    def test_na_strings_and_blank_cells_are_none(self):
+        self.assertEqual(self.rows('ISIN', 'Company Name', 'Mcap'), [
+            ('INE000000001', 'Acme', 1200.5),
+            ('INE000000002', None, None),
+            ('INE000000003', None, None),  # rows blank in every requested column are skipped
+        ])
+
+    def test_missing_columns_are_none(self):
+        self.assertEqual(self.rows('Company Name', 'Sector')[0], ('Acme', None))
+        self.assertEqual(self.rows('Sector'), [])
+        self.assertEqual(list(excel_reader.iter_records(self.path, ['ISIN', 'Sector']))[0],
+                         {'ISIN': 'INE000000001', 'Sector': None})
+
+    def test_openpyxl_fallback(self):
+        expected = self.rows('ISIN', 'Company Name', 'Mcap', 'Sector')
+        with mock.patch.object(excel_reader, 'CalamineWorkbook', None), \
+                mock.patch.object(excel_reader, '_calamine_rows', side_effect=AssertionError('calamine used')):
+            self.assertEqual(self.rows('ISIN', 'Company Name', 'Mcap', 'Sector'), expected)
+            self.assertEqual(excel_reader.sheet_names(self.path), ['Company', 'Fund'])
+            self.assertEqual(self.rows('Fund Name', sheet='Fund'), [])
+
+
+class CompanyColumnsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Company.objects.create(isin='INE000000002', company_name='Globex', sector='Tech', esg_rating='B',
+                               esg_pillar='55.5', pdf_filename='Globex.pdf')
+        Company.objects.create(isin='INE000000001', company_name='Acme', sector='Energy', grade='A',
+                               esg_score='61')  # legacy fields only
+        Company.objects.create(isin='INE000000003', company_name='Initech', sector='Tech')
+        Company.objects.create(isin='INE000000004', company_name='')  # not in the catalog
+
+    def test_json_and_msgpack_match_the_row_format(self):
+        import msgpack
+
+        client = APIClient()
+        rows = client.get('/api/companies/').json()
+        as_json = client.get('/api/companies/columns/').json()
+        response = client.get('/api/companies/columns/', HTTP_ACCEPT='application/x-msgpack')
+        self.assertEqual(response['Content-Type'], 'application/x-msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), as_json)
+
+        columns, dictionaries = as_json['columns'], as_json['dictionaries']
+        self.assertEqual(as_json['count'], len(rows))
+        self.assertEqual({len(values) for values in columns.values()}, {len(rows)})
+        self.assertEqual(columns['isin'], [row['isin'] for row in rows])
+        self.assertEqual(columns['company_name'], [row['company_name'] for row in rows])
+        self.assertEqual(columns['has_pdf_report'], [row['has_pdf_report'] for row in rows])
+        self.assertEqual([None if i is None else dictionaries['sector'][i] for i in columns['sector']],
+                         [row['sector'] for row in rows])
+        self.assertEqual([None if i is None else dictionaries['grade'][i] for i in columns['grade']],
+                         [row['esg_rating'] or row['grade'] for row in rows])
+        self.assertEqual(dictionaries['sector'], ['Energy', 'Tech'])
+        self.assertEqual(columns['esg_score'], [61.0, 55.5, None])
+
+
+class GunicornConfigTests(SimpleTestCase):
+    def load(self, **env):
+        clean = {key: value for key, value in os.environ.items()
+                 if not key.startswith('GUNICORN_') and key != 'SERVER_MODE'}
+        with mock.patch.dict(os.environ, {**clean, **env}, clear=True):
+            return runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+
+    def test_defaults(self):
+        config = self.load()
+        self.assertEqual(config['worker_class'], 'gthread')
+        self.assertEqual((config['threads'], config['timeout'], config['graceful_timeout']), (4, 60, 30))
+        self.assertEqual((config['max_requests'], config['max_requests_jitter']), (1000, 100))
+        self.assertTrue(1 <= config['workers'] <= 2 * config['_cpu_count']() + 1)
+        self.assertTrue(config['preload_app'])
+
+    def test_workers_capped_by_memory(self):
+        config = self.load(GUNICORN_WORKER_MEMORY_MB=str(2**40))
+        if config['_memory_mb']() is None:
+            self.skipTest('memory size unavailable')
+        self.assertEqual(config['workers'], 1)
+
+    def test_environment_overrides(self):
+        config = self.load(SERVER_MODE='asgi', GUNICORN_WORKERS='3', GUNICORN_TIMEOUT='90',
+                           GUNICORN_GRACEFUL_TIMEOUT='10', GUNICORN_MAX_REQUESTS='500')
+        self.assertEqual(config['worker_class'], 'uvicorn.workers.UvicornWorker')
+        self.assertEqual((config['workers'], config['timeout'], config['graceful_timeout']), (3, 90, 10))
+        self.assertEqual((config['max_requests'], config['max_requests_jitter']), (500, 50))
+        config = self.load(GUNICORN_WORKER_CLASS='sync', GUNICORN_THREADS='8')
+        self.assertEqual((config['worker_class'], config['threads']), ('sync', 8))
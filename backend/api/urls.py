@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path, include  
 from rest_framework.routers import DefaultRouter  
-from . import views
+from . import async_views, views
 from .views import TagViewSet, ArticleViewSet,PortfolioListCreateView, PortfolioCompanyUpdateView
 
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
@@ -13,6 +14,9 @@ router = DefaultRouter()
 router.register(r'tags', TagViewSet, basename='tag')
 router.register(r'articles', ArticleViewSet, basename='article')
 
+# ASGI deployments serve the hot read endpoints from async views
+hot_views = async_views if settings.ASYNC_VIEWS else views
+
 # Your existing URLs
 urlpatterns = [
 
@@ -47,14 +51,22 @@ urlpatterns = [
     path('admin/users/<int:user_id>/delete/', views.delete_user, name='delete_user'),
     
     # Company & Fund Data APIs
-    path('companies/', views.company_list, name='companies'),  # All Reports page
-    path('my-reports/', views.my_reports, name='my_reports'),  # My Reports page
+    path('companies/', hot_views.company_list, name='companies'),  # All Reports page
+    path('companies/columns/', views.company_columns, name='company_columns'),  # Comparison tool (JSON columns / MessagePack)
+    path('companies/history/', views.company_history_bulk, name='company_history_bulk'),  # Score history for many ISINs
+    path('companies/<str:isin>/compare/', views.company_compare, name='company_compare'),  # Company vs. selected companies and peers
+    path('companies/<str:isin>/history/', views.company_history, name='company_history'),  # Score history per ingest vintage
+    path('my-reports/', hot_views.my_reports, name='my_reports'),  # My Reports page
     path('request-report/', views.request_company_report, name='request_report'),  # Request company report
     path('funds/', views.fund_list, name='funds'),
+    path('benchmarks/', views.benchmarks, name='benchmarks'),  # Peer statistics and percentile ranks
+    path('dataset/', views.dataset_current, name='dataset_current'),  # Current dataset version
+    path('dataset/<str:version>/', views.dataset_version, name='dataset_version'),  # Immutable, pre-compressed
+    path('health/', hot_views.health_check, name='health_check'),  # Docker healthcheck
     
     # Secure PDF Download & Management
-    path('reports/download/<str:company_name>/', views.download_company_report, name='download_company_report'),
-    path('reports/view/<str:company_name>/', views.view_company_report, name='view_company_report'),
+    path('reports/download/<str:company_name>/', hot_views.download_company_report, name='download_company_report'),
+    path('reports/view/<str:company_name>/', hot_views.view_company_report, name='view_company_report'),
     path('admin/available-reports/', views.list_available_reports, name='list_available_reports'),
     path('admin/assign-available-report/', views.assign_available_report, name='assign_available_report'),
     
@@ -64,10 +76,16 @@ urlpatterns = [
     path('admin/remove-all-companies/<int:user_id>/', views.remove_all_companies_from_user, name='remove_all_companies'),
     path('admin/company-assignments/', views.admin_user_company_assignments, name='admin_company_assignments'),
     path('admin/sync-excel/', views.sync_excel_data, name='sync_excel'),
+    path('admin/jobs/<int:job_id>/', views.admin_job_detail, name='admin_job_detail'),
+    path('admin/db-connections/', views.admin_db_connections, name='admin_db_connections'),
 
     # Admin user log management
     path('admin/purchase-logs/', views.AdminPurchaseLogListView.as_view(), name='admin_purchase_log_list'),
+    path('admin/purchase-logs/export/', views.AdminPurchaseLogExportView.as_view(), name='admin_purchase_log_export'),
     path('log-purchase/', views.log_purchase, name='log_purchase'),
     
+    # Several GET calls in one round-trip
+    path('batch/', views.batch, name='batch'),
+
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,12 +1,12 @@
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, FileResponse
+from django.http import HttpRequest, HttpResponse, FileResponse, QueryDict, StreamingHttpResponse
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.views import APIView
 
 from .models import PurchaseLog 
@@ -24,12 +24,29 @@ from django_filters.rest_framework import DjangoFilterBackend # For filtering
 import django_filters # For creating filterset
 
 from rest_framework import generics, filters as drf_filters
-from rest_framework.pagination import PageNumberPagination
+from .pagination import KeysetPagination
+from .authentication import CachedJWTAuthentication, get_tokens_for_user
+from .benchmarks import MAX_COMPARE_COMPANIES, PEER_GROUPS, benchmarks_payload, compare_payload
+from .catalog import company_columns_payload, company_list_payload
+from .database import ReplicaReadsMixin, connection_settings, pool_stats, read_alias, replica_reads
+from .dataset import current_dataset
+from .history import MAX_HISTORY_COMPANIES, history_payload
+from .jobs import enqueue, job_payload
+from .loaders import SHEET_LOADERS
+from . import metrics as prometheus_metrics
+from .metrics import report_response
+from .renderers import PRE_ENCODED_TYPES, MessagePackRenderer, ORJSONRenderer
 from django_filters.rest_framework import DjangoFilterBackend
 
 
+import asyncio
+import csv
+import io
+import json
+import logging
 import os
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 from .serializers import (
     UserSerializer, UserDetailSerializer, NoteSerializer,
@@ -38,7 +55,7 @@ from .serializers import (
     UserCompanySerializer, MyReportsSerializer
 )
 
-from .models import Note, Report, UserReport, Company, Fund, UserCompany, CustomUser
+from .models import Note, Report, UserReport, Company, Fund, UserCompany, CustomUser, DatasetSnapshot, Job
 
 
 from .models import Tag, Article # Add Tag and Article
@@ -47,10 +64,14 @@ from rest_framework import viewsets # Add viewsets
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 
 from django.http import JsonResponse
-from django.db import connection
+from django.db import connection, connections
+from django.urls import Resolver404, resolve, reverse
+from django.utils.cache import parse_etags
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.http import require_http_methods
 
 User = get_user_model()  # Standardize user model
+logger = logging.getLogger(__name__)
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -64,7 +85,7 @@ def register_user(request):
             user = serializer.save()
             
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = get_tokens_for_user(user)
             access_token = refresh.access_token
             
             # Return user data with tokens
@@ -104,6 +125,8 @@ def get_company_name_mappings():
         if not os.path.exists(excel_path):
             return {}, {}
 
+        import pandas as pd  # Heavy; only this helper needs it, so keep it out of worker boot
+
         df = pd.read_excel(excel_path)
         df.columns = df.columns.str.strip()
 
@@ -160,15 +183,12 @@ def user_profile(request):
 # =========================
 @api_view(['GET'])
 @permission_classes([AllowAny])  # Public for All Reports
+@replica_reads
 def company_list(request):
     """Get all companies data for All Reports page from database"""
     try:
-        companies = (Company.objects
-                     .filter(company_name__isnull=False)
-                     .exclude(company_name__exact='')
-                     .order_by('company_name'))
-        serializer = CompanyListSerializer(companies, many=True)
-        return Response(serializer.data)
+        # Pre-encoded JSON snapshot, rebuilt only when the Company table changes
+        return Response(company_list_payload())
     except Exception as e:
         print(f"Error fetching companies: {str(e)}")
         return Response({'error': 'Failed to fetch companies data'},
@@ -177,6 +197,27 @@ def company_list(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@renderer_classes([ORJSONRenderer, MessagePackRenderer])
+def company_columns(request):
+    """
+    Compact columnar catalog for the Comparison tool.
+
+    Same companies as company_list plus pillar scores, screens and
+    controversy, laid out as one array per field with dictionary-encoded
+    sector / esg_sector / grade. Send Accept: application/x-msgpack for
+    MessagePack instead of JSON.
+    """
+    try:
+        return Response(company_columns_payload(request.accepted_renderer.format))
+    except Exception as e:
+        print(f"Error building company columns: {str(e)}")
+        return Response({'error': 'Failed to fetch companies data'},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@replica_reads
 def fund_list(request):
     """Get all funds data from database"""
     funds = Fund.objects.all()
@@ -240,7 +281,8 @@ def my_reports(request):
 @permission_classes([IsAuthenticated])
 def user_reports(request):
     """Get reports owned by the current user"""
-    user_reports_qs = UserReport.objects.filter(user=request.user, report__is_active=True)
+    user_reports_qs = (UserReport.objects.filter(user=request.user, report__is_active=True)
+                       .select_related('report'))
     serializer = UserReportsListSerializer(user_reports_qs, many=True)
     return Response(serializer.data)
 
@@ -457,19 +499,6 @@ def admin_user_company_assignments(request):
     return Response(UserCompanySerializer(assignments, many=True).data)
 
 
-@api_view(['POST'])
-@permission_classes([IsAdminUser])
-def sync_excel_data(request):
-    """Admin: Manually trigger Excel data sync (calls management command)"""
-    try:
-        from django.core.management import call_command
-        call_command('sync_excel_data')
-        return Response({'message': 'Excel data sync completed successfully'})
-    except Exception as e:
-        return Response({'error': f'Failed to sync Excel data: {str(e)}'},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
 # =========================
 # Secure PDF Serving (by company_name)
 # =========================
@@ -497,23 +526,28 @@ def download_company_report(request, company_name):
                         .select_related('company')
                         .first())
         if not user_company:
+            report_response('denied')
             return Response({'error': 'You do not have access to this company report'},
                             status=status.HTTP_403_FORBIDDEN)
 
         company = user_company.company
         if not company.pdf_filename or not company.has_pdf_report:
+            report_response('missing')
             return Response({'error': 'No PDF report available for this company'},
                             status=status.HTTP_404_NOT_FOUND)
 
         file_path = _secure_pdf_path(company.pdf_filename)
         if not os.path.exists(file_path):
+            report_response('missing')
             return Response({'error': 'Report file not found on server'},
                             status=status.HTTP_404_NOT_FOUND)
 
-        return FileResponse(open(file_path, 'rb'),
-                            content_type='application/pdf',
-                            as_attachment=True,
-                            filename=company.pdf_filename)
+        response = FileResponse(open(file_path, 'rb'),
+                                content_type='application/pdf',
+                                as_attachment=True,
+                                filename=company.pdf_filename)
+        report_response('served', int(response['Content-Length']))
+        return response
     except IOError:
         return Response({'error': 'Error reading report file'},
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -534,16 +568,19 @@ def view_company_report(request, company_name):
                         .select_related('company')
                         .first())
         if not user_company:
+            report_response('denied')
             return Response({'error': 'You do not have access to this company report'},
                             status=status.HTTP_403_FORBIDDEN)
 
         company = user_company.company
         if not company.pdf_filename or not company.has_pdf_report:
+            report_response('missing')
             return Response({'error': 'No PDF report available for this company'},
                             status=status.HTTP_404_NOT_FOUND)
 
         file_path = _secure_pdf_path(company.pdf_filename)
         if not os.path.exists(file_path):
+            report_response('missing')
             return Response({'error': 'Report file not found on server'},
                             status=status.HTTP_404_NOT_FOUND)
 
@@ -553,6 +590,7 @@ def view_company_report(request, company_name):
                             filename=company.pdf_filename)
         resp['Content-Disposition'] = f'inline; filename="{company.pdf_filename}"'
         resp['X-Frame-Options'] = 'SAMEORIGIN'
+        report_response('served', int(resp['Content-Length']))
         return resp
     except IOError:
         return Response({'error': 'Error reading report file'},
@@ -636,7 +674,7 @@ class NoteListCreate(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Note.objects.filter(author=self.request.user)
+        return Note.objects.filter(author=self.request.user).select_related('author')
     
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -671,105 +709,8 @@ class ReportDetail(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminUser]
     queryset = Report.objects.all()
 
-# Duplicate admin_users_list function removed - using the one above that returns the correct format
-
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def download_company_report(request, company_name):
-    """Download PDF report by company name"""
-    try:
-        # Get company by name and find PDF filename
-        company = Company.objects.filter(company_name__iexact=company_name).first()
-        if not company or not company.pdf_filename:
-            return Response({"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Construct file path
-        file_path = os.path.join(settings.BASE_DIR, 'media', 'secure_reports', company.pdf_filename)
-        if not os.path.exists(file_path):
-            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Return file for download
-        return FileResponse(
-            open(file_path, 'rb'),
-            as_attachment=True,
-            filename=company.pdf_filename,
-            content_type='application/pdf'
-        )
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def view_company_report(request, company_name):
-    """View PDF report by company name"""
-    try:
-        # Get company by name and find PDF filename
-        company = Company.objects.filter(company_name__iexact=company_name).first()
-        if not company or not company.pdf_filename:
-            return Response({"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Construct file path
-        file_path = os.path.join(settings.BASE_DIR, 'media', 'secure_reports', company.pdf_filename)
-        if not os.path.exists(file_path):
-            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Return file for viewing
-        return FileResponse(
-            open(file_path, 'rb'),
-            content_type='application/pdf',
-            filename=company.pdf_filename
-        )
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-@api_view(['GET'])
-@permission_classes([IsAdminUser])
-def list_available_reports(request):
-    """Admin: List all available PDF reports"""
-    try:
-        companies = Company.objects.filter(pdf_filename__isnull=False).exclude(pdf_filename='')
-        serializer = CompanyListSerializer(companies, many=True)
-        return Response(serializer.data)
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-@api_view(['POST'])
-@permission_classes([IsAdminUser])
-def assign_available_report(request):
-    """Admin: Assign an available report to a user"""
-    try:
-        username = request.data.get('username')
-        isin = request.data.get('isin')
-        
-        if not username or not isin:
-            return Response(
-                {"error": "Username and ISIN are required"}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Get user and company
-        user = get_object_or_404(CustomUser, username=username)
-        company = get_object_or_404(Company, isin=isin)
-        
-        # Create user-company assignment
-        user_company, created = UserCompany.objects.get_or_create(
-            user=user,
-            company=company
-        )
-        
-        if not created:
-            return Response(
-                {"message": "Report already assigned to user"}, 
-                status=status.HTTP_200_OK
-            )
-        
-        return Response(
-            {"message": f"Report {company.company_name} assigned to {user.username}"}, 
-            status=status.HTTP_201_CREATED
-        )
-        
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+# Duplicate admin_users_list, list_available_reports and assign_available_report
+# functions removed - using the ones above
 
 @api_view(['DELETE'])
 @permission_classes([IsAdminUser])
@@ -802,36 +743,48 @@ def remove_all_companies_from_user(request, user_id):
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def sync_excel_data(request):
+    """
+    Admin: Queue an incremental sync of the Excel workbook.
+    Optional body: {"force": bool, "sheets": ["Company", ...]}.
+    Returns 202 with the job; poll its url for progress (run_jobs executes it).
+    """
+    force = request.data.get('force', False)
+    if not isinstance(force, bool):
+        return Response({"error": "force must be true or false."}, status=status.HTTP_400_BAD_REQUEST)
+    sheets = request.data.get('sheets')
+    if sheets is not None:
+        if (not isinstance(sheets, list) or not sheets
+                or any(sheet not in SHEET_LOADERS for sheet in sheets)):
+            return Response({"error": f"sheets must be a list of: {', '.join(sorted(SHEET_LOADERS))}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        sheets = sorted(set(sheets))
+
+    params = {'force': force}
+    if sheets:
+        params['sheets'] = sheets
+    job, created = enqueue('sync_excel', params, user=request.user)
+    data = job_payload(job)
+    data['url'] = reverse('admin_job_detail', args=[job.pk])
+    data['queued'] = created
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
-def admin_user_company_assignments(request):
-    """Admin: Get all user-company assignments"""
-    try:
-        assignments = UserCompany.objects.all().select_related('user', 'company')
-        data = []
-        for assignment in assignments:
-            data.append({
-                'id': assignment.id,
-                'username': assignment.user.username,
-                'company_name': assignment.company.company_name,
-                'isin': assignment.company.isin,
-                'date_added': assignment.date_added
-            })
-        return Response(data)
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+def admin_job_detail(request, job_id):
+    """Admin: Status, progress, row counts and error of a background job"""
+    job = get_object_or_404(Job, pk=job_id)
+    return Response(job_payload(job))
 
-@api_view(['POST'])
+
+@api_view(['GET'])
 @permission_classes([IsAdminUser])
-def sync_excel_data(request):
-    """Admin: Sync data from Excel file to database"""
-    try:
-        # Run the management command to load Excel data
-        from django.core.management import call_command
-        call_command('load_excel_data')
-        return Response({"message": "Excel data synchronized successfully"})
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+def admin_db_connections(request):
+    """Admin: Connection reuse settings and, with DB_POOL, this worker's pool statistics"""
+    return Response({'settings': connection_settings(), 'pools': pool_stats()})
 
 
 @api_view(['POST'])
@@ -897,12 +850,13 @@ class PurchaseLogFilter(django_filters.FilterSet):
     #     return queryset
     
 
-class PurchaseLogPagination(PageNumberPagination):
+class PurchaseLogPagination(KeysetPagination):
+    """Cursor pagination on (timestamp, id); no COUNT(*) or OFFSET per page."""
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class AdminPurchaseLogListView(generics.ListAPIView):
+class AdminPurchaseLogListView(ReplicaReadsMixin, generics.ListAPIView):
     serializer_class = PurchaseLogSerializer
     queryset = (
         PurchaseLog.objects.select_related('user')
@@ -915,12 +869,145 @@ class AdminPurchaseLogListView(generics.ListAPIView):
     ordering_fields = ['timestamp']
 
 
+# Columns written by the purchase log export, as (header, ORM lookup) pairs.
+# Pulled with values_list() so the user join happens once in SQL instead of
+# per row through PurchaseLogSerializer.
+PURCHASE_LOG_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('timestamp', 'timestamp'),
+    ('company_name', 'company_name'),
+    ('user_id_recorded', 'user_id_recorded'),
+    ('username', 'user__username'),
+    ('first_name', 'user__first_name'),
+    ('last_name', 'user__last_name'),
+    ('email', 'user__email'),
+    ('organization', 'user__organization'),
+    ('job_title', 'user__job_title'),
+    ('phone_number', 'user__phone_number'),
+]
+PURCHASE_LOG_EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object for csv.writer that returns each line instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def _chunked(rows, size):
+    """Group an iterator of rows into lists of at most `size` rows."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _purchase_log_csv_stream(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in PURCHASE_LOG_EXPORT_COLUMNS])
+    for chunk in _chunked(rows, PURCHASE_LOG_EXPORT_CHUNK_SIZE):
+        yield ''.join(
+            writer.writerow([
+                value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in row
+            ])
+            for row in chunk
+        )
+
+
+def _purchase_log_parquet_stream(rows):
+    """Write one Parquet row group per chunk and yield the bytes as they are produced."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('company_name', pa.string()),
+        ('user_id_recorded', pa.int64()),
+        ('username', pa.string()),
+        ('first_name', pa.string()),
+        ('last_name', pa.string()),
+        ('email', pa.string()),
+        ('organization', pa.string()),
+        ('job_title', pa.string()),
+        ('phone_number', pa.string()),
+    ])
+    sink = io.BytesIO()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    for chunk in _chunked(rows, PURCHASE_LOG_EXPORT_CHUNK_SIZE):
+        columns = list(zip(*chunk))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema,
+        ))
+        yield drain()
+    writer.close()
+    yield drain()
+
+
+class AdminPurchaseLogExportView(ReplicaReadsMixin, APIView):
+    """
+    Admin: Stream the filtered purchase log as CSV (default) or Parquet.
+
+    Accepts the same filters as AdminPurchaseLogListView plus
+    `export_format=csv|parquet`. Rows are read through a server-side cursor
+    and written out chunk by chunk, so memory use does not grow with the
+    number of rows exported.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        export_format = request.query_params.get('export_format', 'csv').lower()
+        if export_format not in ('csv', 'parquet'):
+            return Response({'error': 'export_format must be "csv" or "parquet"'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        filterset = PurchaseLogFilter(request.query_params,
+                                      # Bound now: rows are read after the view returns
+                                      queryset=PurchaseLog.objects.using(read_alias()),
+                                      request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = (filterset.qs
+                .order_by('-timestamp', '-id')
+                .values_list(*[lookup for _, lookup in PURCHASE_LOG_EXPORT_COLUMNS])
+                .iterator(chunk_size=PURCHASE_LOG_EXPORT_CHUNK_SIZE))
+        filename = f"purchase_logs_{timezone.now():%Y%m%d_%H%M%S}"
+
+        if export_format == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                return Response({'error': 'Parquet export requires pyarrow to be installed'},
+                                status=status.HTTP_501_NOT_IMPLEMENTED)
+            response = StreamingHttpResponse(_purchase_log_parquet_stream(rows),
+                                             content_type='application/vnd.apache.parquet')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.parquet"'
+        else:
+            response = StreamingHttpResponse(_purchase_log_csv_stream(rows),
+                                             content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        return response
+
 
 
 
 # --- ADD THESE CLASSES AT THE END OF THE FILE ---
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadsMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows tags to be viewed.
     """
@@ -928,7 +1015,7 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     
-class ArticleViewSet(viewsets.ReadOnlyModelViewSet):
+class ArticleViewSet(ReplicaReadsMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows articles to be viewed.
     """
@@ -939,6 +1026,249 @@ class ArticleViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
 
+# =========================
+# Batch: several GET sub-requests in one round-trip
+# =========================
+# URL names whose views stream files or build plain Django responses. They are
+# refused before running, so a batch item never opens a report file.
+_NOT_BATCHABLE = {'download_company_report', 'view_company_report', 'admin_purchase_log_export',
+                  'dataset_current', 'dataset_version', 'health_check'}
+
+
+class _BatchSubRequest(HttpRequest):
+    """Bare GET request handed to a view on behalf of a batch request."""
+    def __init__(self, parent, path, query_string):
+        super().__init__()
+        self.method = 'GET'
+        self.path = self.path_info = path
+        self.META = {
+            key: value for key, value in parent.META.items()
+            if key.startswith('HTTP_') or key in ('SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR')
+        }
+        self.META.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': path,
+                          'QUERY_STRING': query_string})
+        self.GET = QueryDict(query_string)
+        self._parent_scheme = parent.scheme
+
+    def _get_scheme(self):
+        return self._parent_scheme
+
+
+def _run_batch_item(request, item):
+    """Resolve and call one sub-request; return its envelope entry."""
+    path = item.get('path') if isinstance(item, dict) else None
+    entry = {'id': item.get('id') if isinstance(item, dict) else None, 'path': path}
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        return {**entry, 'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'error': 'path must be a string starting with /api/'}}
+
+    parts = urlsplit(path)
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        return {**entry, 'status': status.HTTP_404_NOT_FOUND, 'body': {'error': 'Not found'}}
+    if match.url_name == 'batch':
+        return {**entry, 'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'error': 'Batch requests cannot be nested'}}
+    if match.url_name in _NOT_BATCHABLE:
+        return {**entry, 'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'error': 'Endpoint does not return JSON and cannot be batched'}}
+
+    view = match.func
+    if asyncio.iscoroutinefunction(view):
+        # ASYNC_VIEWS routes some URLs to api/async_views.py; batch items call the
+        # DRF view of the same name, which takes the batch's authentication below
+        view = globals()[view.__name__]
+
+    sub_request = _BatchSubRequest(request._request, parts.path, parts.query)
+    # Reuse the batch request's authentication instead of decoding the JWT again
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    try:
+        response = view(sub_request, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception('Batch item %s failed', path)
+        return {**entry, 'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                'body': {'error': 'Server error'}}
+    if not isinstance(response, Response):
+        response.close()  # a view missing from _NOT_BATCHABLE: release what it opened
+        return {**entry, 'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'error': 'Endpoint does not return JSON and cannot be batched'}}
+    body = response.data
+    if isinstance(body, PRE_ENCODED_TYPES):
+        body = json.loads(bytes(body))
+    return {**entry, 'status': response.status_code, 'body': body}
+
+
+def _run_batch_item_in_thread(request, item):
+    try:
+        return _run_batch_item(request, item)
+    finally:
+        # Worker threads get their own DB connections; don't leave them open
+        connections.close_all()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch(request):
+    """
+    Run several GET API calls in one round-trip.
+
+    Expected payload: { requests: [{ path: "/api/profile/", id?: <any> }, ...], parallel?: <bool> }
+    Authentication happens once for the whole batch. Each item comes back
+    with its own status and body, in request order. With parallel=true the
+    items run concurrently on up to BATCH_MAX_WORKERS threads.
+    """
+    if not isinstance(request.data, dict):
+        return Response({'error': 'Expected a JSON object with a requests list'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    items = request.data.get('requests')
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'requests must be a non-empty list'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 10)
+    if len(items) > max_requests:
+        return Response({'error': f'A batch may contain at most {max_requests} requests'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    if request.data.get('parallel') and len(items) > 1:
+        workers = min(len(items), getattr(settings, 'BATCH_MAX_WORKERS', 4))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda item: _run_batch_item_in_thread(request, item), items))
+    else:
+        results = [_run_batch_item(request, item) for item in items]
+    return Response({'responses': results})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@replica_reads
+def benchmarks(request):
+    """
+    Sector / ESG-sector peer statistics for each score, refreshed at ingest.
+
+    Query params: group_type (sector or esg_sector), group (peer group name),
+    isin (comma-separated) for those companies' percentile ranks. With
+    group_type and group but no isin, ranks for the whole group are returned.
+    """
+    group_type = request.query_params.get('group_type') or None
+    group_name = request.query_params.get('group') or None
+    isins = [i.strip() for i in request.query_params.get('isin', '').split(',') if i.strip()]
+    if group_type and group_type not in PEER_GROUPS:
+        return Response({'error': f"group_type must be one of: {', '.join(PEER_GROUPS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response(benchmarks_payload(group_type, group_name, isins))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def company_compare(request, isin):
+    """
+    Compare a company with others: /api/companies/<isin>/compare/?with=<isin,...>&peers=sector
+
+    Scores and percentile ranks come from the ingest-time peer ranking, so
+    nothing is computed over the catalog per request.
+    """
+    peers = request.query_params.get('peers', 'sector')
+    if peers not in PEER_GROUPS:
+        return Response({'error': f"peers must be one of: {', '.join(PEER_GROUPS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    isins = [isin]
+    for other in request.query_params.get('with', '').split(','):
+        other = other.strip()
+        if other and other not in isins:
+            isins.append(other)
+    if len(isins) > MAX_COMPARE_COMPANIES:
+        return Response({'error': f'At most {MAX_COMPARE_COMPANIES} companies can be compared'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    payload = compare_payload(isins, peers)
+    if payload is None:
+        return Response({'error': 'Company not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(payload)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def company_history(request, isin):
+    """Score history of one company, one entry per ingest vintage where it changed."""
+    history = history_payload([isin])[isin]
+    if not history and not Company.objects.filter(isin=isin).exists():
+        return Response({'error': 'Company not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'isin': isin, 'history': history})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def company_history_bulk(request):
+    """Score history for several companies: /api/companies/history/?isin=<isin,...>"""
+    isins = list(dict.fromkeys(i.strip() for i in request.query_params.get('isin', '').split(',') if i.strip()))
+    if not isins:
+        return Response({'error': 'isin is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(isins) > MAX_HISTORY_COMPANIES:
+        return Response({'error': f'At most {MAX_HISTORY_COMPANIES} companies per request'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response({'history': history_payload(isins)})
+
+
+# =========================
+# Dataset snapshots (replaces browser-side parsing of data.xlsx)
+# =========================
+def _accepted_encodings(request):
+    """Content codings the client accepts (q=0 means refused)."""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+@require_http_methods(["GET"])
+def dataset_current(request):
+    """Point clients at the current dataset version. Never cached."""
+    snapshot = current_dataset()
+    response = JsonResponse({
+        'version': snapshot.version,
+        'url': reverse('dataset_version', args=[snapshot.version]),
+        'company_count': snapshot.company_count,
+        'fund_count': snapshot.fund_count,
+        'created_at': snapshot.created_at.isoformat(),
+        'published_at': snapshot.published_at.isoformat(),
+    })
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@require_http_methods(["GET"])
+def dataset_version(request, version):
+    """Serve one dataset version, pre-compressed, cacheable forever."""
+    snapshots = DatasetSnapshot.objects.filter(version=version)
+    if not snapshots.exists():
+        return JsonResponse({'error': 'Unknown dataset version'}, status=404)
+
+    etag = f'"{version}"'
+    # Weak comparison, as If-None-Match requires
+    if {'*', etag, f'W/{etag}'} & set(parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))):
+        response = HttpResponse(status=304)
+    else:
+        snapshot = snapshots.first()
+        accepted = _accepted_encodings(request)
+        if snapshot.content_brotli is not None and 'br' in accepted:
+            body, encoding = snapshot.content_brotli, 'br'
+        elif 'gzip' in accepted or '*' in accepted:
+            body, encoding = snapshot.content_gzip, 'gzip'
+        else:
+            body, encoding = snapshot.content, None
+        response = HttpResponse(bytes(body), content_type='application/json')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
 @require_http_methods(["GET"])
 def health_check(request):
     """
@@ -961,6 +1291,38 @@ def health_check(request):
         }, status=503)
 
 
+def _metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    # No token configured: staff only, with a JWT or an admin session
+    user = request.user
+    if not user.is_authenticated:
+        try:
+            authenticated = CachedJWTAuthentication().authenticate(request)
+        except APIException:
+            return False
+        if authenticated is None:
+            return False
+        user = authenticated[0]
+    return user.is_staff
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """
+    Prometheus scrape endpoint (see api/metrics.py). Scrapers send
+    METRICS_TOKEN as a bearer token; without it configured only staff users
+    can read the metrics.
+    """
+    if not _metrics_allowed(request):
+        return HttpResponse(status=401)
+    if not prometheus_metrics.enabled():
+        return HttpResponse('prometheus_client is not installed\n', status=503, content_type='text/plain')
+    body, content_type = prometheus_metrics.exposition()
+    return HttpResponse(body, content_type=content_type)
+
+
 
 
 class PortfolioListCreateView(APIView):
@@ -968,7 +1330,8 @@ class PortfolioListCreateView(APIView):
 
     def get(self, request):
         """Lists all portfolios for the current user."""
-        portfolios = Portfolio.objects.filter(user=request.user).order_by('id')
+        portfolios = (Portfolio.objects.filter(user=request.user).order_by('id')
+                      .prefetch_related('companies__company'))
         serializer = PortfolioSerializer(portfolios, many=True)
         return Response(serializer.data)
     
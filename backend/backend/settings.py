@@ -15,6 +15,8 @@ from datetime import timedelta
 from dotenv import load_dotenv
 import os
 
+from api.hashers import password_hashers
+
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -36,19 +38,94 @@ ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '127.0.0.1,localhost').sp
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
 
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10 # Default page size (frontend can override)
 }
 
+# /api/batch/: max sub-requests per batch and threads used when parallel=true
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '10'))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '4'))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "api.authentication.VersionedTokenObtainPairSerializer",
+}
+
+# Cache backend (per-process memory unless configured, e.g. for Redis:
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://redis:6379/1)
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# Seconds a pre-encoded catalog snapshot (api/catalog.py) may stay cached
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", "3600"))
+
+# Cache user principals for api.authentication.CachedJWTAuthentication. Saving a
+# user only clears the entry in the saving process's cache, so this needs a cache
+# shared by all workers and defaults to off with the per-process one
+AUTH_USER_CACHE = os.environ.get(
+    "AUTH_USER_CACHE", str(not CACHES["default"]["BACKEND"].endswith(".LocMemCache"))) == "True"
+
+# Seconds a user principal stays cached by api.authentication.CachedJWTAuthentication
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get("AUTH_USER_CACHE_TIMEOUT", "60"))
+
+# Published dataset versions (api/dataset.py) kept for /api/dataset/<version>/
+DATASET_KEEP_VERSIONS = int(os.environ.get("DATASET_KEEP_VERSIONS", "10"))
+
+# Background jobs (api/jobs.py, run by `manage.py run_jobs`): workers heartbeat
+# running jobs every JOB_HEARTBEAT_INTERVAL seconds; a running job whose heartbeat
+# is older than JOB_STALE_AFTER seconds is retried, up to JOB_MAX_ATTEMPTS
+JOB_HEARTBEAT_INTERVAL = int(os.environ.get("JOB_HEARTBEAT_INTERVAL", "60"))
+JOB_STALE_AFTER = int(os.environ.get("JOB_STALE_AFTER", "1800"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+
+# "wsgi" (gunicorn) or "asgi" (uvicorn workers), as passed to docker-entrypoint.sh
+SERVER_MODE = os.environ.get("SERVER_MODE", "wsgi")
+
+# Route the hot read endpoints to the async views in api/async_views.py.
+# docker-entrypoint.sh turns this on when SERVER_MODE=asgi (uvicorn workers)
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", "False") == "True"
+
+# Per-request query count and timings (api/instrumentation.py): Server-Timing
+# header and a JSON line on the "api.requests" logger. Requests over their
+# budget in QUERY_BUDGETS_FILE (URL name -> max queries) are logged as a
+# warning, raise QueryBudgetExceeded ("fail", used by the tests), or pass ("off")
+REQUEST_METRICS = os.environ.get('REQUEST_METRICS', 'True') == 'True'
+QUERY_BUDGETS_FILE = os.environ.get('QUERY_BUDGETS_FILE', str(BASE_DIR / 'query_budgets.json'))
+QUERY_BUDGET_ACTION = os.environ.get('QUERY_BUDGET_ACTION', 'warn')
+
+# Bearer token Prometheus must send to scrape /metrics (api/metrics.py); when
+# unset, only staff users (JWT or admin session) can read the metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.requests": {
+            "handlers": ["console"],
+            "level": os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            "propagate": False,
+        },
+    },
 }
 
 # Custom User Model
@@ -71,12 +148,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.middleware.ReplicaPinMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -124,6 +203,67 @@ DATABASES = {
         'PORT': os.environ.get('DB_PORT', '5432'),     # Uses '5432' if DB_PORT is not set
     }
 }
+
+# Connection reuse. DB_POOL=True uses a psycopg 3 connection pool per worker
+# process (DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections, waiting up to
+# DB_POOL_TIMEOUT seconds for a free one); otherwise each thread keeps its
+# connection for DB_CONN_MAX_AGE seconds (0 = close after every request).
+# Pooling and persistent connections are mutually exclusive in Django.
+# Under ASGI, sync ORM calls run on a thread pool and a persistent connection
+# per thread is never reliably closed, so DB_CONN_MAX_AGE is ignored there:
+# use DB_POOL to reuse connections.
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+if DB_POOL:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        },
+    }
+elif SERVER_MODE == 'asgi':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+# Check a reused connection is still alive before the first query of a request
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+# Optional read replica (DB_REPLICA_HOST, plus DB_REPLICA_PORT/NAME/USER/PASS
+# when they differ from the primary). Views marked with api.database.replica_reads
+# or ReplicaReadsMixin read from it; a user is pinned to the primary for
+# DB_REPLICA_PIN_SECONDS after their own writes (api.middleware.ReplicaPinMiddleware)
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASS', DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['api.database.ReplicaRouter']
+DB_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', '10'))
+
+# Password hashing (see api/hashers.py)
+# The policy's hasher is preferred; the rest, and Django's default hashers,
+# stay listed so existing hashes still verify and get upgraded on the next
+# successful login.
+PASSWORD_HASH_POLICY = os.environ.get("PASSWORD_HASH_POLICY", "pbkdf2")
+PASSWORD_HASHERS = password_hashers(PASSWORD_HASH_POLICY)
+
+# Cost parameters; unset means Django's default for that hasher
+PASSWORD_HASH_PBKDF2_ITERATIONS = int(os.environ.get("PASSWORD_HASH_PBKDF2_ITERATIONS", "0")) or None
+PASSWORD_HASH_SCRYPT_WORK_FACTOR = int(os.environ.get("PASSWORD_HASH_SCRYPT_WORK_FACTOR", "0")) or None
+PASSWORD_HASH_ARGON2_TIME_COST = int(os.environ.get("PASSWORD_HASH_ARGON2_TIME_COST", "0")) or None
+PASSWORD_HASH_ARGON2_MEMORY_COST = int(os.environ.get("PASSWORD_HASH_ARGON2_MEMORY_COST", "0")) or None
+PASSWORD_HASH_ARGON2_PARALLELISM = int(os.environ.get("PASSWORD_HASH_ARGON2_PARALLELISM", "0")) or None
+
+# Where hashing runs: "thread" (default), "process" or "inline", and how many at once
+PASSWORD_HASH_EXECUTOR = os.environ.get("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "0")) or None
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -20,6 +20,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from api.views import metrics
+
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -29,6 +31,7 @@ urlpatterns = [
     path("token/refresh/", TokenRefreshView.as_view(), name="refresh_token"),
     path("api-auth/", include("rest_framework.urls")),
     path("api/", include("api.urls")),
+    path("metrics", metrics, name="metrics"),  # Prometheus scrape endpoint
 ]
 
 # Serve media files during development
@@ -1,10 +1,22 @@
 #!/bin/sh
 
 echo "Waiting for postgres..."
-while ! nc -z $DB_HOST $DB_PORT; do
-  sleep 0.1
-done
+python manage.py wait_for_db --timeout 120 || exit 1
 echo "PostgreSQL started"
 
+# PROCESS_TYPE=worker runs the background job worker (admin Excel syncs,
+# api/jobs.py) instead of the web server; docker-compose's "worker" service
+if [ "$PROCESS_TYPE" = "worker" ]; then
+  exec python manage.py run_jobs
+fi
+
+# SERVER_MODE=asgi runs uvicorn workers and routes the hot read endpoints
+# to the async views (api/async_views.py); the default is gthread WSGI workers.
+# Worker count, threads, timeouts and recycling come from gunicorn.conf.py
+if [ "$SERVER_MODE" = "asgi" ]; then
+  export ASYNC_VIEWS=${ASYNC_VIEWS:-True}
+  exec gunicorn backend.asgi:application --config gunicorn.conf.py
+fi
+
 # Run the gunicorn server
-exec gunicorn backend.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
+exec gunicorn backend.wsgi:application --config gunicorn.conf.py
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+Gunicorn settings for the backend container (see docker-entrypoint.sh).
+
+Workers are sized from the CPUs and memory the container may actually use
+(cgroup limits first, then the host): 2 x CPUs + 1, capped so that
+workers x GUNICORN_WORKER_MEMORY_MB fits in memory. SERVER_MODE=asgi runs
+uvicorn workers; otherwise gthread workers with GUNICORN_THREADS threads
+each. Every value can be overridden with the GUNICORN_* variables below.
+
+The app is imported once in the master (preload_app) so workers share its
+memory copy-on-write; database connections are closed after fork so each
+worker opens its own. Workers are recycled after max_requests (+ jitter,
+so they do not all restart at once).
+
+The request hooks keep per-worker counts and latencies and log a summary
+every GUNICORN_METRICS_EVERY requests and when the worker exits. Gunicorn
+does not call them for uvicorn workers.
+
+Prometheus metrics (api/metrics.py) run in multiprocess mode: every worker
+writes its samples under PROMETHEUS_MULTIPROC_DIR, which is emptied when
+gunicorn starts, and a dead worker's gauges are dropped.
+"""
+import os
+import shutil
+import threading
+import time
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _cpu_count():
+    """CPUs available to this container: the cgroup quota if there is one."""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _memory_mb():
+    """Memory available to this container in MB: the cgroup limit, else physical memory."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                limit = f.read().strip()
+            # cgroup v1 reports "no limit" as a huge number
+            if limit != 'max' and int(limit) < 2**60:
+                return int(limit) // 2**20
+        except (OSError, ValueError):
+            pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def _default_workers():
+    workers = 2 * _cpu_count() + 1
+    memory = _memory_mb()
+    if memory:
+        workers = min(workers, memory // _env_int('GUNICORN_WORKER_MEMORY_MB', 150))
+    return max(1, workers)
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+if os.environ.get('SERVER_MODE') == 'asgi':
+    worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+else:
+    worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = _env_int('GUNICORN_WORKERS', _default_workers())
+threads = _env_int('GUNICORN_THREADS', 4)
+
+timeout = _env_int('GUNICORN_TIMEOUT', 60)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+METRICS_EVERY = _env_int('GUNICORN_METRICS_EVERY', 1000)
+
+# Read by prometheus_client when the app is imported, so it must be set here
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+
+
+# =========================
+# Server hooks
+# =========================
+def on_starting(server):
+    # Samples left by a previous run would be merged into this one's
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def when_ready(server):
+    per_worker = f' x {threads} threads' if worker_class == 'gthread' else ''
+    server.log.info(f'{worker_class}: {workers} workers{per_worker} '
+                    f'({_cpu_count()} CPUs, {_memory_mb()} MB), preload={preload_app}, '
+                    f'max_requests={max_requests}+{max_requests_jitter}')
+
+
+def post_fork(server, worker):
+    # Connections inherited from the preloading master must not be shared
+    from django.db import connections
+    for conn in connections.all(initialized_only=True):
+        conn.close()
+    worker.metrics = {'requests': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                      'started': time.time()}
+    worker.metrics_lock = threading.Lock()
+
+
+def pre_request(worker, req):
+    req.start_time = time.perf_counter()
+
+
+def post_request(worker, req, environ, resp):
+    elapsed = time.perf_counter() - getattr(req, 'start_time', time.perf_counter())
+    with worker.metrics_lock:
+        metrics = worker.metrics
+        metrics['requests'] += 1
+        metrics['errors'] += (resp.status_code or 0) >= 500
+        metrics['seconds'] += elapsed
+        metrics['max_seconds'] = max(metrics['max_seconds'], elapsed)
+        report = METRICS_EVERY and metrics['requests'] % METRICS_EVERY == 0
+    if report:
+        _log_metrics(worker)
+
+
+def worker_exit(server, worker):
+    if getattr(worker, 'metrics', None) and worker.metrics['requests']:
+        _log_metrics(worker)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def _log_metrics(worker):
+    metrics = worker.metrics
+    mean_ms = metrics['seconds'] / metrics['requests'] * 1000
+    uptime = time.time() - metrics['started']
+    worker.log.info(f"worker {worker.pid}: {metrics['requests']} requests, {metrics['errors']} 5xx, "
+                    f"mean {mean_ms:.1f}ms, max {metrics['max_seconds'] * 1000:.1f}ms, "
+                    f"{metrics['requests'] / uptime:.1f} req/s over {uptime:.0f}s")
@@ -53,7 +53,7 @@ const AdminPanel: React.FC = () => {
   const [logError, setLogError] = useState<string | null>(null);
   const [startDate, setStartDate] = useState(''); // YYYY-MM-DD
   const [endDate, setEndDate] = useState('');     // YYYY-MM-DD
-  const [currentPage, setCurrentPage] = useState(1);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [hasMoreLogs, setHasMoreLogs] = useState(true);
   const [isInitialLoad, setIsInitialLoad] = useState(true);
 
@@ -133,7 +133,7 @@ const AdminPanel: React.FC = () => {
 
   // Logs: fetch only on logs tab
   const fetchLogs = useCallback(
-    async (page: number, filters: LogFilters, replaceLogs = false) => {
+    async (cursor: string | null, filters: LogFilters, replaceLogs = false) => {
       if (tab !== 'logs') return;
       if (!user?.is_staff && !user?.is_superuser) return;
 
@@ -141,7 +141,7 @@ const AdminPanel: React.FC = () => {
       setLogError(null);
       try {
         const response: PaginatedPurchaseLogResponse = await authService.getPurchaseLogs({
-          page,
+          cursor,
           pageSize: LOGS_PER_PAGE,
           startDate: filters.startDate || undefined,
           endDate: filters.endDate || undefined,
@@ -156,8 +156,8 @@ const AdminPanel: React.FC = () => {
         }));
 
         setPurchaseLogs((prev) => (replaceLogs ? normalized : [...prev, ...normalized]));
-        setHasMoreLogs(response.next !== null);
-        setCurrentPage(page);
+        setHasMoreLogs(response.next_cursor !== null);
+        setNextCursor(response.next_cursor);
       } catch (e) {
         setLogError(e instanceof Error ? e.message : 'Failed to load logs');
         setHasMoreLogs(false);
@@ -173,9 +173,9 @@ const AdminPanel: React.FC = () => {
   if (tab !== 'logs') return;
   setIsInitialLoad(true);
   setPurchaseLogs([]);
-  setCurrentPage(1);
+  setNextCursor(null);
   setHasMoreLogs(true);
-  void fetchLogs(1, { startDate, endDate }, true);
+  void fetchLogs(null, { startDate, endDate }, true);
 }, [tab, startDate, endDate, fetchLogs]);
   
 
@@ -184,9 +184,9 @@ const AdminPanel: React.FC = () => {
     if (tab !== 'logs') return;
     setIsInitialLoad(true);
     setPurchaseLogs([]);
-    setCurrentPage(1);
+    setNextCursor(null);
     setHasMoreLogs(true);
-    void fetchLogs(1, { startDate, endDate }, true);
+    void fetchLogs(null, { startDate, endDate }, true);
   }, [tab, startDate, endDate, fetchLogs]);
 
   // Mount/unmount intersection observer for infinite scroll
@@ -196,7 +196,7 @@ const AdminPanel: React.FC = () => {
     observerRef.current = new IntersectionObserver((entries) => {
       const first = entries[0];
       if (first.isIntersecting && hasMoreLogs && !logLoading && !isInitialLoad) {
-        void fetchLogs(currentPage + 1, { startDate, endDate }, false);
+        void fetchLogs(nextCursor, { startDate, endDate }, false);
       }
     });
 
@@ -207,7 +207,7 @@ const AdminPanel: React.FC = () => {
       if (node) observerRef.current?.unobserve(node);
       observerRef.current?.disconnect();
     };
-  }, [tab, hasMoreLogs, logLoading, currentPage, startDate, endDate, fetchLogs, isInitialLoad]);
+  }, [tab, hasMoreLogs, logLoading, nextCursor, startDate, endDate, fetchLogs, isInitialLoad]);
 
   // ---------- Gates ----------
   if (!isAuthenticated) {
@@ -91,8 +91,10 @@ export interface PurchaseLogEntry {
 }
 
 export interface PaginatedPurchaseLogResponse {
-  count: number;
+  count: number | null; // Estimated, and only when includeTotal is requested
+  count_is_estimate: boolean;
   next: string | null;
+  next_cursor: string | null;
   previous: string | null;
   results: PurchaseLogEntry[];
 }
@@ -324,18 +326,22 @@ class AuthService {
 
 // Update the function signature and query parameters
 async getPurchaseLogs(filters: {
-  page?: number;
+  cursor?: string | null; // next_cursor from the previous page
   pageSize?: number;
+  includeTotal?: boolean;
   startDate?: string; // Expect YYYY-MM-DD
   endDate?: string;   // Expect YYYY-MM-DD
 }): Promise<PaginatedPurchaseLogResponse> { // Return the paginated response structure
     const params = new URLSearchParams();
-    if (filters.page) {
-        params.append('page', filters.page.toString());
+    if (filters.cursor) {
+        params.append('cursor', filters.cursor);
     }
     if (filters.pageSize) {
         params.append('page_size', filters.pageSize.toString());
     }
+    if (filters.includeTotal) {
+        params.append('include_total', 'true');
+    }
     if (filters.startDate) {
         // Append time if backend expects datetime, otherwise just date is fine
         params.append('start_date', `${filters.startDate}T00:00:00`);
@@ -359,7 +365,7 @@ async getPurchaseLogs(filters: {
         } catch (e) { /* Ignore parsing error */ }
         throw new Error(errorMsg);
     }
-    // Assume response is JSON with count, next, previous, results
+    // Assume response is JSON with count, next, next_cursor, previous, results
     return response.json() as Promise<PaginatedPurchaseLogResponse>;
 }
 }
@@ -1,5 +1,8 @@
 ﻿// lib/excel-data.ts
-import Excel from 'exceljs';
+// Datasets come from the backend (/api/dataset/), published on every Excel
+// ingest. exceljs is only loaded to parse /data.xlsx if the API is unreachable.
+import type { Row, Workbook, Worksheet } from 'exceljs';
+import { API_BASE } from './api.client';
 
 export interface CompanyDataRow {
   companyName: string;
@@ -31,7 +34,7 @@ export interface PortfolioCompany {
   companyName: string;
 }
 
-function headerIndexMap(worksheet: Excel.Worksheet) {
+function headerIndexMap(worksheet: Worksheet) {
   const map: Record<string, number> = {};
   const headerRow = worksheet.getRow(1);
   headerRow.eachCell((cell, colNumber) => {
@@ -42,12 +45,13 @@ function headerIndexMap(worksheet: Excel.Worksheet) {
 }
 
 // Internal function to load workbook once
-async function loadWorkbook(): Promise<Excel.Workbook | null> {
+async function loadWorkbook(): Promise<Workbook | null> {
   try {
     const response = await fetch('/data.xlsx');
     if (!response.ok) throw new Error(`Failed to fetch Excel file: ${response.statusText}`);
     const buffer = await response.arrayBuffer();
-    const workbook = new Excel.Workbook();
+    const { Workbook } = await import('exceljs');
+    const workbook = new Workbook();
     await workbook.xlsx.load(buffer);
     return workbook;
   } catch (error) {
@@ -57,14 +61,14 @@ async function loadWorkbook(): Promise<Excel.Workbook | null> {
 }
 
 // Internal function to parse company sheet
-function parseCompanySheet(workbook: Excel.Workbook): CompanyDataRow[] {
+function parseCompanySheet(workbook: Workbook): CompanyDataRow[] {
   try {
     const worksheet = workbook.getWorksheet('Company');
     if (!worksheet) throw new Error("Worksheet 'Company' not found.");
 
     const idx = headerIndexMap(worksheet);
 
-    const get = (row: Excel.Row, headerName: string) => {
+    const get = (row: Row, headerName: string) => {
       const col = idx[headerName];
       if (!col) return '';
       const v = row.getCell(col).value;
@@ -114,7 +118,7 @@ function parseCompanySheet(workbook: Excel.Workbook): CompanyDataRow[] {
 }
 
 // Internal function to parse fund sheet
-function parseFundSheet(workbook: Excel.Workbook): FundDataRow[] {
+function parseFundSheet(workbook: Workbook): FundDataRow[] {
   try {
     const worksheet = workbook.getWorksheet('Fund');
     if (!worksheet) throw new Error("Worksheet 'Fund' not found.");
@@ -143,10 +147,41 @@ function parseFundSheet(workbook: Excel.Workbook): FundDataRow[] {
 // Cache for loaded data
 let cachedData: { companies: CompanyDataRow[]; funds: FundDataRow[] } | null = null;
 
+interface DatasetPointer {
+  version: string;
+  url: string;
+  company_count: number;
+  fund_count: number;
+}
+
+// Fetch the current dataset version; the versioned URL is immutable, so the
+// browser HTTP cache serves it until the backend publishes a new version.
+async function loadDataset(): Promise<{ companies: CompanyDataRow[]; funds: FundDataRow[] } | null> {
+  try {
+    const pointerResponse = await fetch(`${API_BASE}/api/dataset/`, { cache: 'no-cache' });
+    if (!pointerResponse.ok) throw new Error(`Failed to fetch dataset version: ${pointerResponse.statusText}`);
+    const pointer: DatasetPointer = await pointerResponse.json();
+
+    const response = await fetch(`${API_BASE}${pointer.url}`);
+    if (!response.ok) throw new Error(`Failed to fetch dataset ${pointer.version}: ${response.statusText}`);
+    const data = await response.json();
+    return { companies: data.companies ?? [], funds: data.funds ?? [] };
+  } catch (error) {
+    console.error('Failed to load dataset from API, falling back to Excel:', error);
+    return null;
+  }
+}
+
 // Load both datasets once and cache them
 async function loadAllData(): Promise<{ companies: CompanyDataRow[]; funds: FundDataRow[] }> {
   if (cachedData) return cachedData;
 
+  const dataset = await loadDataset();
+  if (dataset) {
+    cachedData = dataset;
+    return cachedData;
+  }
+
   const workbook = await loadWorkbook();
   if (!workbook) {
     return { companies: [], funds: [] };